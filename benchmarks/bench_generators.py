@@ -0,0 +1,205 @@
+"""Benchmark: `kcl run` wall time and peak RSS across inventory sizes.
+
+Renders synthetic UnifiedConfig inventories (one device, one tunnel and two
+services per device) and times each scenario as a separate `kcl run`
+process, so peak RSS is the child's own high-water mark:
+
+  generate     kcl run main.k                          (glue.generate, both providers)
+  validate     kcl run main.k -D mode=validate         (glue.validate_only)
+  unifi        kcl run main.k -D component=unifi       (generate, UniFi only)
+  cloudflare   kcl run main.k -D component=cloudflare  (generate, Cloudflare only)
+
+Results are written as JSON (--output) so runs from different releases can
+be compared; --baseline compares against an earlier results file and exits
+non-zero when a scenario got slower than --threshold allows.
+
+Usage:
+    python benchmarks/bench_generators.py --output results.json
+    python benchmarks/bench_generators.py --sizes 10 100 --baseline results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from synthetic_inventory import REPO_ROOT, write_inventory  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+# Scenario name -> extra `kcl run` arguments
+SCENARIOS = {
+    "generate": [],
+    "validate": ["-D", "mode=validate"],
+    "unifi": ["-D", "component=unifi"],
+    "cloudflare": ["-D", "component=cloudflare"],
+}
+
+RESULTS_SCHEMA = "unifi-cloudflare-glue-bench-generators/v1"
+
+
+def measure(args, cwd):
+    """
+    Run a command and return (wall seconds, peak RSS in KiB).
+
+    The child is reaped with os.wait4 so ru_maxrss belongs to this process
+    alone rather than the maximum over every child seen so far.
+
+    Raises:
+        RuntimeError: If the command exits non-zero
+    """
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        proc = subprocess.Popen(args, cwd=cwd, stdout=subprocess.DEVNULL, stderr=stderr)
+        _, status, rusage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(
+                f"{' '.join(args)} exited {proc.returncode}: {stderr.read().decode(errors='replace')}"
+            )
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak_kib = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    return seconds, peak_kib
+
+
+def run_scenario(module_dir, extra_args, repeat):
+    """Return the median wall time and maximum peak RSS over repeat runs."""
+    samples, peaks = [], []
+    for _ in range(repeat):
+        seconds, peak_kib = measure(["kcl", "run", "main.k", *extra_args], module_dir)
+        samples.append(seconds)
+        peaks.append(peak_kib)
+    return {
+        "wall_seconds": round(statistics.median(samples), 3),
+        "wall_seconds_samples": [round(s, 3) for s in samples],
+        "peak_rss_kib": max(peaks),
+    }
+
+
+def kcl_version():
+    """Return `kcl --version` output, or None if it cannot be determined."""
+    try:
+        result = subprocess.run(["kcl", "--version"], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+def git_revision():
+    """Return the working tree's commit, or None outside a git checkout."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=30
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+
+def project_version():
+    """Return the project version from the VERSION file."""
+    version_file = REPO_ROOT / "VERSION"
+    return version_file.read_text().strip() if version_file.exists() else None
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline results file.
+
+    Returns:
+        List of regression descriptions for scenarios whose median wall time
+        grew by more than threshold (a ratio, e.g. 0.25 for 25%)
+    """
+    previous = {
+        (entry["devices"], entry["scenario"]): entry for entry in baseline.get("results", [])
+    }
+    regressions = []
+    for entry in results["results"]:
+        old = previous.get((entry["devices"], entry["scenario"]))
+        if old is None or not old["wall_seconds"]:
+            continue
+        ratio = entry["wall_seconds"] / old["wall_seconds"]
+        entry["baseline_wall_seconds"] = old["wall_seconds"]
+        entry["baseline_ratio"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{entry['scenario']} @ {entry['devices']} devices: "
+                f"{old['wall_seconds']}s -> {entry['wall_seconds']}s ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+        help="Inventory sizes in devices (default: 10 100 1000 10000)",
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS),
+        help="Scenarios to run (default: all)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario (median is reported)")
+    parser.add_argument("--output", help="Write results JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="Allowed wall-time growth vs the baseline before failing (default: 0.25)",
+    )
+    args = parser.parse_args(argv)
+
+    if shutil.which("kcl") is None:
+        sys.exit("kcl is not on PATH")
+
+    results = {
+        "schema": RESULTS_SCHEMA,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "project_version": project_version(),
+        "git_revision": git_revision(),
+        "kcl_version": kcl_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": [],
+    }
+
+    for devices in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="kcl-bench-") as tmp:
+            module_dir = str(write_inventory(tmp, devices, unified=True))
+            for scenario in args.scenarios:
+                entry = {"devices": devices, "tunnels": devices, "services": devices * 2, "scenario": scenario}
+                entry.update(run_scenario(module_dir, SCENARIOS[scenario], args.repeat))
+                results["results"].append(entry)
+                print(
+                    f"{scenario:>10} @ {devices:>6} devices: "
+                    f"{entry['wall_seconds']:.3f}s, {entry['peak_rss_kib'] / 1024:.1f} MiB",
+                    file=sys.stderr,
+                )
+
+    regressions = []
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        results["regressions"] = regressions
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if regressions:
+        sys.exit("Regressions:\n  " + "\n  ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark: yq YAML-to-JSON conversion vs native KCL JSON output.
+
+Compares the two ways of turning `kcl run main.k` into unifi.json and
+cloudflare.json on a synthetic inventory (5,000 devices by default):
+
+  yq      kcl run main.k (YAML) -> file -> yq eval .<key> -> yq -o=json, per provider
+  json    kcl run main.k --format json -o file -> json.loads + split in-process
+
+The split step alone (json_split) and the YAML-in-Python variants
+(CSafeLoader vs SafeLoader) are also timed to show the conversion cost
+without the KCL evaluation. The yq path is skipped when yq
+(mikefarah/yq v4) is not on PATH.
+
+Usage:
+    python benchmarks/bench_kcl_output.py --devices 5000 --repeat 3
+"""
+
+import argparse
+import importlib.util
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from synthetic_inventory import REPO_ROOT, write_inventory  # noqa: E402
+
+# Load kcl_output.py directly without going through the package __init__.py
+_spec = importlib.util.spec_from_file_location(
+    "kcl_output", REPO_ROOT / "src" / "main" / "kcl_output.py"
+)
+kcl_output = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(kcl_output)
+
+OUTPUT_KEYS = ["unifi_output", "cf_output"]
+
+
+def run(args, cwd):
+    """Run a command and return stdout, raising on failure."""
+    return subprocess.run(args, cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+def timed(fn, repeat):
+    """Return (median seconds, last result) over repeat runs."""
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def have_yq():
+    """Return True if the Go yq (mikefarah/yq v4) used by the old toolchain is on PATH."""
+    if shutil.which("yq") is None:
+        return False
+    version = subprocess.run(["yq", "--version"], capture_output=True, text=True).stdout
+    return "mikefarah" in version or " v4." in version
+
+
+def yq_path(module_dir):
+    """Legacy path: YAML stdout, then two yq processes per provider."""
+    yaml_out = run(["kcl", "run", "main.k"], module_dir)
+    yaml_file = Path(module_dir) / "kcl-output.yaml"
+    yaml_file.write_text(yaml_out)
+    outputs = {}
+    for key in OUTPUT_KEYS:
+        section = Path(module_dir) / f"{key}.yaml"
+        section.write_text(run(["yq", "eval", f".{key}", str(yaml_file)], module_dir))
+        outputs[key] = run(["yq", "eval", "-o=json", str(section)], module_dir)
+    return outputs
+
+
+def json_path(module_dir):
+    """New path: KCL writes JSON, the document is split in-process."""
+    json_file = Path(module_dir) / "kcl-output.json"
+    run(["kcl", "run", "main.k", "--format", "json", "-o", str(json_file)], module_dir)
+    document = kcl_output.load_kcl_document(json_file.read_text())
+    return kcl_output.split_kcl_outputs(document, OUTPUT_KEYS)
+
+
+def yaml_split(text, loader):
+    """Split a YAML document in-process with the given PyYAML loader."""
+    document = yaml.load(text, Loader=loader)
+    return kcl_output.split_kcl_outputs(document, OUTPUT_KEYS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=5000, help="Inventory size (default: 5000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (median is reported)")
+    args = parser.parse_args(argv)
+
+    if shutil.which("kcl") is None:
+        sys.exit("kcl is not on PATH")
+
+    with tempfile.TemporaryDirectory(prefix="kcl-bench-") as tmp:
+        module_dir = str(write_inventory(tmp, args.devices))
+        results = {"devices": args.devices, "repeat": args.repeat, "seconds": {}}
+
+        json_seconds, json_outputs = timed(lambda: json_path(module_dir), args.repeat)
+        results["seconds"]["json"] = round(json_seconds, 3)
+
+        if have_yq():
+            yq_seconds, yq_outputs = timed(lambda: yq_path(module_dir), args.repeat)
+            results["seconds"]["yq"] = round(yq_seconds, 3)
+            results["outputs_match"] = all(
+                json.loads(yq_outputs[key]) == json.loads(json_outputs[key]) for key in OUTPUT_KEYS
+            )
+        else:
+            results["seconds"]["yq"] = None
+
+        # Conversion cost alone, excluding the KCL evaluation
+        json_text = (Path(module_dir) / "kcl-output.json").read_text()
+        seconds, _ = timed(
+            lambda: kcl_output.split_kcl_outputs(kcl_output.load_kcl_document(json_text), OUTPUT_KEYS),
+            args.repeat,
+        )
+        results["seconds"]["json_split"] = round(seconds, 3)
+
+        # In-process YAML splitting, for runners that cannot use --format json
+        yaml_text = run(["kcl", "run", "main.k"], module_dir)
+        results["yaml_bytes"] = len(yaml_text.encode("utf-8"))
+        for name, loader in (("yaml_csafe", getattr(yaml, "CSafeLoader", None)), ("yaml_safe", yaml.SafeLoader)):
+            if loader is None:
+                results["seconds"][name] = None
+                continue
+            seconds, _ = timed(lambda: yaml_split(yaml_text, loader), args.repeat)
+            results["seconds"][name] = round(seconds, 3)
+
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
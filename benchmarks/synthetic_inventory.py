@@ -0,0 +1,159 @@
+"""Synthetic KCL inventories for benchmarking unifi-cloudflare-glue generation.
+
+Renders a standalone KCL module (kcl.mod + main.k) with N devices that
+depends on this repository through a local path dependency, so benchmarks
+exercise the real schemas and generators without network access.
+
+Each device gets one endpoint, an internal-only service and a service
+published through a Cloudflare tunnel, mirroring examples/homelab-media-stack.
+The same inventory can be rendered against the generators directly or
+through the UnifiedConfig entry points of the root main.k.
+"""
+
+import os
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def device_mac(index: int) -> str:
+    """Return a unique, normalized MAC address for a device index."""
+    raw = f"{0x020000000000 + index:012x}"
+    return ":".join(raw[i:i + 2] for i in range(0, 12, 2))
+
+
+def render_kcl_mod(repo_root: Path = REPO_ROOT) -> str:
+    """Render a kcl.mod that resolves unifi_cloudflare_glue from the working tree."""
+    return (
+        "[package]\n"
+        'name = "synthetic_inventory"\n'
+        'edition = "v0.11.1"\n'
+        'version = "0.0.1"\n'
+        "\n"
+        "[dependencies]\n"
+        f'unifi_cloudflare_glue = {{ path = "{repo_root}" }}\n'
+    )
+
+
+def _render_config(devices: int, zone_name: str) -> list[str]:
+    """Render the _unifi_config and _cloudflare_config blocks for N devices."""
+    entities = []
+    tunnels = []
+    for i in range(devices):
+        mac = device_mac(i)
+        host = f"host-{i:05d}"
+        entities.append(
+            f"""    unifi.UniFiEntity {{
+        friendly_hostname = "{host}"
+        domain = "internal.lan"
+        endpoints = [unifi.UniFiEndpoint {{ mac_address = "{mac}", nic_name = "eth0" }}]
+        services = [
+            unifi.Service {{ name = "ssh", port = 22, protocol = "tcp", distribution = "unifi_only", internal_hostname = "ssh-{i:05d}.internal.lan" }}
+            unifi.Service {{ name = "web", port = 8080, protocol = "http", distribution = "both", internal_hostname = "web-{i:05d}.internal.lan", public_hostname = "web-{i:05d}.{zone_name}" }}
+        ]
+    }}"""
+        )
+        tunnels.append(
+            f"""    "{mac}": cloudflare.CloudflareTunnel {{
+        tunnel_name = "{host}"
+        mac_address = "{mac}"
+        services = [cloudflare.TunnelService {{ public_hostname = "web-{i:05d}.{zone_name}", local_service_url = "http://web-{i:05d}.internal.lan:8080" }}]
+    }}"""
+        )
+
+    return [
+        "_unifi_config = unifi.UniFiConfig {",
+        '    default_domain = "internal.lan"',
+        '    unifi_controller = unifi.UniFiController { host = "unifi.internal.lan" }',
+        "    devices = [",
+        "\n".join(entities),
+        "    ]",
+        "}",
+        "",
+        "_cloudflare_config = cloudflare.CloudflareConfig {",
+        f'    zone_name = "{zone_name}"',
+        '    account_id = "1234567890abcdef1234567890abcdef"',
+        "    tunnels = {",
+        "\n".join(tunnels),
+        "    }",
+        "}",
+        "",
+    ]
+
+
+def render_main_k(devices: int, zone_name: str = "example.com") -> str:
+    """
+    Render main.k for an inventory of the given size.
+
+    Args:
+        devices: Number of devices (each with one tunnel)
+        zone_name: Cloudflare zone for public hostnames
+
+    Returns:
+        KCL source exporting unifi_output and cf_output
+    """
+    return "\n".join([
+        f"# Synthetic inventory: {devices} devices",
+        "import unifi_cloudflare_glue.schemas.unifi as unifi",
+        "import unifi_cloudflare_glue.schemas.cloudflare as cloudflare",
+        "import unifi_cloudflare_glue.generators.unifi as unifi_gen",
+        "import unifi_cloudflare_glue.generators.cloudflare as cf_gen",
+        "",
+        *_render_config(devices, zone_name),
+        "unifi_output = unifi_gen.generate_unifi_config(_unifi_config)",
+        "cf_output = cf_gen.generate_cloudflare_config(_cloudflare_config)",
+        "",
+    ])
+
+
+def render_unified_main_k(devices: int, zone_name: str = "example.com") -> str:
+    """
+    Render main.k that runs the UnifiedConfig entry points of the root main.k.
+
+    `-D mode=validate` calls validate_only(); any other mode calls generate(),
+    which also honors `-D component=unifi|cloudflare`.
+
+    Args:
+        devices: Number of devices (each with one tunnel)
+        zone_name: Cloudflare zone for public hostnames
+
+    Returns:
+        KCL source exporting result
+    """
+    return "\n".join([
+        f"# Synthetic UnifiedConfig: {devices} devices",
+        "import unifi_cloudflare_glue.main as glue",
+        "import unifi_cloudflare_glue.schemas.unifi as unifi",
+        "import unifi_cloudflare_glue.schemas.cloudflare as cloudflare",
+        "",
+        *_render_config(devices, zone_name),
+        "_config = glue.UnifiedConfig {",
+        "    unifi = _unifi_config",
+        "    cloudflare = _cloudflare_config",
+        "}",
+        "",
+        '_mode = option("mode", type="str", default="generate")',
+        'result = glue.validate_only(_config) if _mode == "validate" else glue.generate(_config)',
+        "",
+    ])
+
+
+def write_inventory(directory: os.PathLike, devices: int, unified: bool = False) -> Path:
+    """
+    Write a synthetic KCL module to directory.
+
+    Args:
+        directory: Target directory (created if missing)
+        devices: Number of devices to render
+        unified: Render the UnifiedConfig entry point (render_unified_main_k)
+            instead of calling the generators directly
+
+    Returns:
+        Path to the module directory
+    """
+    module_dir = Path(directory)
+    module_dir.mkdir(parents=True, exist_ok=True)
+    render = render_unified_main_k if unified else render_main_k
+    (module_dir / "kcl.mod").write_text(render_kcl_mod())
+    (module_dir / "main.k").write_text(render(devices))
+    return module_dir
@@ -0,0 +1,127 @@
+"""cloudflared config bundles for edge devices.
+
+export_cloudflared_configs writes one directory per tunnel, named after the
+MAC address with hyphens (aa-bb-cc-dd-ee-01/), holding:
+- config.yml: tunnel ID, credentials-file and the ingress rules of the
+  tunnel in the generated cloudflare.json (same rules the cloudflare-tunnel
+  module configures, ending with the http_status:404 catch-all)
+- <tunnel-id>.json: the credentials file cloudflared reads
+
+plus a manifest.json listing every exported tunnel, so the bundle can be
+pushed to a whole fleet in one step. Files are produced in one pass over
+the tunnel records from tunnel_secrets.tunnel_records().
+"""
+
+import json
+from typing import Any, Iterable, Iterator
+
+import yaml
+
+
+# Where config.yml expects the credentials file on the device
+DEFAULT_CREDENTIALS_DIR = "/etc/cloudflared"
+
+# File modes in the bundle: credentials are readable by the owner only
+FILE_MODE = 0o644
+CREDENTIALS_MODE = 0o600
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = "unifi-cloudflare-glue-cloudflared-bundle/v1"
+
+
+def device_dir(mac: str) -> str:
+    """Directory name of a tunnel's bundle (MAC address with hyphens)."""
+    return mac.lower().replace(":", "-")
+
+
+def ingress_rules(tunnel: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Build the cloudflared ingress rules for one cloudflare.json tunnel.
+
+    Args:
+        tunnel: Entry of cloudflare.json `tunnels`
+
+    Returns:
+        One rule per service followed by the http_status:404 catch-all
+    """
+    rules = []
+    for service in tunnel.get("services") or []:
+        rule: dict[str, Any] = {
+            "hostname": service["public_hostname"],
+            "service": service["local_service_url"],
+        }
+        if service.get("no_tls_verify"):
+            rule["originRequest"] = {"noTLSVerify": True}
+        rules.append(rule)
+    rules.append({"service": "http_status:404"})
+    return rules
+
+
+def cloudflared_config(tunnel_id: str, tunnel: dict[str, Any], credentials_dir: str = DEFAULT_CREDENTIALS_DIR) -> str:
+    """
+    Render the config.yml of one tunnel.
+
+    Args:
+        tunnel_id: Tunnel UUID from the state
+        tunnel: Entry of cloudflare.json `tunnels`
+        credentials_dir: Directory of the credentials file on the device
+
+    Returns:
+        YAML document for `cloudflared tunnel --config config.yml run`
+    """
+    config = {
+        "tunnel": tunnel_id,
+        "credentials-file": f"{credentials_dir.rstrip('/')}/{tunnel_id}.json",
+        "ingress": ingress_rules(tunnel),
+    }
+    return yaml.safe_dump(config, sort_keys=False, default_flow_style=False)
+
+
+def bundle_files(
+    records: Iterable[dict[str, Any]],
+    cloudflare_config: dict[str, Any],
+    credentials_dir: str = DEFAULT_CREDENTIALS_DIR,
+) -> Iterator[tuple[str, str, int]]:
+    """
+    Yield (path, contents, mode) of every file in the bundle, manifest last.
+
+    Tunnels in the state but not in cloudflare.json (removed from the
+    configuration, not yet destroyed) have no ingress to export; they are
+    listed under `skipped` in the manifest.
+
+    Args:
+        records: Tunnel records from tunnel_records()
+        cloudflare_config: Generated cloudflare.json
+        credentials_dir: Directory of the credentials file on the device
+
+    Returns:
+        Iterator over relative file paths, contents and file modes
+    """
+    tunnels = {mac.lower(): tunnel for mac, tunnel in (cloudflare_config.get("tunnels") or {}).items()}
+    exported = []
+    skipped = []
+    for record in records:
+        tunnel = tunnels.get(record["mac"].lower())
+        if tunnel is None:
+            skipped.append(record["mac"])
+            continue
+        directory = device_dir(record["mac"])
+        tunnel_id = record["tunnel_id"]
+        yield f"{directory}/config.yml", cloudflared_config(tunnel_id, tunnel, credentials_dir), FILE_MODE
+        yield f"{directory}/{tunnel_id}.json", json.dumps(record["credentials"], indent=2) + "\n", CREDENTIALS_MODE
+        exported.append({
+            "mac": record["mac"],
+            "directory": directory,
+            "tunnel_id": tunnel_id,
+            "tunnel_name": record["tunnel_name"],
+            "hostnames": [service["public_hostname"] for service in tunnel.get("services") or []],
+        })
+
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "zone_name": cloudflare_config.get("zone_name"),
+        "count": len(exported),
+        "tunnels": exported,
+        "skipped": skipped,
+    }
+    yield MANIFEST_FILE, json.dumps(manifest, indent=2) + "\n", FILE_MODE
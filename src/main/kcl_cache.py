@@ -0,0 +1,185 @@
+"""Content-addressed cache helpers for KCL configuration generation.
+
+Generation results are stored in a Dagger cache volume under a key derived
+from the KCL sources, the KCL version and the toolchain image. These helpers compute that key and
+build the shell snippets that read and write cache entries, so the logic can
+be tested without a Dagger engine.
+"""
+
+import hashlib
+import shlex
+import tomllib
+
+
+# Files that influence `kcl run main.k` output (everything else is ignored)
+KCL_SOURCE_PATTERNS = ["**/*.k", "kcl.mod", "kcl.mod.lock"]
+
+# Files that determine which KCL dependencies `kcl mod update` resolves
+KCL_DEPENDENCY_PATTERNS = ["kcl.mod", "kcl.mod.lock"]
+
+# Marker written into the package cache once `kcl mod update` has succeeded
+DEPENDENCY_MARKER = ".deps-resolved"
+
+
+def toolchain_identity(tarball_digest: str = "", image_ref: str = "") -> str:
+    """
+    Identify the KCL toolchain image for the generation cache key.
+
+    Args:
+        tarball_digest: Content digest of --kcl-toolchain-tarball (if given)
+        image_ref: --kcl-toolchain-image reference (if given)
+
+    Returns:
+        "tarball:<digest>", "image:<ref>", or "builtin" for the toolchain
+        built from the KCL version
+    """
+    if tarball_digest:
+        return f"tarball:{tarball_digest}"
+    if image_ref:
+        return f"image:{image_ref}"
+    return "builtin"
+
+
+def generation_cache_key(
+    source_digest: str, kcl_version: str, component: str = "all", toolchain: str = "builtin"
+) -> str:
+    """
+    Compute the cache key for a KCL generation result.
+
+    Args:
+        source_digest: Content digest of the KCL sources matching KCL_SOURCE_PATTERNS
+        kcl_version: KCL version used for generation
+        component: KCL component selector ("all", "unifi" or "cloudflare"); scoped
+            runs skip the other provider's validators, so their results are kept apart
+        toolchain: Toolchain identity from toolchain_identity(); a different
+            prebuilt image under the same version string must not reuse results
+
+    Returns:
+        Hex-encoded SHA-256 key
+    """
+    material = (
+        f"kcl-generation:v1\nsource={source_digest}\nkcl={kcl_version}\ncomponent={component}\n"
+        f"toolchain={toolchain}\n"
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def cache_lookup_script(cache_root: str, key: str, filenames: list[str], out_dir: str) -> str:
+    """
+    Build a shell script that restores cached outputs into out_dir.
+
+    The script prints "hit" when every requested file was present and copied,
+    and "miss" otherwise (in which case out_dir may be empty).
+
+    Args:
+        cache_root: Mount point of the cache volume
+        key: Cache key from generation_cache_key()
+        filenames: Output files that must all be present (e.g. unifi.json)
+        out_dir: Directory to copy cached files into
+
+    Returns:
+        POSIX shell script
+    """
+    entry = shlex.quote(f"{cache_root}/{key}")
+    out = shlex.quote(out_dir)
+    checks = " && ".join(f"[ -f {entry}/{shlex.quote(name)} ]" for name in filenames)
+    copies = " && ".join(f"cp {entry}/{shlex.quote(name)} {out}/" for name in filenames)
+    return f"mkdir -p {out} && if {checks} && {copies}; then echo hit; else echo miss; fi"
+
+
+def cache_store_script(cache_root: str, key: str, src_dir: str) -> str:
+    """
+    Build a shell script that stores generated outputs under a cache key.
+
+    Each file is written to a temporary name and renamed into place, so
+    concurrent pipelines never observe a partially written entry.
+
+    Args:
+        cache_root: Mount point of the cache volume
+        key: Cache key from generation_cache_key()
+        src_dir: Directory holding the generated files
+
+    Returns:
+        POSIX shell script
+    """
+    entry = shlex.quote(f"{cache_root}/{key}")
+    src = shlex.quote(src_dir)
+    return (
+        f"mkdir -p {entry} && for f in {src}/*; do "
+        f'name=$(basename "$f"); '
+        f'cp "$f" {entry}/".$name.$$" && mv {entry}/".$name.$$" {entry}/"$name" || exit 1; '
+        f"done"
+    )
+
+
+def dependency_cache_volume_name(dependency_digest: str) -> str:
+    """
+    Name the cache volume holding KCL packages for one dependency lock.
+
+    Args:
+        dependency_digest: Content digest of kcl.mod and kcl.mod.lock
+
+    Returns:
+        Cache volume name; changes whenever the lock file changes
+    """
+    digest = hashlib.sha256(dependency_digest.encode("utf-8")).hexdigest()
+    return f"unifi-cloudflare-glue-kcl-deps-{digest[:16]}"
+
+
+def remote_dependencies(mod_content: str) -> list[str]:
+    """
+    List the kcl.mod dependencies that `kcl mod update` has to download.
+
+    Local path dependencies are skipped because they are read straight from
+    the source tree.
+
+    Args:
+        mod_content: Raw kcl.mod contents (TOML)
+
+    Returns:
+        Sorted descriptions such as "unifi_cloudflare_glue (git https://... tag v0.12.2)"
+
+    Raises:
+        ValueError: If kcl.mod is not valid TOML
+    """
+    try:
+        mod = tomllib.loads(mod_content)
+    except tomllib.TOMLDecodeError as e:
+        raise ValueError(f"Invalid kcl.mod: {e}") from e
+
+    deps = []
+    for name, spec in mod.get("dependencies", {}).items():
+        if isinstance(spec, str):
+            deps.append(f"{name} (registry {spec})")
+        elif "path" in spec:
+            continue
+        elif "git" in spec:
+            ref = spec.get("tag") or spec.get("commit") or spec.get("branch") or "default branch"
+            deps.append(f"{name} (git {spec['git']} {ref})")
+        elif "oci" in spec:
+            deps.append(f"{name} (oci {spec['oci']} {spec.get('tag', 'latest')})")
+        else:
+            deps.append(f"{name} (registry {spec.get('version', 'latest')})")
+    return sorted(deps)
+
+
+def dependency_sync_script(pkg_path: str, offline: bool = False) -> str:
+    """
+    Build a shell script that resolves KCL dependencies into the package cache.
+
+    Online, `kcl mod update` runs only when the cache has not been populated
+    for this lock file yet, and the marker is written after it succeeds.
+    Offline, the script never touches the network and exits with status 3
+    if the cache was never populated.
+
+    Args:
+        pkg_path: KCL_PKG_PATH mount point of the dependency cache volume
+        offline: Fail instead of running `kcl mod update`
+
+    Returns:
+        POSIX shell script printing "cached" or "updated"
+    """
+    marker = shlex.quote(f"{pkg_path}/{DEPENDENCY_MARKER}")
+    if offline:
+        return f"if [ -f {marker} ]; then echo cached; else exit 3; fi"
+    return f"if [ -f {marker} ]; then echo cached; else kcl mod update && touch {marker} && echo updated; fi"
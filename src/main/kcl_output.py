@@ -0,0 +1,68 @@
+"""In-process handling of `kcl run main.k` output.
+
+main.k is evaluated once with `--format json` and the provider sections
+(unifi_output, cf_output) are split out here, instead of piping the YAML
+document through yq once per provider.
+"""
+
+import json
+from typing import Any, Optional
+
+import yaml
+
+
+# libyaml-backed loader when PyYAML was built with it; the pure-Python
+# loader is an order of magnitude slower on large documents
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_kcl_document(text: str, output_format: str = "json") -> dict[str, Any]:
+    """
+    Parse the top-level document produced by `kcl run`.
+
+    Args:
+        text: Raw output of `kcl run main.k`
+        output_format: "json" (from --format json) or "yaml" (KCL's default)
+
+    Returns:
+        Top-level KCL variables as a dictionary
+
+    Raises:
+        ValueError: If the output cannot be parsed or is not a mapping
+    """
+    try:
+        if output_format == "json":
+            document = json.loads(text)
+        else:
+            document = yaml.load(text, Loader=YAML_LOADER)
+    except (json.JSONDecodeError, yaml.YAMLError) as e:
+        raise ValueError(f"Could not parse KCL {output_format} output: {e}") from e
+
+    if document is None:
+        return {}
+    if not isinstance(document, dict):
+        raise ValueError(
+            f"KCL output must be a mapping of variables, got {type(document).__name__}"
+        )
+    return document
+
+
+def split_kcl_outputs(
+    document: dict[str, Any], output_keys: list[str]
+) -> dict[str, Optional[str]]:
+    """
+    Render each requested output variable as its own JSON document.
+
+    Args:
+        document: Parsed KCL output from load_kcl_document()
+        output_keys: Variables to extract (e.g. ["unifi_output", "cf_output"])
+
+    Returns:
+        Mapping of output key to JSON text, or None when the variable is
+        missing or null
+    """
+    outputs = {}
+    for key in output_keys:
+        value = document.get(key)
+        outputs[key] = None if value is None else json.dumps(value, indent=2) + "\n"
+    return outputs
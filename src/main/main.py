@@ -11,10 +11,67 @@ from typing import Annotated, Optional
 import random
 import string
 import json
+import os
 import shlex
+import tempfile
 import time
 
 from .backend_config import process_backend_config_content
+from .cloudflared_bundle import DEFAULT_CREDENTIALS_DIR, bundle_files
+from .kcl_cache import (
+    KCL_DEPENDENCY_PATTERNS,
+    KCL_SOURCE_PATTERNS,
+    cache_lookup_script,
+    cache_store_script,
+    dependency_cache_volume_name,
+    dependency_sync_script,
+    generation_cache_key,
+    remote_dependencies,
+    toolchain_identity,
+)
+from .kcl_output import load_kcl_document, split_kcl_outputs
+from .plan_summary import DriftReport, PlanSummary, stream_plan
+from .plan_text import PlanTextRenderer
+from .provider_mirror import (
+    CLI_CONFIG_PATH,
+    MIRROR_PATH,
+    LOCK_FILE,
+    MIRRORED_MODULES,
+    locked_providers,
+    mirror_cli_config,
+    select_provider_archives,
+)
+from .terraform_plan import (
+    PLAN_BINARY_FILE,
+    PLAN_STATE_FILE,
+    load_plan_state,
+    render_plan_state,
+    stale_plan_reason,
+    state_identity,
+)
+from .terraform_cache import (
+    PLUGIN_CACHE_DIR,
+    init_exec_command,
+    plugin_cache_volume_name,
+    state_sync_script,
+)
+from .terraform_pipeline import PipelineStepError, TerraformPipeline, exec_error_details
+from .terraform_targets import (
+    GLUE_CLOUDFLARE_PREFIX,
+    GLUE_UNIFI_PREFIX,
+    normalize_mac,
+    resolve_targets,
+    terraform_run_options,
+)
+from .tunnel_secrets import (
+    LOCAL_STATE_FILE,
+    MissingOutputsError,
+    human_lines,
+    load_state,
+    ndjson_lines,
+    state_tunnel_secrets,
+    tunnel_records,
+)
 
 
 async def _process_backend_config(backend_config_file: dagger.File) -> tuple[str, str]:
@@ -37,10 +94,123 @@ async def _process_backend_config(backend_config_file: dagger.File) -> tuple[str
         return ("", '.tfbackend')
 
 
+def _pipeline_failure_message(error: PipelineStepError, backend_type: str = "local") -> str:
+    """
+    Build the error message for a failed TerraformPipeline step.
+
+    Init failures include backend troubleshooting hints for remote backends;
+    apply/destroy/plan failures include exit code, stdout and stderr.
+
+    Args:
+        error: Failure raised by TerraformPipeline
+        backend_type: Backend type in use ("local" for none)
+
+    Returns:
+        Error message starting with "✗ Failed: "
+    """
+    step = error.step
+    if step.name == "init":
+        message = f"✗ Failed: {step.failure}\n{str(error.error)}"
+        if backend_type != "local":
+            message += (
+                "\n\nBackend configuration troubleshooting:\n"
+                "  - Verify backend config file is valid HCL\n"
+                "  - Check credentials in environment variables\n"
+                "  - Ensure backend infrastructure exists (bucket, table, etc.)"
+            )
+        return message
+    if step.name in ("apply", "destroy", "plan"):
+        return f"✗ Failed: {step.failure}\n{exec_error_details(error.error)}"
+    return f"✗ Failed: {step.failure}\n{str(error.error)}"
+
+
+async def _terraform_run_args(
+    parallelism: int,
+    refresh: bool,
+    targets: Optional[list[str]],
+    unifi_dir: Optional[dagger.Directory],
+    cloudflare_dir: Optional[dagger.Directory],
+    module_path: str = "glue",
+) -> list[str]:
+    """
+    Build the -parallelism, -refresh and -target arguments of deploy, plan and destroy.
+
+    Targets are resolved against the generated configurations mounted for
+    the run, so only devices and tunnels in scope can be targeted.
+
+    Args:
+        parallelism: Concurrent Terraform operations (0 keeps the default)
+        refresh: Whether Terraform refreshes state before planning
+        targets: MAC addresses and/or hostnames to limit the run to
+        unifi_dir: Directory holding unifi.json, None when UniFi is not in scope
+        cloudflare_dir: Directory holding cloudflare.json, None when Cloudflare is not in scope
+        module_path: Terraform module the run uses ("glue", "unifi-dns" or "cloudflare-tunnel")
+
+    Returns:
+        Arguments to append to the Terraform command
+
+    Raises:
+        ValueError: If parallelism is negative or a target matches nothing
+    """
+    addresses: list[str] = []
+    if targets:
+        unifi_text, cloudflare_text = await asyncio.gather(
+            unifi_dir.file("unifi.json").contents() if unifi_dir is not None else asyncio.sleep(0, ""),
+            cloudflare_dir.file("cloudflare.json").contents() if cloudflare_dir is not None else asyncio.sleep(0, ""),
+        )
+        glue = module_path == "glue"
+        addresses = resolve_targets(
+            targets,
+            json.loads(unifi_text) if unifi_text else None,
+            json.loads(cloudflare_text) if cloudflare_text else None,
+            unifi_prefix=GLUE_UNIFI_PREFIX if glue else "",
+            cloudflare_prefix=GLUE_CLOUDFLARE_PREFIX if glue else "",
+        )
+    return terraform_run_options(parallelism, refresh, addresses)
+
+
 # Custom exception for KCL generation errors
 class KCLGenerationError(Exception):
     """Raised when KCL configuration generation fails."""
-    pass
+
+    def __init__(self, message: str = "", component: str = ""):
+        super().__init__(message)
+        # Provider ("UniFi" or "Cloudflare") whose output failed; empty when shared
+        self.component = component
+
+
+# Cache volume holding content-addressed KCL generation results
+KCL_GENERATION_CACHE_VOLUME = "unifi-cloudflare-glue-kcl-generation"
+
+# KCL_PKG_PATH inside the toolchain container, backed by the dependency cache volume
+KCL_PKG_PATH = "/kcl-pkg"
+
+# main.k output variable, output file and error hints for each generated component
+_KCL_COMPONENTS = {
+    "unifi": {
+        "label": "UniFi",
+        "output_key": "unifi_output",
+        "filename": "unifi.json",
+        "example_import": "import unifi_cloudflare_glue.generators.unifi as unifi_gen",
+        "example_assign": "unifi_output = unifi_gen.generate_with_output(config)",
+    },
+    "cloudflare": {
+        "label": "Cloudflare",
+        "output_key": "cf_output",
+        "filename": "cloudflare.json",
+        "example_import": "import unifi_cloudflare_glue.generators.cloudflare as cf_gen",
+        "example_assign": "cf_output = cf_gen.generate_with_output(config)",
+    },
+}
+
+
+def _kcl_component_selector(include_unifi: bool, include_cloudflare: bool) -> str:
+    """Return the `-D component=` value for the requested provider outputs."""
+    if include_unifi and not include_cloudflare:
+        return "unifi"
+    if include_cloudflare and not include_unifi:
+        return "cloudflare"
+    return "all"
 
 
 @object_type
@@ -80,11 +250,157 @@ class UnifiCloudflareGlue:
         except Exception as e:
             return f"✗ Failed: Could not read VERSION file: {str(e)}"
 
+    @function
+    async def kcl_toolchain(
+        self,
+        kcl_version: Annotated[str, Doc("KCL version to use")] = "latest",
+    ) -> dagger.Container:
+        """
+        Build the KCL generator toolchain image.
+
+        The toolchain is built once per kcl_version and shared by the config
+        generators and by deploy/plan/destroy. Generation only needs the kcl
+        binary: outputs are emitted as JSON and split in-process, so no extra
+        packages are installed. Export the image to seed air-gapped runners,
+        then pass it back with --kcl-toolchain-tarball (or push it to a local
+        registry and use --kcl-toolchain-image).
+
+        Args:
+            kcl_version: KCL version to use (default: "latest")
+
+        Returns:
+            dagger.Container with kcl on the PATH
+
+        Example:
+            dagger call kcl-toolchain --kcl-version=0.11.0 export --path=./kcl-toolchain.tar
+        """
+        return dagger.dag.container().from_(f"kcllang/kcl:{kcl_version}")
+
+    async def _kcl_toolchain_container(
+        self,
+        kcl_version: str,
+        kcl_toolchain_tarball: Optional[dagger.File] = None,
+        kcl_toolchain_image: str = "",
+    ) -> dagger.Container:
+        """
+        Resolve the KCL toolchain container used for configuration generation.
+
+        A prebuilt toolchain takes precedence so generation works without
+        network access: an image tarball is imported first, then a registry
+        reference, and only otherwise is the toolchain built from scratch.
+
+        Args:
+            kcl_version: KCL version to use when building the toolchain
+            kcl_toolchain_tarball: Optional image tarball exported from kcl-toolchain
+            kcl_toolchain_image: Optional image reference (e.g., a local registry)
+
+        Returns:
+            dagger.Container with kcl available
+        """
+        if kcl_toolchain_tarball is not None:
+            return dagger.dag.container().import_(kcl_toolchain_tarball)
+        if kcl_toolchain_image:
+            return dagger.dag.container().from_(kcl_toolchain_image)
+        return await self.kcl_toolchain(kcl_version)
+
+    @function
+    async def terraform_mirror_image(
+        self,
+        provider_archives: Annotated[dagger.Directory, Doc("Directory of provider archives (terraform-provider-<type>_<version>_<os>_<arch>.zip)")],
+        terraform_version: Annotated[str, Doc("Terraform version to use (e.g., '1.10.0' or 'latest')")] = "latest",
+    ) -> dagger.Container:
+        """
+        Build a Terraform image that installs providers from a local mirror.
+
+        The mirror holds every provider version pinned by the
+        .terraform.lock.hcl files of the glue, unifi-dns and cloudflare-tunnel
+        modules, including providers they only use implicitly (hashicorp/null)
+        and modules locked to different versions of the same provider. Each
+        lock file is checked against its module's versions.tf. The image's CLI
+        configuration has no direct installation method, so `terraform init`
+        never contacts the registry. Archives may be flat release zips or the
+        tree written by `terraform providers mirror`.
+
+        Args:
+            provider_archives: Directory of provider release archives
+            terraform_version: Terraform version to use (default: "latest")
+
+        Returns:
+            dagger.Container with the filesystem mirror and TF_CLI_CONFIG_FILE set
+
+        Raises:
+            ValueError: If a lock file does not cover versions.tf or a locked
+                version has no archive for the image platform
+
+        Example:
+            dagger call terraform-mirror-image --provider-archives=./providers \\
+                --terraform-version=1.10.0 export --path=./terraform-mirror.tar
+        """
+        ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
+        modules = dagger.dag.current_module().source().directory("terraform/modules")
+        module_files = {
+            module: (
+                await modules.file(f"{module}/versions.tf").contents(),
+                await modules.file(f"{module}/{LOCK_FILE}").contents(),
+            )
+            for module in MIRRORED_MODULES
+        }
+
+        try:
+            selected = select_provider_archives(
+                locked_providers(module_files),
+                await provider_archives.glob("**/terraform-provider-*.zip"),
+                await ctr.platform(),
+            )
+        except ValueError as e:
+            raise ValueError(f"✗ Failed: Could not build provider mirror\n{e}") from e
+
+        mirror = dagger.dag.directory()
+        for entry in selected:
+            mirror = mirror.with_file(entry["mirror_path"], provider_archives.file(entry["archive"]))
+
+        return (
+            ctr.with_directory(MIRROR_PATH, mirror)
+            .with_new_file(CLI_CONFIG_PATH, mirror_cli_config(sorted({entry["source"] for entry in selected})))
+            .with_env_variable("TF_CLI_CONFIG_FILE", CLI_CONFIG_PATH)
+        )
+
+    async def _terraform_container(
+        self,
+        terraform_version: str,
+        terraform_image_tarball: Optional[dagger.File] = None,
+        terraform_image: str = "",
+    ) -> dagger.Container:
+        """
+        Resolve the container used to run Terraform.
+
+        A prebuilt image from terraform-mirror-image takes precedence so
+        `terraform init` can run without registry access: an image tarball is
+        imported first, then a registry reference, and only otherwise is the
+        stock hashicorp/terraform image used.
+
+        Args:
+            terraform_version: Terraform version to use for the stock image
+            terraform_image_tarball: Optional image tarball exported from terraform-mirror-image
+            terraform_image: Optional image reference (e.g., a local registry)
+
+        Returns:
+            dagger.Container with terraform available
+        """
+        if terraform_image_tarball is not None:
+            return dagger.dag.container().import_(terraform_image_tarball)
+        if terraform_image:
+            return dagger.dag.container().from_(terraform_image)
+        return dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
+
     @function
     async def generate_unifi_config(
         self,
         source: Annotated[dagger.Directory, Doc("Source directory containing KCL configs")],
         kcl_version: Annotated[str, Doc("KCL version to use")] = "latest",
+        kcl_toolchain_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt KCL toolchain image tarball (from kcl-toolchain export)")] = None,
+        kcl_toolchain_image: Annotated[str, Doc("Prebuilt KCL toolchain image reference (e.g., a local registry)")] = "",
+        kcl_offline: Annotated[bool, Doc("Fail fast instead of downloading KCL dependencies missing from the cache")] = False,
     ) -> dagger.File:
         """
         Generate UniFi JSON configuration from KCL schemas.
@@ -95,6 +411,9 @@ class UnifiCloudflareGlue:
         Args:
             source: Directory containing KCL module (must have kcl.mod)
             kcl_version: KCL version to use (default: "latest")
+            kcl_toolchain_tarball: Prebuilt toolchain image tarball for offline runs (optional)
+            kcl_toolchain_image: Prebuilt toolchain image reference, e.g. a local registry (optional)
+            kcl_offline: Never download KCL dependencies; fail if they are not cached (default: False)
 
         Returns:
             dagger.File containing the generated UniFi JSON configuration
@@ -102,11 +421,243 @@ class UnifiCloudflareGlue:
         Example:
             dagger call generate-unifi-config --source=./kcl export --path=./unifi.json
         """
-        # Check for kcl.mod
+        config_dir, _ = await self._generate_configs_cached(
+            source,
+            kcl_version,
+            kcl_toolchain_tarball,
+            kcl_toolchain_image,
+            kcl_offline=kcl_offline,
+            include_cloudflare=False,
+        )
+        return config_dir.file("unifi.json")
+
+    @function
+    async def generate_configs(
+        self,
+        source: Annotated[dagger.Directory, Doc("Source directory containing KCL configs")],
+        kcl_version: Annotated[str, Doc("KCL version to use")] = "latest",
+        kcl_toolchain_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt KCL toolchain image tarball (from kcl-toolchain export)")] = None,
+        kcl_toolchain_image: Annotated[str, Doc("Prebuilt KCL toolchain image reference (e.g., a local registry)")] = "",
+        kcl_offline: Annotated[bool, Doc("Fail fast instead of downloading KCL dependencies missing from the cache")] = False,
+    ) -> dagger.Directory:
+        """
+        Generate both UniFi and Cloudflare JSON configurations in a single pass.
+
+        main.k is evaluated once and both unifi_output and cf_output are
+        extracted from the same KCL output, instead of running the full
+        module once per provider.
+
+        Args:
+            source: Directory containing KCL module (must have kcl.mod)
+            kcl_version: KCL version to use (default: "latest")
+            kcl_toolchain_tarball: Prebuilt toolchain image tarball for offline runs (optional)
+            kcl_toolchain_image: Prebuilt toolchain image reference, e.g. a local registry (optional)
+            kcl_offline: Never download KCL dependencies; fail if they are not cached (default: False)
+
+        Returns:
+            dagger.Directory containing unifi.json and cloudflare.json
+
+        Example:
+            dagger call generate-configs --source=./kcl export --path=./output
+        """
+        config_dir, _ = await self._generate_configs_cached(
+            source, kcl_version, kcl_toolchain_tarball, kcl_toolchain_image, kcl_offline=kcl_offline
+        )
+        return config_dir
+
+    async def _generate_configs_cached(
+        self,
+        source: dagger.Directory,
+        kcl_version: str,
+        kcl_toolchain_tarball: Optional[dagger.File] = None,
+        kcl_toolchain_image: str = "",
+        kcl_offline: bool = False,
+        include_unifi: bool = True,
+        include_cloudflare: bool = True,
+    ) -> tuple[dagger.Directory, str]:
+        """
+        Generate provider configs, reusing a previous result for identical sources.
+
+        Results are stored in a cache volume keyed on the digest of the KCL
+        sources (*.k, kcl.mod, kcl.mod.lock), the KCL version and the toolchain
+        (tarball digest or image reference when a prebuilt one is given). Unrelated
+        files in the source directory and --cache-buster do not affect the
+        key, so unchanged configurations never re-run KCL.
+
+        Args:
+            source: Directory containing KCL module (must have kcl.mod)
+            kcl_version: KCL version to use
+            kcl_toolchain_tarball: Prebuilt toolchain image tarball (optional)
+            kcl_toolchain_image: Prebuilt toolchain image reference (optional)
+            kcl_offline: Fail instead of downloading missing KCL dependencies
+            include_unifi: Produce unifi.json
+            include_cloudflare: Produce cloudflare.json
+
+        Returns:
+            Tuple of (directory with the requested JSON files, "hit" or "miss")
+
+        Raises:
+            KCLGenerationError: If generation is required and fails
+        """
+        filenames = [
+            _KCL_COMPONENTS[name]["filename"]
+            for name, included in (("unifi", include_unifi), ("cloudflare", include_cloudflare))
+            if included
+        ]
+
+        kcl_sources = dagger.dag.directory().with_directory("/", source, include=KCL_SOURCE_PATTERNS)
+        toolchain_tarball_digest = ""
+        if kcl_toolchain_tarball is not None:
+            toolchain_tarball_digest = await kcl_toolchain_tarball.digest()
+        cache_key = generation_cache_key(
+            await kcl_sources.digest(),
+            kcl_version,
+            _kcl_component_selector(include_unifi, include_cloudflare),
+            toolchain_identity(toolchain_tarball_digest, kcl_toolchain_image),
+        )
+
+        toolchain = await self._kcl_toolchain_container(
+            kcl_version, kcl_toolchain_tarball, kcl_toolchain_image
+        )
+        cache_ctr = (
+            toolchain
+            .with_mounted_cache(
+                "/kcl-cache",
+                dagger.dag.cache_volume(KCL_GENERATION_CACHE_VOLUME),
+                sharing=dagger.CacheSharingMode.SHARED,
+            )
+            # Cache volume contents are not part of Dagger's exec cache key,
+            # so always re-run the lookup instead of replaying an old answer
+            .with_env_variable("KCL_CACHE_NONCE", str(time.time_ns()))
+        )
+
+        try:
+            lookup_ctr = cache_ctr.with_exec(
+                ["sh", "-c", cache_lookup_script("/kcl-cache", cache_key, filenames, "/kcl-out")]
+            )
+            if (await lookup_ctr.stdout()).strip() == "hit":
+                return lookup_ctr.directory("/kcl-out"), "hit"
+        except dagger.ExecError:
+            # An unreadable cache entry is treated as a miss
+            pass
+
+        config_dir = await self._generate_configs(
+            source,
+            kcl_version,
+            kcl_toolchain_tarball,
+            kcl_toolchain_image,
+            kcl_offline=kcl_offline,
+            include_unifi=include_unifi,
+            include_cloudflare=include_cloudflare,
+        )
+
         try:
-            mod_file = source.file("kcl.mod")
-            _ = await mod_file.contents()
-        except Exception:
+            await (
+                cache_ctr
+                .with_directory("/kcl-out", config_dir)
+                .with_exec(["sh", "-c", cache_store_script("/kcl-cache", cache_key, "/kcl-out")])
+                .sync()
+            )
+        except dagger.ExecError:
+            # A failed cache write only costs a regeneration next time
+            pass
+
+        return config_dir, "miss"
+
+    async def _generate_configs_for_terraform(
+        self,
+        terraform_ctr: dagger.Container,
+        source: dagger.Directory,
+        kcl_version: str,
+        kcl_toolchain_tarball: Optional[dagger.File] = None,
+        kcl_toolchain_image: str = "",
+        kcl_offline: bool = False,
+        include_unifi: bool = True,
+        include_cloudflare: bool = True,
+    ) -> tuple[dagger.Directory, str]:
+        """
+        Generate configurations while the Terraform image is resolved concurrently.
+
+        deploy, plan and destroy need both the KCL outputs and the Terraform
+        image; the two are independent, so the image pull overlaps with the
+        KCL run instead of starting after it. Generation errors are raised
+        unchanged (KCLGenerationError keeps its component), and a failed
+        image pull is left to surface where the container is used.
+
+        Args:
+            terraform_ctr: Terraform container the caller will build on
+            (remaining arguments as for _generate_configs_cached)
+
+        Returns:
+            Tuple of (directory with the requested JSON files, "hit" or "miss")
+        """
+        generation, _ = await asyncio.gather(
+            self._generate_configs_cached(
+                source,
+                kcl_version,
+                kcl_toolchain_tarball,
+                kcl_toolchain_image,
+                kcl_offline=kcl_offline,
+                include_unifi=include_unifi,
+                include_cloudflare=include_cloudflare,
+            ),
+            terraform_ctr.sync(),
+            return_exceptions=True,
+        )
+        if isinstance(generation, BaseException):
+            raise generation
+        return generation
+
+    async def _generate_configs(
+        self,
+        source: dagger.Directory,
+        kcl_version: str,
+        kcl_toolchain_tarball: Optional[dagger.File] = None,
+        kcl_toolchain_image: str = "",
+        kcl_offline: bool = False,
+        include_unifi: bool = True,
+        include_cloudflare: bool = True,
+    ) -> dagger.Directory:
+        """
+        Run main.k once and extract the requested provider outputs.
+
+        Args:
+            source: Directory containing KCL module (must have kcl.mod)
+            kcl_version: KCL version to use
+            kcl_toolchain_tarball: Prebuilt toolchain image tarball (optional)
+            kcl_toolchain_image: Prebuilt toolchain image reference (optional)
+            kcl_offline: Fail instead of downloading missing KCL dependencies
+            include_unifi: Extract unifi_output into unifi.json
+            include_cloudflare: Extract cf_output into cloudflare.json
+
+        Returns:
+            dagger.Directory containing the requested JSON files
+
+        Raises:
+            KCLGenerationError: If the module is invalid or KCL/extraction fails.
+                The error's component attribute names the provider whose output
+                could not be extracted (empty for failures shared by both).
+        """
+        components = [
+            name for name, included in (("unifi", include_unifi), ("cloudflare", include_cloudflare))
+            if included
+        ]
+        output_names = " and ".join(_KCL_COMPONENTS[name]["output_key"] for name in components)
+
+        # Read kcl.mod, check main.k and digest the dependency lock in one
+        # round of concurrent engine calls
+        dependency_files = dagger.dag.directory().with_directory(
+            "/", source, include=KCL_DEPENDENCY_PATTERNS
+        )
+        mod_content, main_content, dependency_digest = await asyncio.gather(
+            source.file("kcl.mod").contents(),
+            source.file("main.k").contents(),
+            dependency_files.digest(),
+            return_exceptions=True,
+        )
+
+        # Check for kcl.mod
+        if isinstance(mod_content, Exception):
             raise KCLGenerationError(
                 "✗ No kcl.mod found in source directory. "
                 "Is this a valid KCL module?\n"
@@ -114,52 +665,91 @@ class UnifiCloudflareGlue:
             )
 
         # Check for main.k entry point
-        try:
-            main_file = source.file("main.k")
-            _ = await main_file.contents()
-        except Exception:
+        if isinstance(main_content, Exception):
             raise KCLGenerationError(
                 "✗ Entry point file not found: main.k\n"
                 "The module requires main.k as the entry point.\n"
-                "Hint: Ensure your KCL module has a main.k file that exports unifi_output."
+                f"Hint: Ensure your KCL module has a main.k file that exports {output_names}."
             )
 
-        # Create container with KCL and yq for YAML to JSON conversion
-        base_ctr = dagger.dag.container().from_(f"kcllang/kcl:{kcl_version}")
-        
-        # Install curl and yq for YAML to JSON conversion
-        ctr = base_ctr.with_exec([
-            "sh", "-c",
-            "apt-get update && apt-get install -y curl && curl -sL https://github.com/mikefarah/yq/releases/latest/download/yq_linux_amd64 -o /usr/local/bin/yq && chmod +x /usr/local/bin/yq"
-        ])
-        
+        # Use the prebuilt KCL toolchain (no package installs per call)
+        ctr = await self._kcl_toolchain_container(
+            kcl_version, kcl_toolchain_tarball, kcl_toolchain_image
+        )
+
         # Mount source directory
         ctr = ctr.with_directory("/src", source).with_workdir("/src")
 
         # Step 1: Download KCL dependencies to prevent git clone messages in output
-        # This must be done before 'kcl run' to ensure clean YAML output
+        # This must be done before 'kcl run' to ensure clean YAML output. Packages
+        # live in a cache volume keyed on kcl.mod/kcl.mod.lock, so an unchanged
+        # lock file never re-clones git dependencies.
         try:
-            ctr = ctr.with_exec(["kcl", "mod", "update"])
-            await ctr.stdout()  # Wait for completion but don't capture output
-        except dagger.ExecError as e:
-            raise KCLGenerationError(
-                f"✗ Failed to download KCL dependencies:\n"
-                f"Exit code: {e.exit_code}\n"
-                f"Stderr: {e.stderr}\n"
-                f"\nPossible causes:\n"
-                f"  - Network connectivity issues\n"
-                f"  - Invalid kcl.mod syntax\n"
-                f"  - Git repository not accessible\n"
-                f"\nSuggested fixes:\n"
-                f"  - Check your network connection\n"
-                f"  - Validate kcl.mod syntax with 'kcl mod graph' locally\n"
-                f"  - Ensure git dependencies are accessible from this environment"
-            )
+            dependencies = remote_dependencies(mod_content)
+        except ValueError as e:
+            raise KCLGenerationError(f"✗ {e}\nHint: Validate kcl.mod syntax with 'kcl mod graph' locally.")
+
+        if isinstance(dependency_digest, Exception):
+            raise dependency_digest
+        dependency_volume = dagger.dag.cache_volume(dependency_cache_volume_name(dependency_digest))
+        ctr = ctr.with_env_variable("KCL_PKG_PATH", KCL_PKG_PATH)
+
+        if dependencies:
+            try:
+                # LOCKED only while the dependencies are synced, so concurrent
+                # generations never populate the same package cache at once
+                ctr = (
+                    ctr.with_mounted_cache(
+                        KCL_PKG_PATH, dependency_volume, sharing=dagger.CacheSharingMode.LOCKED
+                    )
+                    # The cache volume is not part of Dagger's exec cache key
+                    .with_env_variable("KCL_DEPS_NONCE", str(time.time_ns()))
+                    .with_exec(["sh", "-c", dependency_sync_script(KCL_PKG_PATH, offline=kcl_offline)])
+                    .without_mount(KCL_PKG_PATH)
+                )
+                await ctr.stdout()  # Wait for completion but don't capture output
+            except dagger.ExecError as e:
+                if kcl_offline:
+                    missing = "\n".join(f"  - {dep}" for dep in dependencies)
+                    raise KCLGenerationError(
+                        f"✗ KCL dependencies are not in the local cache (offline mode):\n"
+                        f"{missing}\n"
+                        f"\nSuggested fixes:\n"
+                        f"  - Run once without --kcl-offline to populate the cache for this kcl.mod.lock\n"
+                        f"  - Check that kcl.mod.lock has not changed since the cache was populated"
+                    )
+                raise KCLGenerationError(
+                    f"✗ Failed to download KCL dependencies:\n"
+                    f"Exit code: {e.exit_code}\n"
+                    f"Stderr: {e.stderr}\n"
+                    f"\nPossible causes:\n"
+                    f"  - Network connectivity issues\n"
+                    f"  - Invalid kcl.mod syntax\n"
+                    f"  - Git repository not accessible\n"
+                    f"\nSuggested fixes:\n"
+                    f"  - Check your network connection\n"
+                    f"  - Validate kcl.mod syntax with 'kcl mod graph' locally\n"
+                    f"  - Ensure git dependencies are accessible from this environment"
+                )
 
-        # Step 2: Run KCL main.k and capture full output
+        # Step 2: Run KCL main.k once, writing JSON to a file so that print()
+        # output (validation messages) stays on stdout. The component option
+        # lets main.k skip the provider that was not requested. The synced
+        # packages are only read here, so the volume is mounted SHARED and
+        # concurrent generations run in parallel.
         try:
-            ctr = ctr.with_exec(["kcl", "run", "main.k"])
+            ctr = ctr.with_mounted_cache(
+                KCL_PKG_PATH, dependency_volume, sharing=dagger.CacheSharingMode.SHARED
+            ).with_exec(
+                [
+                    "kcl", "run", "main.k",
+                    "-D", f"component={_kcl_component_selector(include_unifi, include_cloudflare)}",
+                    "--format", "json",
+                    "-o", "/tmp/kcl-output.json",
+                ]
+            )
             kcl_output = await ctr.stdout()
+            kcl_json = await ctr.file("/tmp/kcl-output.json").contents()
         except dagger.ExecError as e:
             raise KCLGenerationError(
                 f"✗ KCL execution failed:\n"
@@ -178,84 +768,54 @@ class UnifiCloudflareGlue:
                 f"See the error messages above for details on what needs to be corrected."
             )
 
-        # Step 4: Validate empty output
-        if not kcl_output or not kcl_output.strip():
-            raise KCLGenerationError(
-                "✗ KCL produced empty output:\n"
-                "Possible causes:\n"
-                "  - main.k is empty or has no output statements\n"
-                "  - KCL module has no output statements\n"
-                "  - All configurations are commented out\n"
-                "\nHint: Run 'kcl run main.k' locally to see the raw output."
-            )
-
-        # Step 5: Write KCL output to temporary file for yq extraction
-        ctr = ctr.with_new_file("/tmp/kcl-output.yaml", kcl_output)
-
-        # Step 6: Extract unifi_output section using yq
+        # Step 4: Parse the document and validate empty output
         try:
-            ctr = ctr.with_exec(["yq", "eval", ".unifi_output", "/tmp/kcl-output.yaml"])
-            unifi_yaml = await ctr.stdout()
-        except dagger.ExecError as e:
-            raise KCLGenerationError(
-                f"✗ Failed to extract unifi_output from YAML:\n"
-                f"yq error: {e.stderr}\n"
-                f"\nHint: Ensure your main.k exports 'unifi_output' as a public variable."
-            )
-
-        # Step 7: Check for null output (missing key)
-        if not unifi_yaml or unifi_yaml.strip() == "null" or not unifi_yaml.strip():
-            raise KCLGenerationError(
-                "✗ main.k does not export 'unifi_output':\n"
-                "The main.k file must export a public variable named 'unifi_output'.\n"
-                "\nExample:\n"
-                "  import unifi_cloudflare_glue.generators.unifi as unifi_gen\n"
-                "  unifi_output = unifi_gen.generate_with_output(config)\n"
-                "\nHint: Run 'kcl run main.k' locally to inspect the output structure."
-            )
-
-        # Step 8: Convert extracted YAML to JSON
-        ctr = ctr.with_new_file("/tmp/unifi-output.yaml", unifi_yaml)
-        try:
-            ctr = ctr.with_exec(["yq", "eval", "-o=json", "/tmp/unifi-output.yaml"])
-            json_result = await ctr.stdout()
-        except dagger.ExecError as e:
+            document = load_kcl_document(kcl_json)
+        except ValueError as e:
             # Truncate output to 1000 characters for error display
-            truncated_output = unifi_yaml[:1000] if len(unifi_yaml) > 1000 else unifi_yaml
-            ellipsis_indicator = "... (truncated)" if len(unifi_yaml) > 1000 else ""
+            truncated_output = kcl_json[:1000] if len(kcl_json) > 1000 else kcl_json
+            ellipsis_indicator = "... (truncated)" if len(kcl_json) > 1000 else ""
             raise KCLGenerationError(
-                f"✗ YAML to JSON conversion failed:\n"
-                f"yq error: {e.stderr}\n"
-                f"\nExtracted unifi_output that failed to parse:\n"
+                f"✗ Invalid JSON output from KCL:\n"
+                f"{str(e)}\n"
+                f"\nOutput preview:\n"
                 f"{'-' * 60}\n"
                 f"{truncated_output}{ellipsis_indicator}\n"
                 f"{'-' * 60}\n"
-                f"\nPossible causes:\n"
-                f"  - KCL validation warnings in output\n"
-                f"  - Invalid YAML structure in unifi_output\n"
-                f"  - KCL syntax errors that produced partial output\n"
-                f"\nHint: Run 'kcl run main.k' locally to see the raw output."
+                f"\nHint: Run 'kcl run main.k --format json' locally to see the raw output."
             )
 
-        # Step 9: Validate JSON output
-        try:
-            json.loads(json_result)
-        except json.JSONDecodeError as je:
-            # Truncate JSON result to 500 characters for error display
-            truncated_json = json_result[:500] if len(json_result) > 500 else json_result
-            json_ellipsis = "... (truncated)" if len(json_result) > 500 else ""
+        if not document:
             raise KCLGenerationError(
-                f"✗ Invalid JSON output after yq conversion:\n"
-                f"JSON parse error: {str(je)}\n"
-                f"\nInvalid output preview:\n"
-                f"{'-' * 60}\n"
-                f"{truncated_json}{json_ellipsis}\n"
-                f"{'-' * 60}\n"
-                f"\nHint: This may indicate a bug in yq or unexpected KCL output format."
+                "✗ KCL produced empty output:\n"
+                "Possible causes:\n"
+                "  - main.k is empty or has no output statements\n"
+                "  - KCL module has no output statements\n"
+                "  - All configurations are commented out\n"
+                "\nHint: Run 'kcl run main.k' locally to see the raw output."
             )
 
-        # Step 10: Return as file
-        return dagger.dag.directory().with_new_file("unifi.json", json_result).file("unifi.json")
+        # Step 5: Split each requested output from the same document in-process
+        outputs = split_kcl_outputs(
+            document, [_KCL_COMPONENTS[name]["output_key"] for name in components]
+        )
+        output_dir = dagger.dag.directory()
+        for name in components:
+            spec = _KCL_COMPONENTS[name]
+            json_result = outputs[spec["output_key"]]
+            if json_result is None:
+                raise KCLGenerationError(
+                    f"✗ main.k does not export '{spec['output_key']}':\n"
+                    f"The main.k file must export a public variable named '{spec['output_key']}'.\n"
+                    "\nExample:\n"
+                    f"  {spec['example_import']}\n"
+                    f"  {spec['example_assign']}\n"
+                    "\nHint: Run 'kcl run main.k' locally to inspect the output structure.",
+                    component=spec["label"],
+                )
+            output_dir = output_dir.with_new_file(spec["filename"], json_result)
+
+        return output_dir
 
     def _validate_backend_config(
         self,
@@ -387,18 +947,240 @@ class UnifiCloudflareGlue:
         if unifi_api_key:
             auth_config = f'''  api_key        = var.unifi_api_key'''
         else:
-            auth_config = f'''  username       = var.unifi_username
-  password       = var.unifi_password'''
-        
-        return f'''# Provider configuration for standalone unifi-dns module
-# This file is dynamically generated for unifi-only deployments
-provider "unifi" {{
-  api_url        = var.unifi_url != "" ? (var.api_url != "" ? var.api_url : var.unifi_url) : "https://placeholder.local:8443"
-{auth_config}
-  allow_insecure = var.unifi_insecure
-}}
-'''
+            auth_config = f'''  username       = var.unifi_username
+  password       = var.unifi_password'''
+        
+        return f'''# Provider configuration for standalone unifi-dns module
+# This file is dynamically generated for unifi-only deployments
+provider "unifi" {{
+  api_url        = var.unifi_url != "" ? (var.api_url != "" ? var.api_url : var.unifi_url) : "https://placeholder.local:8443"
+{auth_config}
+  allow_insecure = var.unifi_insecure
+}}
+'''
+
+    async def _terraform_init(
+        self,
+        ctr: dagger.Container,
+        terraform_version: str,
+        init_cmd: Optional[list[str]] = None,
+        state_module_root: Optional[str] = None,
+    ) -> dagger.Container:
+        """
+        Run terraform init with the shared provider plugin cache.
+
+        The cache volume is keyed on Terraform version and container platform
+        and is mounted LOCKED for the init step only, so concurrent pipelines
+        never write the same plugin directory at once and long-running
+        plan/apply steps do not hold the lock. Providers are copied out of
+        the cache into .terraform before the volume is unmounted.
+
+        Args:
+            ctr: Terraform container with the working directory set
+            terraform_version: Terraform image tag the container was built from
+            init_cmd: Init command (default: ["terraform", "init"])
+            state_module_root: Mounted module tree when initializing /state;
+                the init fingerprint is recorded so later runs can reuse it
+
+        Returns:
+            Container after init; await stdout() to surface dagger.ExecError
+        """
+        init_cmd = init_cmd or ["terraform", "init"]
+        volume = dagger.dag.cache_volume(
+            plugin_cache_volume_name(terraform_version, await ctr.platform())
+        )
+        return (
+            ctr.with_mounted_cache(PLUGIN_CACHE_DIR, volume, sharing=dagger.CacheSharingMode.LOCKED)
+            .with_env_variable("TF_PLUGIN_CACHE_DIR", PLUGIN_CACHE_DIR)
+            .with_exec(init_exec_command(init_cmd, state_module_root))
+            .without_env_variable("TF_PLUGIN_CACHE_DIR")
+            .without_mount(PLUGIN_CACHE_DIR)
+        )
+
+
+    def _validate_plan_scope(
+        self,
+        activity: str,
+        unifi_only: bool,
+        cloudflare_only: bool,
+        unifi_url: str,
+        unifi_api_key: Optional[Secret],
+        unifi_username: Optional[Secret],
+        unifi_password: Optional[Secret],
+        cloudflare_token: Optional[Secret],
+        cloudflare_account_id: str,
+        zone_name: str,
+    ) -> None:
+        """
+        Validate scope flags and the credentials the scope needs.
+
+        Args:
+            activity: Word used in error messages (e.g. "planning", "drift detection")
+            (remaining arguments as for plan)
+
+        Raises:
+            ValueError: If the flags conflict or required credentials are missing
+        """
+        # Validate mutual exclusion of deployment flags
+        if unifi_only and cloudflare_only:
+            raise ValueError("✗ Failed: Cannot use both --unifi-only and --cloudflare-only")
+
+        # Validate credentials based on deployment scope
+        if unifi_only:
+            # UniFi-only: require UniFi credentials
+            using_api_key = unifi_api_key is not None
+            using_password = unifi_username is not None and unifi_password is not None
+            if not using_api_key and not using_password:
+                raise ValueError(f"✗ Failed: UniFi-only {activity} requires either --unifi-api-key OR both --unifi-username and --unifi-password")
+            if using_api_key and using_password:
+                raise ValueError("✗ Failed: Cannot use both API key and username/password. Choose one authentication method.")
+            if not unifi_url:
+                raise ValueError(f"✗ Failed: UniFi-only {activity} requires --unifi-url")
+        elif cloudflare_only:
+            # Cloudflare-only: require Cloudflare credentials
+            if cloudflare_token is None:
+                raise ValueError(f"✗ Failed: Cloudflare-only {activity} requires --cloudflare-token")
+            if not cloudflare_account_id:
+                raise ValueError(f"✗ Failed: Cloudflare-only {activity} requires --cloudflare-account-id")
+            if not zone_name:
+                raise ValueError(f"✗ Failed: Cloudflare-only {activity} requires --zone-name")
+        else:
+            # Full deployment: require both sets of credentials
+            using_api_key = unifi_api_key is not None
+            using_password = unifi_username is not None and unifi_password is not None
+            if not using_api_key and not using_password:
+                raise ValueError(f"✗ Failed: Full deployment {activity} requires either --unifi-api-key OR both --unifi-username and --unifi-password")
+            if using_api_key and using_password:
+                raise ValueError("✗ Failed: Cannot use both API key and username/password. Choose one authentication method.")
+            if not unifi_url:
+                raise ValueError(f"✗ Failed: Full deployment {activity} requires --unifi-url")
+            if cloudflare_token is None:
+                raise ValueError(f"✗ Failed: Full deployment {activity} requires --cloudflare-token")
+            if not cloudflare_account_id:
+                raise ValueError(f"✗ Failed: Full deployment {activity} requires --cloudflare-account-id")
+            if not zone_name:
+                raise ValueError(f"✗ Failed: Full deployment {activity} requires --zone-name")
+
+    async def _glue_terraform_pipeline(
+        self,
+        terraform_version: str,
+        terraform_image_tarball: Optional[dagger.File],
+        terraform_image: str,
+        cache_buster: str,
+        unifi_dir: Optional[dagger.Directory],
+        cloudflare_dir: Optional[dagger.Directory],
+        unifi_url: str,
+        api_url: str,
+        unifi_insecure: bool,
+        cloudflare_account_id: str,
+        zone_name: str,
+        unifi_only: bool,
+        cloudflare_only: bool,
+        unifi_api_key: Optional[Secret],
+        unifi_username: Optional[Secret],
+        unifi_password: Optional[Secret],
+        cloudflare_token: Optional[Secret],
+        backend_type: str,
+        backend_config_file: Optional[dagger.File],
+        state_dir: Optional[dagger.Directory],
+    ) -> TerraformPipeline:
+        """
+        Set up the glue module container used by plan and detect_drift.
+
+        Mounts the modules and generated configs, configures the backend,
+        variables and credentials for the scope, syncs --state-dir and adds
+        `terraform init` (unless the state directory can be reused) without
+        running it.
+
+        Returns:
+            TerraformPipeline whose working directory is the glue module
+            (/state with --state-dir)
+
+        Raises:
+            RuntimeError: If the Terraform modules cannot be mounted
+        """
+        # Create Terraform container with combined module
+        ctr = await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image)
+
+        # Add cache buster IMMEDIATELY to ensure Terraform operations aren't cached
+        if cache_buster:
+            ctr = ctr.with_env_variable("CACHE_BUSTER", cache_buster)
+
+        # Mount all Terraform modules (glue depends on sibling modules via relative paths)
+        try:
+            tf_modules = dagger.dag.current_module().source().directory("terraform/modules")
+            ctr = ctr.with_directory("/module", tf_modules)
+        except Exception as e:
+            raise RuntimeError(f"✗ Failed: Could not mount Terraform modules at terraform/modules/: {str(e)}")
+
+        # Mount configuration files conditionally
+        if unifi_dir is not None:
+            ctr = ctr.with_directory("/workspace/unifi", unifi_dir)
+        if cloudflare_dir is not None:
+            ctr = ctr.with_directory("/workspace/cloudflare", cloudflare_dir)
+
+        # Generate and mount backend.tf if using remote backend
+        if backend_type != "local":
+            backend_hcl = self._generate_backend_block(backend_type)
+            ctr = ctr.with_new_file("/module/glue/backend.tf", backend_hcl)
+
+        # Process and mount backend config file if provided
+        if backend_config_file is not None:
+            config_content, _ = await _process_backend_config(backend_config_file)
+            ctr = ctr.with_new_file("/root/.terraform/backend.tfbackend", config_content)
+
+        # Set up environment variables conditionally based on deployment scope
+        if unifi_url:
+            ctr = ctr.with_env_variable("TF_VAR_unifi_url", unifi_url)
+            ctr = ctr.with_env_variable("TF_VAR_api_url", api_url)
+            ctr = ctr.with_env_variable("TF_VAR_unifi_insecure", str(unifi_insecure).lower())
+        if unifi_dir is not None:
+            ctr = ctr.with_env_variable("TF_VAR_unifi_config_file", "/workspace/unifi/unifi.json")
+        if cloudflare_dir is not None:
+            ctr = ctr.with_env_variable("TF_VAR_cloudflare_config_file", "/workspace/cloudflare/cloudflare.json")
+        if cloudflare_account_id:
+            ctr = ctr.with_env_variable("TF_VAR_cloudflare_account_id", cloudflare_account_id)
+            ctr = ctr.with_env_variable("TF_VAR_zone_name", zone_name)
+
+        # Add authentication secrets conditionally
+        if unifi_only or not cloudflare_only:  # UniFi credentials needed
+            if unifi_api_key:
+                ctr = ctr.with_secret_variable("TF_VAR_unifi_api_key", unifi_api_key)
+            elif unifi_username and unifi_password:
+                ctr = ctr.with_secret_variable("TF_VAR_unifi_username", unifi_username)
+                ctr = ctr.with_secret_variable("TF_VAR_unifi_password", unifi_password)
+
+        if cloudflare_only or not unifi_only:  # Cloudflare credentials needed
+            if cloudflare_token:
+                # Use CLOUDFLARE_API_TOKEN env var - more reliable with Dagger secrets
+                ctr = ctr.with_secret_variable("CLOUDFLARE_API_TOKEN", cloudflare_token)
+
+        init_cmd = ["terraform", "init"]
+        if backend_config_file is not None:
+            init_cmd.extend(["-backend-config=/root/.terraform/backend.tfbackend"])
+
+        # Handle state directory mounting and setup (persistent local state)
+        # Only changed module files are copied; .terraform is kept and reused
+        # while the module sources and lock file are unchanged
+        state_init_reusable = False
+        if state_dir is not None:
+            ctr = ctr.with_directory("/state", state_dir)
+            ctr = ctr.with_exec(["sh", "-c", state_sync_script("/module/glue", "/module", init_cmd)])
+            state_init_reusable = (await ctr.stdout()).strip().endswith("reuse")
+            ctr = ctr.with_workdir("/state")
+        else:
+            ctr = ctr.with_workdir("/module/glue")
+
+        # Init is chained lazily; callers add their steps and sync once
+        pipeline = TerraformPipeline(ctr)
+        if not state_init_reusable:
+            state_module_root = "/module" if state_dir is not None else None
+            pipeline.container = await self._terraform_init(
+                ctr, terraform_version, init_cmd, state_module_root=state_module_root,
+            )
+            pipeline.record("init", "Terraform init failed", init_exec_command(init_cmd, state_module_root))
 
+        return pipeline
 
     @function
     async def deploy(
@@ -416,10 +1198,19 @@ provider "unifi" {{
         unifi_only: Annotated[bool, Doc("Deploy only UniFi DNS (mutually exclusive with --cloudflare-only)")] = False,
         cloudflare_only: Annotated[bool, Doc("Deploy only Cloudflare Tunnels (mutually exclusive with --unifi-only)")] = False,
         terraform_version: Annotated[str, Doc("Terraform version to use (e.g., '1.10.0' or 'latest')")] = "latest",
+        terraform_image_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt Terraform image tarball with provider mirror (from terraform-mirror-image export)")] = None,
+        terraform_image: Annotated[str, Doc("Prebuilt Terraform image reference with provider mirror (e.g., a local registry)")] = "",
         kcl_version: Annotated[str, Doc("KCL version to use (e.g., '0.11.0' or 'latest')")] = "latest",
+        kcl_toolchain_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt KCL toolchain image tarball (from kcl-toolchain export)")] = None,
+        kcl_toolchain_image: Annotated[str, Doc("Prebuilt KCL toolchain image reference (e.g., a local registry)")] = "",
+        kcl_offline: Annotated[bool, Doc("Fail fast instead of downloading KCL dependencies missing from the cache")] = False,
         backend_type: Annotated[str, Doc("Terraform backend type (local, s3, azurerm, gcs, remote, etc.)")] = "local",
         backend_config_file: Annotated[Optional[dagger.File], Doc("Backend configuration HCL file (required for remote backends)")] = None,
         state_dir: Annotated[Optional[dagger.Directory], Doc("Directory for persistent Terraform state (mutually exclusive with remote backend)")] = None,
+        plan_dir: Annotated[Optional[dagger.Directory], Doc("Directory exported by plan; applies its plan.tfplan instead of regenerating and re-planning")] = None,
+        parallelism: Annotated[int, Doc("Number of concurrent Terraform operations (0 keeps Terraform's default of 10)")] = 0,
+        refresh: Annotated[bool, Doc("Refresh resources before planning (--refresh=false skips the refresh)")] = True,
+        targets: Annotated[Optional[list[str]], Doc("MAC addresses or hostnames to limit the run to (translated to -target addresses)")] = None,
         cache_buster: Annotated[str, Doc("Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))")] = "",
     ) -> str:
         """
@@ -454,10 +1245,24 @@ provider "unifi" {{
             unifi_only: Deploy only UniFi DNS (no Cloudflare credentials needed)
             cloudflare_only: Deploy only Cloudflare Tunnels (no UniFi credentials needed)
             terraform_version: Terraform version to use (default: "latest")
+            terraform_image_tarball: Prebuilt Terraform image tarball from terraform-mirror-image (optional)
+            terraform_image: Prebuilt Terraform image reference, e.g. a local registry (optional)
             kcl_version: KCL version to use (default: "latest")
+            kcl_toolchain_tarball: Prebuilt KCL toolchain image tarball for offline runs (optional)
+            kcl_toolchain_image: Prebuilt KCL toolchain image reference, e.g. a local registry (optional)
+            kcl_offline: Never download KCL dependencies; fail if they are not cached (default: False)
             backend_type: Terraform backend type (local, s3, azurerm, gcs, remote, etc.)
             backend_config_file: Backend configuration HCL file (required for remote backends)
             state_dir: Directory for persistent Terraform state (mutually exclusive with remote backend)
+            plan_dir: Directory exported by plan. Its plan.tfplan is applied as reviewed
+                (no KCL regeneration or second refresh) after checking that the state
+                serial still matches the one the plan was made against. Use the same
+                --unifi-only/--cloudflare-only, backend and state flags as for plan.
+            parallelism: Number of concurrent Terraform operations (default: 0, Terraform's default of 10)
+            refresh: Refresh resources before planning; False passes -refresh=false (default: True)
+            targets: MAC addresses, device/tunnel hostnames or public hostnames. They are
+                resolved against the generated configurations into -target addresses of
+                the matching unifi_dns and cloudflare_tunnel resources.
             cache_buster: Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))
 
         Returns:
@@ -513,6 +1318,17 @@ provider "unifi" {{
                 --unifi-api-key=env:UNIFI_API_KEY \\
                 --unifi-only \\
                 --cache-buster=$(date +%s)
+
+            # Apply a reviewed plan exported by `plan ... export --path=./plans`
+            dagger call deploy \\
+                --kcl-source=./kcl \\
+                --unifi-url=https://unifi.local:8443 \\
+                --cloudflare-token=env:CF_TOKEN \\
+                --cloudflare-account-id=xxx \\
+                --zone-name=example.com \\
+                --unifi-api-key=env:UNIFI_API_KEY \\
+                --state-dir=./terraform-state \\
+                --plan-dir=./plans
         """
         # Validate mutual exclusion of deployment flags
         if unifi_only and cloudflare_only:
@@ -564,33 +1380,76 @@ provider "unifi" {{
         results.append("PHASE 1: Generating KCL configurations")
         results.append("=" * 60)
 
-        # Bust cache for KCL generation by adding timestamp file to source
-        effective_kcl_source = kcl_source
-        if effective_cache_buster:
-            effective_kcl_source = kcl_source.with_new_file(".cache-bust", effective_cache_buster)
-
         unifi_dir = None
         cloudflare_dir = None
+        planned_state = None
 
-        if not cloudflare_only:  # Generate UniFi config unless cloudflare-only
+        if plan_dir is not None:
+            # Apply a saved plan: it ships with the configurations it was computed from
             try:
-                unifi_file = await self.generate_unifi_config(effective_kcl_source, kcl_version)
-                unifi_dir = dagger.dag.directory().with_file("unifi.json", unifi_file)
-                results.append("✓ UniFi configuration generated")
+                planned_state = load_plan_state(await plan_dir.file(PLAN_STATE_FILE).contents())
+                plan_entries = await plan_dir.entries()
             except Exception as e:
-                return f"✗ Failed: Could not generate UniFi config\n{str(e)}"
-        else:
-            results.append("○ UniFi configuration skipped (--cloudflare-only)")
+                return (
+                    f"✗ Failed: --plan-dir is not a directory exported by plan\n{str(e)}\n"
+                    "Hint: Re-run 'dagger call plan ... export --path=./plans' with this version."
+                )
+            if PLAN_BINARY_FILE not in plan_entries:
+                return f"✗ Failed: --plan-dir does not contain {PLAN_BINARY_FILE}"
+            planned_scope = (planned_state.get("unifi_only"), planned_state.get("cloudflare_only"))
+            if planned_scope != (unifi_only, cloudflare_only):
+                return (
+                    "✗ Failed: Saved plan was created for a different scope\n"
+                    f"Plan: unifi_only={planned_scope[0]}, cloudflare_only={planned_scope[1]}\n"
+                    "Pass the same --unifi-only/--cloudflare-only flags used for plan."
+                )
 
-        if not unifi_only:  # Generate Cloudflare config unless unifi-only
+            if targets or not refresh:
+                return (
+                    "✗ Failed: --targets and --refresh=false cannot be used with --plan-dir\n"
+                    "Pass them to plan instead; the saved plan already covers only what it planned."
+                )
+
+            results.append("○ KCL generation skipped (applying saved plan from --plan-dir)")
+            if "unifi.json" in plan_entries:
+                unifi_dir = dagger.dag.directory().with_file("unifi.json", plan_dir.file("unifi.json"))
+            if "cloudflare.json" in plan_entries:
+                cloudflare_dir = dagger.dag.directory().with_file("cloudflare.json", plan_dir.file("cloudflare.json"))
+        else:
+            # Evaluate main.k once for every requested provider output
             try:
-                cloudflare_file = await self.generate_cloudflare_config(effective_kcl_source, kcl_version)
-                cloudflare_dir = dagger.dag.directory().with_file("cloudflare.json", cloudflare_file)
-                results.append("✓ Cloudflare configuration generated")
+                # Cached by KCL source content; --cache-buster only affects Terraform.
+                # The Terraform image is pulled while KCL runs.
+                config_dir, kcl_cache_status = await self._generate_configs_for_terraform(
+                    await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image),
+                    kcl_source,
+                    kcl_version,
+                    kcl_toolchain_tarball,
+                    kcl_toolchain_image,
+                    kcl_offline=kcl_offline,
+                    include_unifi=not cloudflare_only,
+                    include_cloudflare=not unifi_only,
+                )
             except Exception as e:
-                return f"✗ Failed: Could not generate Cloudflare config\n{str(e)}"
-        else:
-            results.append("○ Cloudflare configuration skipped (--unifi-only)")
+                component = e.component if isinstance(e, KCLGenerationError) and e.component else "KCL"
+                return f"✗ Failed: Could not generate {component} config\n{str(e)}"
+
+            if kcl_cache_status == "hit":
+                results.append("✓ KCL generation cache hit (KCL run skipped)")
+            else:
+                results.append("○ KCL generation cache miss (configurations regenerated)")
+
+            if not cloudflare_only:  # Generate UniFi config unless cloudflare-only
+                unifi_dir = dagger.dag.directory().with_file("unifi.json", config_dir.file("unifi.json"))
+                results.append("✓ UniFi configuration generated")
+            else:
+                results.append("○ UniFi configuration skipped (--cloudflare-only)")
+
+            if not unifi_only:  # Generate Cloudflare config unless unifi-only
+                cloudflare_dir = dagger.dag.directory().with_file("cloudflare.json", config_dir.file("cloudflare.json"))
+                results.append("✓ Cloudflare configuration generated")
+            else:
+                results.append("○ Cloudflare configuration skipped (--unifi-only)")
 
         # Phase 2: Deploy using combined Terraform module
         results.append("")
@@ -617,17 +1476,20 @@ provider "unifi" {{
         using_persistent_state = state_dir is not None
 
         # Create Terraform container and select module based on deployment mode
-        ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
+        ctr = await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image)
 
         # Add cache buster IMMEDIATELY to ensure Terraform operations aren't cached
         if effective_cache_buster:
             ctr = ctr.with_env_variable("CACHE_BUSTER", effective_cache_buster)
 
         # Determine which Terraform module to use based on deployment mode
+        # - saved plan: use glue module, which plan always uses
         # - cloudflare-only: use cloudflare-tunnel module directly (no UniFi provider)
         # - unifi-only: use unifi-dns module directly (no Cloudflare provider)
         # - full deployment: use glue module (both providers)
-        if cloudflare_only:
+        if plan_dir is not None:
+            module_path = "glue"
+        elif cloudflare_only:
             module_path = "cloudflare-tunnel"
         elif unifi_only:
             module_path = "unifi-dns"
@@ -649,6 +1511,17 @@ provider "unifi" {{
         except Exception as e:
             return f"✗ Failed: Could not mount Terraform module at terraform/modules/{module_path}: {str(e)}"
 
+        # -parallelism, -refresh=false and -target addresses for the selected module
+        try:
+            run_args = await _terraform_run_args(
+                parallelism, refresh, targets, unifi_dir, cloudflare_dir, module_path,
+            )
+        except ValueError as e:
+            return f"✗ Failed: Invalid Terraform run options\n{str(e)}"
+        if targets:
+            target_count = sum(arg.startswith("-target=") for arg in run_args)
+            results.append(f"✓ Targeting {target_count} resources for: {', '.join(targets)}")
+
         # Mount configuration files conditionally
         if unifi_dir is not None:
             ctr = ctr.with_directory("/workspace/unifi", unifi_dir)
@@ -732,52 +1605,78 @@ provider "unifi" {{
                 # Use CLOUDFLARE_API_TOKEN env var - more reliable with Dagger secrets
                 ctr = ctr.with_secret_variable("CLOUDFLARE_API_TOKEN", cloudflare_token)
 
+        init_cmd = ["terraform", "init"]
+        if backend_config_file is not None:
+            init_cmd.extend(["-backend-config=/root/.terraform/backend.tfbackend"])
+
         # Handle state directory mounting and setup (persistent local state)
+        # Only changed module files are copied; .terraform is kept and reused
+        # while the module sources and lock file are unchanged
+        state_init_reusable = False
         if using_persistent_state:
             ctr = ctr.with_directory("/state", state_dir)
-            ctr = ctr.with_exec(["sh", "-c", "rm -rf /state/.terraform && echo 'Cleaned .terraform directory'"])
-            _ = await ctr.stdout()
-            ctr = ctr.with_exec(["sh", "-c", f"cp -r {workdir}/* /state/ && ls -la /state"])
-            _ = await ctr.stdout()
+            ctr = ctr.with_exec(["sh", "-c", state_sync_script(workdir, "/module", init_cmd)])
+            state_init_reusable = (await ctr.stdout()).strip().endswith("reuse")
             ctr = ctr.with_workdir("/state")
         else:
             ctr = ctr.with_workdir(workdir)
 
-        # Run terraform init
-        init_cmd = ["terraform", "init"]
-        if backend_config_file is not None:
-            init_cmd.extend(["-backend-config=/root/.terraform/backend.tfbackend"])
+        # Terraform steps are chained lazily and synced once, at the end or
+        # where a result decides what happens next; a failed exec is mapped
+        # back to the step it came from
+        pipeline = TerraformPipeline(ctr)
+        if state_init_reusable:
+            results.append("✓ Terraform init skipped (state directory already initialized)")
+        else:
+            state_module_root = "/module" if using_persistent_state else None
+            pipeline.container = await self._terraform_init(
+                ctr, terraform_version, init_cmd, state_module_root=state_module_root,
+            )
+            pipeline.record("init", "Terraform init failed", init_exec_command(init_cmd, state_module_root))
 
         try:
-            ctr = ctr.with_exec(init_cmd)
-            _ = await ctr.stdout()
-            results.append("✓ Terraform init completed")
-        except dagger.ExecError as e:
-            error_msg = f"✗ Failed: Terraform init failed\n{str(e)}"
-            if backend_type != "local":
-                error_msg += (
-                    "\n\nBackend configuration troubleshooting:\n"
-                    "  - Verify backend config file is valid HCL\n"
-                    "  - Check credentials in environment variables\n"
-                    "  - Ensure backend infrastructure exists (bucket, table, etc.)"
+            # Saved plan: refuse to apply it on top of a state that changed since plan
+            if planned_state is not None:
+                state_text = await pipeline.output(
+                    "state-pull", "Could not read current Terraform state", ["terraform", "state", "pull"]
                 )
-            return error_msg
-
-        # Run terraform apply
-        # Use 'sh -c' with embedded timestamp  to force different command for cache breaking
-        try:
-            if effective_cache_buster:
+                if not state_init_reusable:
+                    results.append("✓ Terraform init completed")
+                try:
+                    current_state = state_identity(state_text)
+                except ValueError as e:
+                    return f"✗ Failed: Could not read current Terraform state\n{str(e)}"
+                reason = stale_plan_reason(planned_state, current_state)
+                if reason:
+                    return (
+                        f"✗ Failed: Saved plan is stale: {reason}\n"
+                        "Re-run plan against the current state and review it again."
+                    )
+                results.append(f"✓ Saved plan matches current state (serial {current_state['serial']})")
+                apply_dir = "/state" if using_persistent_state else workdir
+                pipeline.then(lambda c: c.with_file(f"{apply_dir}/{PLAN_BINARY_FILE}", plan_dir.file(PLAN_BINARY_FILE)))
+
+            # Run terraform apply
+            # Use 'sh -c' with embedded timestamp  to force different command for cache breaking
+            if planned_state is not None:
+                # A saved plan is applied as reviewed: no refresh and no approval prompt
+                apply_cmd = ["terraform", "apply", *run_args, PLAN_BINARY_FILE]
+            elif effective_cache_buster:
                 # Inject cache buster as comment in shell command to make it unique
-                ctr = ctr.with_exec(["sh", "-c", f"# cache_bust={effective_cache_buster}\nterraform apply -auto-approve"])
+                apply_args = shlex.join(["terraform", "apply", "-auto-approve", *run_args])
+                apply_cmd = ["sh", "-c", f"# cache_bust={effective_cache_buster}\n{apply_args}"]
             else:
-                ctr = ctr.with_exec(["terraform", "apply", "-auto-approve"])
-            apply_result = await ctr.stdout()
-            results.append("✓ Terraform apply completed")
+                apply_cmd = ["terraform", "apply", "-auto-approve", *run_args]
+            pipeline.exec("apply", "Terraform apply failed", apply_cmd)
+            apply_result = await pipeline.sync()
+        except PipelineStepError as e:
+            return _pipeline_failure_message(e, backend_type)
         except dagger.ExecError as e:
-            error_details = f"Exit code: {e.exit_code}\n"
-            error_details += f"Stdout:\n{e.stdout or 'N/A'}\n"
-            error_details += f"Stderr:\n{e.stderr or 'N/A'}"
-            return f"✗ Failed: Terraform apply failed\n{error_details}"
+            return f"✗ Failed: Terraform apply failed\n{exec_error_details(e)}"
+
+        if planned_state is None and not state_init_reusable:
+            results.append("✓ Terraform init completed")
+        results.append("✓ Terraform apply completed")
 
         # Final summary
         results.append("")
@@ -902,11 +1801,20 @@ provider "unifi" {{
         unifi_only: Annotated[bool, Doc("Plan only UniFi DNS (mutually exclusive with --cloudflare-only)")] = False,
         cloudflare_only: Annotated[bool, Doc("Plan only Cloudflare Tunnels (mutually exclusive with --unifi-only)")] = False,
         terraform_version: Annotated[str, Doc("Terraform version to use (e.g., '1.10.0' or 'latest')")] = "latest",
+        terraform_image_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt Terraform image tarball with provider mirror (from terraform-mirror-image export)")] = None,
+        terraform_image: Annotated[str, Doc("Prebuilt Terraform image reference with provider mirror (e.g., a local registry)")] = "",
         kcl_version: Annotated[str, Doc("KCL version to use (e.g., '0.11.0' or 'latest')")] = "latest",
+        kcl_toolchain_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt KCL toolchain image tarball (from kcl-toolchain export)")] = None,
+        kcl_toolchain_image: Annotated[str, Doc("Prebuilt KCL toolchain image reference (e.g., a local registry)")] = "",
+        kcl_offline: Annotated[bool, Doc("Fail fast instead of downloading KCL dependencies missing from the cache")] = False,
         backend_type: Annotated[str, Doc("Terraform backend type (local, s3, azurerm, gcs, remote, etc.)")] = "local",
         backend_config_file: Annotated[Optional[dagger.File], Doc("Backend configuration HCL file (required for remote backends)")] = None,
         state_dir: Annotated[Optional[dagger.Directory], Doc("Directory for persistent Terraform state (mutually exclusive with remote backend)")] = None,
+        parallelism: Annotated[int, Doc("Number of concurrent Terraform operations (0 keeps Terraform's default of 10)")] = 0,
+        refresh: Annotated[bool, Doc("Refresh resources before planning (--refresh=false skips the refresh)")] = True,
+        targets: Annotated[Optional[list[str]], Doc("MAC addresses or hostnames to limit the run to (translated to -target addresses)")] = None,
         cache_buster: Annotated[str, Doc("Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))")] = "",
+        skip_plan_text: Annotated[bool, Doc("Skip rendering plan.txt (e.g. in CI where only plan.json is consumed)")] = False,
     ) -> dagger.Directory:
         """
         Generate Terraform plans for UniFi DNS and/or Cloudflare Tunnel configurations.
@@ -941,18 +1849,32 @@ provider "unifi" {{
             unifi_only: Plan only UniFi DNS (no Cloudflare credentials needed)
             cloudflare_only: Plan only Cloudflare Tunnels (no UniFi credentials needed)
             terraform_version: Terraform version to use (default: "latest")
+            terraform_image_tarball: Prebuilt Terraform image tarball from terraform-mirror-image (optional)
+            terraform_image: Prebuilt Terraform image reference, e.g. a local registry (optional)
             kcl_version: KCL version to use (default: "latest")
+            kcl_toolchain_tarball: Prebuilt KCL toolchain image tarball for offline runs (optional)
+            kcl_toolchain_image: Prebuilt KCL toolchain image reference, e.g. a local registry (optional)
+            kcl_offline: Never download KCL dependencies; fail if they are not cached (default: False)
             backend_type: Terraform backend type (local, s3, azurerm, gcs, remote, etc.)
             backend_config_file: Backend configuration HCL file (required for remote backends)
             state_dir: Directory for persistent Terraform state (mutually exclusive with remote backend)
+            parallelism: Number of concurrent Terraform operations (default: 0, Terraform's default of 10)
+            refresh: Refresh resources before planning; False passes -refresh=false (default: True)
+            targets: MAC addresses, device/tunnel hostnames or public hostnames. They are
+                resolved against the generated configurations into -target addresses of
+                the matching unifi_dns and cloudflare_tunnel resources.
             cache_buster: Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))
+            skip_plan_text: Do not render plan.txt; only plan.json is exported (default: False)
 
         Returns:
             dagger.Directory containing all plan artifacts:
             - plan.tfplan - Binary plan file for terraform apply
             - plan.json - JSON representation of the plan
-            - plan.txt - Human-readable plan output
+            - plan.txt - Human-readable plan rendered from plan.json (unless --skip-plan-text)
             - plan-summary.txt - Summary with resource counts and component information
+            - plan-summary.json - Change counts by action, module and resource type
+            - plan-state.json - State lineage/serial the plan was computed against
+            - unifi.json / cloudflare.json - Generated configurations (for deploy --plan-dir)
 
         Example:
             # Full deployment plan (both UniFi and Cloudflare)
@@ -1005,49 +1927,15 @@ provider "unifi" {{
                 --backend-config-file=./s3-backend.hcl \\
                 export --path=./plans
         """
-        # Validate mutual exclusion of deployment flags
-        if unifi_only and cloudflare_only:
-            raise ValueError("✗ Failed: Cannot use both --unifi-only and --cloudflare-only")
+        # Validate mutual exclusion of deployment flags and credentials for the scope
+        self._validate_plan_scope(
+            "planning", unifi_only, cloudflare_only, unifi_url, unifi_api_key, unifi_username,
+            unifi_password, cloudflare_token, cloudflare_account_id, zone_name,
+        )
 
         # Use cache_buster directly for cache control
         effective_cache_buster = cache_buster
 
-        # Validate credentials based on deployment scope
-        if unifi_only:
-            # UniFi-only: require UniFi credentials
-            using_api_key = unifi_api_key is not None
-            using_password = unifi_username is not None and unifi_password is not None
-            if not using_api_key and not using_password:
-                raise ValueError("✗ Failed: UniFi-only planning requires either --unifi-api-key OR both --unifi-username and --unifi-password")
-            if using_api_key and using_password:
-                raise ValueError("✗ Failed: Cannot use both API key and username/password. Choose one authentication method.")
-            if not unifi_url:
-                raise ValueError("✗ Failed: UniFi-only planning requires --unifi-url")
-        elif cloudflare_only:
-            # Cloudflare-only: require Cloudflare credentials
-            if cloudflare_token is None:
-                raise ValueError("✗ Failed: Cloudflare-only planning requires --cloudflare-token")
-            if not cloudflare_account_id:
-                raise ValueError("✗ Failed: Cloudflare-only planning requires --cloudflare-account-id")
-            if not zone_name:
-                raise ValueError("✗ Failed: Cloudflare-only planning requires --zone-name")
-        else:
-            # Full deployment: require both sets of credentials
-            using_api_key = unifi_api_key is not None
-            using_password = unifi_username is not None and unifi_password is not None
-            if not using_api_key and not using_password:
-                raise ValueError("✗ Failed: Full deployment planning requires either --unifi-api-key OR both --unifi-username and --unifi-password")
-            if using_api_key and using_password:
-                raise ValueError("✗ Failed: Cannot use both API key and username/password. Choose one authentication method.")
-            if not unifi_url:
-                raise ValueError("✗ Failed: Full deployment planning requires --unifi-url")
-            if cloudflare_token is None:
-                raise ValueError("✗ Failed: Full deployment planning requires --cloudflare-token")
-            if not cloudflare_account_id:
-                raise ValueError("✗ Failed: Full deployment planning requires --cloudflare-account-id")
-            if not zone_name:
-                raise ValueError("✗ Failed: Full deployment planning requires --zone-name")
-
         # Validate backend configuration
         is_valid, error_msg = self._validate_backend_config(backend_type, backend_config_file)
         if not is_valid:
@@ -1062,146 +1950,130 @@ provider "unifi" {{
         using_persistent_state = state_dir is not None
 
         # Phase 1: Generate KCL configurations (conditionally based on deployment scope)
-        # Bust cache for KCL generation by adding timestamp file to source
-        effective_kcl_source = kcl_source
-        if effective_cache_buster:
-            effective_kcl_source = kcl_source.with_new_file(".cache-bust", effective_cache_buster)
-
         unifi_dir = None
         cloudflare_dir = None
 
+        # Evaluate main.k once for every requested provider output
+        try:
+            # Cached by KCL source content; --cache-buster only affects Terraform.
+            # The Terraform image is pulled while KCL runs.
+            config_dir, kcl_cache_status = await self._generate_configs_for_terraform(
+                await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image),
+                kcl_source,
+                kcl_version,
+                kcl_toolchain_tarball,
+                kcl_toolchain_image,
+                kcl_offline=kcl_offline,
+                include_unifi=not cloudflare_only,
+                include_cloudflare=not unifi_only,
+            )
+        except Exception as e:
+            component = e.component if isinstance(e, KCLGenerationError) and e.component else "KCL"
+            raise RuntimeError(f"✗ Failed: Could not generate {component} config\n{str(e)}")
+
         if not cloudflare_only:  # Generate UniFi config unless cloudflare-only
-            try:
-                unifi_file = await self.generate_unifi_config(effective_kcl_source, kcl_version)
-                unifi_dir = dagger.dag.directory().with_file("unifi.json", unifi_file)
-            except Exception as e:
-                raise RuntimeError(f"✗ Failed: Could not generate UniFi config\n{str(e)}")
+            unifi_dir = dagger.dag.directory().with_file("unifi.json", config_dir.file("unifi.json"))
 
         if not unifi_only:  # Generate Cloudflare config unless unifi-only
-            try:
-                cloudflare_file = await self.generate_cloudflare_config(effective_kcl_source, kcl_version)
-                cloudflare_dir = dagger.dag.directory().with_file("cloudflare.json", cloudflare_file)
-            except Exception as e:
-                raise RuntimeError(f"✗ Failed: Could not generate Cloudflare config\n{str(e)}")
+            cloudflare_dir = dagger.dag.directory().with_file("cloudflare.json", config_dir.file("cloudflare.json"))
+
+        # -parallelism, -refresh=false and -target addresses (plan always uses the glue module)
+        try:
+            run_args = await _terraform_run_args(parallelism, refresh, targets, unifi_dir, cloudflare_dir)
+        except ValueError as e:
+            raise ValueError(f"✗ Failed: Invalid Terraform run options\n{str(e)}")
 
         # Create output directory
         output_dir = dagger.dag.directory()
 
         # Phase 2: Plan Generation using combined Terraform module
         try:
-            # Create Terraform container with combined module
-            ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
-
-            # Add cache buster IMMEDIATELY to ensure Terraform operations aren't cached
-            if effective_cache_buster:
-                ctr = ctr.with_env_variable("CACHE_BUSTER", effective_cache_buster)
-
-            # Mount all Terraform modules (glue depends on sibling modules via relative paths)
-            try:
-                tf_modules = dagger.dag.current_module().source().directory("terraform/modules")
-                ctr = ctr.with_directory("/module", tf_modules)
-            except Exception as e:
-                raise RuntimeError(f"✗ Failed: Could not mount Terraform modules at terraform/modules/: {str(e)}")
-
-            # Mount configuration files conditionally
-            if unifi_dir is not None:
-                ctr = ctr.with_directory("/workspace/unifi", unifi_dir)
-            if cloudflare_dir is not None:
-                ctr = ctr.with_directory("/workspace/cloudflare", cloudflare_dir)
-
-            # Generate and mount backend.tf if using remote backend
-            if backend_type != "local":
-                backend_hcl = self._generate_backend_block(backend_type)
-                ctr = ctr.with_new_file("/module/glue/backend.tf", backend_hcl)
-
-            # Process and mount backend config file if provided
-            if backend_config_file is not None:
-                config_content, _ = await _process_backend_config(backend_config_file)
-                ctr = ctr.with_new_file("/root/.terraform/backend.tfbackend", config_content)
-
-            # Set up environment variables conditionally based on deployment scope
-            if unifi_url:
-                ctr = ctr.with_env_variable("TF_VAR_unifi_url", unifi_url)
-                ctr = ctr.with_env_variable("TF_VAR_api_url", actual_api_url)
-                ctr = ctr.with_env_variable("TF_VAR_unifi_insecure", str(unifi_insecure).lower())
-            if unifi_dir is not None:
-                ctr = ctr.with_env_variable("TF_VAR_unifi_config_file", "/workspace/unifi/unifi.json")
-            if cloudflare_dir is not None:
-                ctr = ctr.with_env_variable("TF_VAR_cloudflare_config_file", "/workspace/cloudflare/cloudflare.json")
-            if cloudflare_account_id:
-                ctr = ctr.with_env_variable("TF_VAR_cloudflare_account_id", cloudflare_account_id)
-                ctr = ctr.with_env_variable("TF_VAR_zone_name", zone_name)
-
-            # Add authentication secrets conditionally
-            if unifi_only or not cloudflare_only:  # UniFi credentials needed
-                if unifi_api_key:
-                    ctr = ctr.with_secret_variable("TF_VAR_unifi_api_key", unifi_api_key)
-                elif unifi_username and unifi_password:
-                    ctr = ctr.with_secret_variable("TF_VAR_unifi_username", unifi_username)
-                    ctr = ctr.with_secret_variable("TF_VAR_unifi_password", unifi_password)
-
-            if cloudflare_only or not unifi_only:  # Cloudflare credentials needed
-                if cloudflare_token:
-                    # Use CLOUDFLARE_API_TOKEN env var - more reliable with Dagger secrets
-                    ctr = ctr.with_secret_variable("CLOUDFLARE_API_TOKEN", cloudflare_token)
-
-            # Handle state directory mounting and setup (persistent local state)
-            if using_persistent_state:
-                ctr = ctr.with_directory("/state", state_dir)
-                # Clean up any existing .terraform directory to prevent provider conflicts
-                ctr = ctr.with_exec(["sh", "-c", "rm -rf /state/.terraform && echo 'Cleaned .terraform directory'"])
-                _ = await ctr.stdout()
-                ctr = ctr.with_exec(["sh", "-c", "cp -r /module/glue/* /state/ && ls -la /state"])
-                _ = await ctr.stdout()
-                ctr = ctr.with_workdir("/state")
-            else:
-                ctr = ctr.with_workdir("/module/glue")
-
-            # Run terraform init
-            init_cmd = ["terraform", "init"]
-            if backend_config_file is not None:
-                init_cmd.extend(["-backend-config=/root/.terraform/backend.tfbackend"])
+            # Build the glue module container and chain init (synced below)
+            pipeline = await self._glue_terraform_pipeline(
+                terraform_version=terraform_version,
+                terraform_image_tarball=terraform_image_tarball,
+                terraform_image=terraform_image,
+                cache_buster=effective_cache_buster,
+                unifi_dir=unifi_dir,
+                cloudflare_dir=cloudflare_dir,
+                unifi_url=unifi_url,
+                api_url=actual_api_url,
+                unifi_insecure=unifi_insecure,
+                cloudflare_account_id=cloudflare_account_id,
+                zone_name=zone_name,
+                unifi_only=unifi_only,
+                cloudflare_only=cloudflare_only,
+                unifi_api_key=unifi_api_key,
+                unifi_username=unifi_username,
+                unifi_password=unifi_password,
+                cloudflare_token=cloudflare_token,
+                backend_type=backend_type,
+                backend_config_file=backend_config_file,
+                state_dir=state_dir,
+            )
 
-            ctr = ctr.with_exec(init_cmd)
-            _ = await ctr.stdout()
+            # Record the state the plan is computed against (checked by deploy --plan-dir)
+            pipeline.exec(
+                "state-pull", "Could not read current Terraform state",
+                ["sh", "-c", "terraform state pull > /tmp/terraform-state.json"],
+            )
 
             # Run terraform plan - CRITICAL: Preserve container reference
-            ctr = ctr.with_exec(["terraform", "plan", "-out=plan.tfplan"])
-            _ = await ctr.stdout()
+            pipeline.exec("plan", "Terraform plan failed", ["terraform", "plan", "-out=plan.tfplan", *run_args])
 
-            # Generate JSON output
-            ctr = ctr.with_exec(["sh", "-c", "terraform show -json plan.tfplan > plan.json"])
-            _ = await ctr.stdout()
-
-            # Generate text output
-            ctr = ctr.with_exec(["sh", "-c", "terraform show plan.tfplan > plan.txt"])
-            _ = await ctr.stdout()
+            # Generate JSON output; plan.txt is rendered from it below, so the
+            # plan and provider schemas are only loaded by one terraform show
+            pipeline.exec(
+                "show-json", "Could not render plan.json",
+                ["sh", "-c", "terraform show -json plan.tfplan > plan.json"],
+            )
+            await pipeline.sync()
+            ctr = pipeline.container
 
             # Extract plan files from POST-execution container
-            plan_binary = await ctr.file("/state/plan.tfplan" if using_persistent_state else "/module/glue/plan.tfplan")
-            plan_json = await ctr.file("/state/plan.json" if using_persistent_state else "/module/glue/plan.json")
-            plan_txt = await ctr.file("/state/plan.txt" if using_persistent_state else "/module/glue/plan.txt")
+            plan_binary = ctr.file("/state/plan.tfplan" if using_persistent_state else "/module/glue/plan.tfplan")
+            plan_json = ctr.file("/state/plan.json" if using_persistent_state else "/module/glue/plan.json")
+            # plan.json is exported and streamed instead of loaded into memory:
+            # it embeds prior state and configuration and grows with every resource
+            plan_summary = PlanSummary()
+            text_renderer = None if skip_plan_text else PlanTextRenderer()
+
+            def on_resource_change(resource_change: dict) -> None:
+                plan_summary.add(resource_change)
+                if text_renderer is not None:
+                    text_renderer.add(resource_change)
+
+            with tempfile.TemporaryDirectory(prefix="plan-") as tmp_dir:
+                plan_json_path = os.path.join(tmp_dir, "plan.json")
+                state_text, _ = await asyncio.gather(
+                    ctr.file("/tmp/terraform-state.json").contents(), plan_json.export(plan_json_path)
+                )
+                with open(plan_json_path, encoding="utf-8") as f:
+                    plan_info = stream_plan(f, on_resource_change)
+            planned_state = state_identity(state_text)
 
             # Add to output directory
             output_dir = output_dir.with_file("plan.tfplan", plan_binary)
             output_dir = output_dir.with_file("plan.json", plan_json)
-            output_dir = output_dir.with_file("plan.txt", plan_txt)
+            if text_renderer is not None:
+                output_dir = output_dir.with_new_file("plan.txt", text_renderer.render(plan_info.get("output_changes")))
+            output_dir = output_dir.with_new_file(
+                PLAN_STATE_FILE, render_plan_state(planned_state, unifi_only, cloudflare_only)
+            )
 
-            # Parse plan for resource counts
-            try:
-                json_content = await plan_json.contents()
-                plan_data = json.loads(json_content)
-                changes = plan_data.get("resource_changes", [])
-                total_add = sum(1 for c in changes if any(a.get("action") in ["create", "add"] for a in c.get("change", {}).get("actions", [])))
-                total_change = sum(1 for c in changes if any(a.get("action") in ["update", "change"] for a in c.get("change", {}).get("actions", [])))
-                total_destroy = sum(1 for c in changes if any(a.get("action") in ["delete", "destroy"] for a in c.get("change", {}).get("actions", [])))
-            except Exception:
-                # Fallback: parse from text
-                txt_content = await plan_txt.contents()
-                total_add = txt_content.count("will be created")
-                total_change = txt_content.count("will be changed")
-                total_destroy = txt_content.count("will be destroyed")
+            # Ship the generated configurations so deploy --plan-dir applies exactly this plan
+            if unifi_dir is not None:
+                output_dir = output_dir.with_file("unifi.json", unifi_dir.file("unifi.json"))
+            if cloudflare_dir is not None:
+                output_dir = output_dir.with_file("cloudflare.json", cloudflare_dir.file("cloudflare.json"))
 
+            summary_data = plan_summary.to_dict(plan_info)
+            output_dir = output_dir.with_new_file("plan-summary.json", json.dumps(summary_data, indent=2) + "\n")
+            totals = summary_data["totals"]
+            total_add, total_change, total_destroy = totals["add"], totals["change"], totals["destroy"]
+
+        except PipelineStepError as e:
+            raise RuntimeError(_pipeline_failure_message(e, backend_type))
         except Exception as e:
             raise RuntimeError(f"✗ Failed: Terraform plan failed\n{str(e)}")
 
@@ -1216,14 +2088,30 @@ provider "unifi" {{
         else:
             planned_components = "UniFi DNS and Cloudflare Tunnels"
 
+        module_lines = "\n".join(
+            f"{module}: " + ", ".join(f"{count} {action}" for action, count in counts.items())
+            for module, counts in summary_data["by_module"].items()
+        ) or "(no resource changes)"
+        target_summary = ", ".join(targets) if targets else "(all resources)"
+        refresh_summary = "yes" if refresh else "no (-refresh=false)"
+        plan_txt_entry = "" if skip_plan_text else "- plan.txt         (human-readable format, rendered from plan.json)\n"
+        plan_txt_note = (
+            "- plan.txt was skipped (--skip-plan-text); render it with 'terraform show plan.tfplan'\n"
+            if skip_plan_text
+            else "- Text file is optimized for manual review and diffing\n"
+        )
+
         summary_content = f"""Terraform Plan Summary
 ======================
 
 Generated: {timestamp}
 Terraform Version: {terraform_version}
 KCL Version: {kcl_version}
+KCL Generation Cache: {kcl_cache_status}
 Backend Type: {backend_type}
 Planned Components: {planned_components}
+Targets: {target_summary}
+Refresh: {refresh_summary}
 
 Resource Changes
 ----------------
@@ -1232,18 +2120,24 @@ Resources to change:  {total_change}
 Resources to destroy: {total_destroy}
 Total changes:        {total_add + total_change + total_destroy}
 
+Changes by Module
+-----------------
+{module_lines}
+
 Output Files
 ------------
-- plan.tfplan  (binary plan for terraform apply)
-- plan.json    (structured JSON for automation)
-- plan.txt     (human-readable format)
+- plan.tfplan      (binary plan for terraform apply)
+- plan.json        (structured JSON for automation)
+{plan_txt_entry}- plan-summary.json (change counts by action, module and resource type)
+- plan-state.json  (state lineage/serial the plan was computed against)
+- unifi.json, cloudflare.json (generated configurations the plan was computed from)
 
 Notes
 -----
-- Binary plan file can be used with 'terraform apply plan.tfplan'
+- Apply this plan as reviewed with 'dagger call deploy ... --plan-dir=<this directory>'
+  (same scope, backend and state flags; rejected if the state changed since)
 - JSON file is suitable for policy-as-code tools (OPA, Sentinel)
-- Text file is optimized for manual review and diffing
-- Plan files may contain sensitive values - handle securely
+{plan_txt_note}- Plan files may contain sensitive values - handle securely
 - This plan was generated using the combined Terraform module
 """
 
@@ -1251,6 +2145,203 @@ Notes
 
         return output_dir
 
+    @function
+    async def detect_drift(
+        self,
+        kcl_source: Annotated[dagger.Directory, Doc("Source directory containing KCL configs")],
+        unifi_url: Annotated[str, Doc("UniFi Controller URL")] = "",
+        cloudflare_token: Annotated[Optional[Secret], Doc("Cloudflare API Token")] = None,
+        cloudflare_account_id: Annotated[str, Doc("Cloudflare Account ID")] = "",
+        zone_name: Annotated[str, Doc("DNS zone name")] = "",
+        api_url: Annotated[str, Doc("UniFi API URL (defaults to unifi_url)")] = "",
+        unifi_api_key: Annotated[Optional[Secret], Doc("UniFi API key (mutually exclusive with username/password)")] = None,
+        unifi_username: Annotated[Optional[Secret], Doc("UniFi username (use with password)")] = None,
+        unifi_password: Annotated[Optional[Secret], Doc("UniFi password (use with username)")] = None,
+        unifi_insecure: Annotated[bool, Doc("Skip TLS verification for UniFi controller (useful for self-signed certificates)")] = False,
+        unifi_only: Annotated[bool, Doc("Check only UniFi DNS (mutually exclusive with --cloudflare-only)")] = False,
+        cloudflare_only: Annotated[bool, Doc("Check only Cloudflare Tunnels (mutually exclusive with --unifi-only)")] = False,
+        terraform_version: Annotated[str, Doc("Terraform version to use (e.g., '1.10.0' or 'latest')")] = "latest",
+        terraform_image_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt Terraform image tarball with provider mirror (from terraform-mirror-image export)")] = None,
+        terraform_image: Annotated[str, Doc("Prebuilt Terraform image reference with provider mirror (e.g., a local registry)")] = "",
+        kcl_version: Annotated[str, Doc("KCL version to use (e.g., '0.11.0' or 'latest')")] = "latest",
+        kcl_toolchain_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt KCL toolchain image tarball (from kcl-toolchain export)")] = None,
+        kcl_toolchain_image: Annotated[str, Doc("Prebuilt KCL toolchain image reference (e.g., a local registry)")] = "",
+        kcl_offline: Annotated[bool, Doc("Fail fast instead of downloading KCL dependencies missing from the cache")] = False,
+        backend_type: Annotated[str, Doc("Terraform backend type (local, s3, azurerm, gcs, remote, etc.)")] = "local",
+        backend_config_file: Annotated[Optional[dagger.File], Doc("Backend configuration HCL file (required for remote backends)")] = None,
+        state_dir: Annotated[Optional[dagger.Directory], Doc("Directory for persistent Terraform state (mutually exclusive with remote backend)")] = None,
+        max_resources: Annotated[int, Doc("Maximum number of drifted resources listed in the report")] = 100,
+    ) -> str:
+        """
+        Detect drift between Terraform state and live UniFi/Cloudflare resources.
+
+        Runs `terraform plan -refresh-only -detailed-exitcode` against the glue
+        module, with the same setup as plan, and returns a compact JSON report.
+        Nothing is written: no plan files are exported and the state is not
+        locked or updated. Intended for scheduled runs, so it keeps the work
+        per call small:
+        - KCL is not re-run when the generated configs are cached
+        - Terraform init is cached; only the refresh-only plan always runs
+        - The plan is only read (terraform show -json) when drift was found
+
+        Report fields: drifted, exit_code, checked_at, scope, kcl_cache,
+        terraform_version, by_action, by_module, resources (address, module,
+        action and the names of drifted attributes; never values), outputs.
+
+        Args:
+            kcl_source: Directory containing KCL module
+            unifi_url: UniFi Controller URL (required when checking UniFi)
+            cloudflare_token: Cloudflare API Token (required when checking Cloudflare)
+            cloudflare_account_id: Cloudflare Account ID (required when checking Cloudflare)
+            zone_name: DNS zone name (required when checking Cloudflare)
+            api_url: Optional UniFi API URL
+            unifi_api_key: UniFi API key (optional)
+            unifi_username: UniFi username (optional)
+            unifi_password: UniFi password (optional)
+            unifi_insecure: Skip TLS verification for self-signed certificates
+            unifi_only: Check only UniFi DNS
+            cloudflare_only: Check only Cloudflare Tunnels
+            terraform_version: Terraform version to use (default: "latest")
+            terraform_image_tarball: Prebuilt Terraform image tarball from terraform-mirror-image (optional)
+            terraform_image: Prebuilt Terraform image reference, e.g. a local registry (optional)
+            kcl_version: KCL version to use (default: "latest")
+            kcl_toolchain_tarball: Prebuilt KCL toolchain image tarball for offline runs (optional)
+            kcl_toolchain_image: Prebuilt KCL toolchain image reference, e.g. a local registry (optional)
+            kcl_offline: Never download KCL dependencies; fail if they are not cached (default: False)
+            backend_type: Terraform backend type (local, s3, azurerm, gcs, remote, etc.)
+            backend_config_file: Backend configuration HCL file (required for remote backends)
+            state_dir: Directory for persistent Terraform state (mutually exclusive with remote backend)
+            max_resources: Maximum number of drifted resources listed (default: 100)
+
+        Returns:
+            Single-line JSON drift report ("drifted": true when Terraform
+            exited with 2)
+
+        Example:
+            dagger call detect-drift \\
+                --kcl-source=./kcl \\
+                --unifi-url=https://unifi.local:8443 \\
+                --unifi-api-key=env:UNIFI_API_KEY \\
+                --cloudflare-token=env:CF_TOKEN \\
+                --cloudflare-account-id=xxx \\
+                --zone-name=example.com \\
+                --backend-type=s3 \\
+                --backend-config-file=./s3-backend.hcl \\
+                | jq -e '.drifted == false'
+        """
+        self._validate_plan_scope(
+            "drift detection", unifi_only, cloudflare_only, unifi_url, unifi_api_key, unifi_username,
+            unifi_password, cloudflare_token, cloudflare_account_id, zone_name,
+        )
+
+        is_valid, error_msg = self._validate_backend_config(backend_type, backend_config_file)
+        if not is_valid:
+            raise ValueError(error_msg)
+
+        is_valid, error_msg = self._validate_state_storage_config(backend_type, state_dir)
+        if not is_valid:
+            raise ValueError(error_msg)
+
+        if unifi_only:
+            scope = "unifi"
+        elif cloudflare_only:
+            scope = "cloudflare"
+        else:
+            scope = "all"
+
+        # Generated configs are cached by KCL source content, so unchanged
+        # sources never re-run KCL
+        try:
+            config_dir, kcl_cache_status = await self._generate_configs_for_terraform(
+                await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image),
+                kcl_source,
+                kcl_version,
+                kcl_toolchain_tarball,
+                kcl_toolchain_image,
+                kcl_offline=kcl_offline,
+                include_unifi=not cloudflare_only,
+                include_cloudflare=not unifi_only,
+            )
+        except Exception as e:
+            component = e.component if isinstance(e, KCLGenerationError) and e.component else "KCL"
+            raise RuntimeError(f"✗ Failed: Could not generate {component} config\n{str(e)}")
+
+        unifi_dir = None
+        cloudflare_dir = None
+        if not cloudflare_only:
+            unifi_dir = dagger.dag.directory().with_file("unifi.json", config_dir.file("unifi.json"))
+        if not unifi_only:
+            cloudflare_dir = dagger.dag.directory().with_file("cloudflare.json", config_dir.file("cloudflare.json"))
+
+        report = DriftReport(max_resources=max_resources)
+        plan_info: dict = {}
+        try:
+            # No cache buster for the setup, so Dagger reuses the container and init
+            pipeline = await self._glue_terraform_pipeline(
+                terraform_version=terraform_version,
+                terraform_image_tarball=terraform_image_tarball,
+                terraform_image=terraform_image,
+                cache_buster="",
+                unifi_dir=unifi_dir,
+                cloudflare_dir=cloudflare_dir,
+                unifi_url=unifi_url,
+                api_url=api_url if api_url else unifi_url,
+                unifi_insecure=unifi_insecure,
+                cloudflare_account_id=cloudflare_account_id,
+                zone_name=zone_name,
+                unifi_only=unifi_only,
+                cloudflare_only=cloudflare_only,
+                unifi_api_key=unifi_api_key,
+                unifi_username=unifi_username,
+                unifi_password=unifi_password,
+                cloudflare_token=cloudflare_token,
+                backend_type=backend_type,
+                backend_config_file=backend_config_file,
+                state_dir=state_dir,
+            )
+
+            # The refresh must query live infrastructure on every call
+            pipeline.then(lambda c: c.with_env_variable("DRIFT_CHECK_NONCE", str(time.time_ns())))
+            # A refresh-only plan that is never applied does not write state,
+            # so it does not need to wait for (or block) a running deploy
+            pipeline.exec(
+                "drift", "Terraform refresh-only plan failed",
+                ["terraform", "plan", "-refresh-only", "-detailed-exitcode", "-input=false", "-lock=false", "-out=drift.tfplan"],
+                expect=dagger.ReturnType.ANY,
+            )
+            exit_code = await pipeline.exit_code()
+            if exit_code not in (0, 2):
+                stdout, stderr = await asyncio.gather(pipeline.container.stdout(), pipeline.container.stderr())
+                raise RuntimeError(
+                    "✗ Failed: Terraform refresh-only plan failed\n"
+                    f"Exit code: {exit_code}\nStdout:\n{stdout or 'N/A'}\nStderr:\n{stderr or 'N/A'}"
+                )
+
+            # Only read the plan when there is something to report
+            if exit_code == 2:
+                pipeline.exec(
+                    "show-json", "Could not render the refresh-only plan",
+                    ["sh", "-c", "terraform show -json drift.tfplan > drift.json"],
+                )
+                await pipeline.sync()
+                workdir = "/state" if state_dir is not None else "/module/glue"
+                with tempfile.TemporaryDirectory(prefix="drift-") as tmp_dir:
+                    drift_json_path = os.path.join(tmp_dir, "drift.json")
+                    await pipeline.container.file(f"{workdir}/drift.json").export(drift_json_path)
+                    with open(drift_json_path, encoding="utf-8") as f:
+                        plan_info = stream_plan(f, report.add, changes_key="resource_drift")
+        except PipelineStepError as e:
+            raise RuntimeError(_pipeline_failure_message(e, backend_type))
+
+        result = report.to_dict(
+            exit_code,
+            plan_info,
+            checked_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            scope=scope,
+            kcl_cache=kcl_cache_status,
+        )
+        return json.dumps(result, separators=(",", ":"))
+
     @function
     async def destroy(
         self,
@@ -1267,10 +2358,18 @@ Notes
         unifi_only: Annotated[bool, Doc("Destroy only UniFi DNS (mutually exclusive with --cloudflare-only)")] = False,
         cloudflare_only: Annotated[bool, Doc("Destroy only Cloudflare Tunnels (mutually exclusive with --unifi-only)")] = False,
         terraform_version: Annotated[str, Doc("Terraform version to use (e.g., '1.10.0' or 'latest')")] = "latest",
+        terraform_image_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt Terraform image tarball with provider mirror (from terraform-mirror-image export)")] = None,
+        terraform_image: Annotated[str, Doc("Prebuilt Terraform image reference with provider mirror (e.g., a local registry)")] = "",
         kcl_version: Annotated[str, Doc("KCL version to use (e.g., '0.11.0' or 'latest')")] = "latest",
+        kcl_toolchain_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt KCL toolchain image tarball (from kcl-toolchain export)")] = None,
+        kcl_toolchain_image: Annotated[str, Doc("Prebuilt KCL toolchain image reference (e.g., a local registry)")] = "",
+        kcl_offline: Annotated[bool, Doc("Fail fast instead of downloading KCL dependencies missing from the cache")] = False,
         backend_type: Annotated[str, Doc("Terraform backend type (local, s3, azurerm, gcs, remote, etc.)")] = "local",
         backend_config_file: Annotated[Optional[dagger.File], Doc("Backend configuration HCL file (required for remote backends)")] = None,
         state_dir: Annotated[Optional[dagger.Directory], Doc("Directory for persistent Terraform state (mutually exclusive with remote backend)")] = None,
+        parallelism: Annotated[int, Doc("Number of concurrent Terraform operations (0 keeps Terraform's default of 10)")] = 0,
+        refresh: Annotated[bool, Doc("Refresh resources before planning (--refresh=false skips the refresh)")] = True,
+        targets: Annotated[Optional[list[str]], Doc("MAC addresses or hostnames to limit the run to (translated to -target addresses)")] = None,
         cache_buster: Annotated[str, Doc("Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))")] = "",
     ) -> str:
         """
@@ -1303,10 +2402,20 @@ Notes
             unifi_only: Destroy only UniFi DNS (no Cloudflare credentials needed)
             cloudflare_only: Destroy only Cloudflare Tunnels (no UniFi credentials needed)
             terraform_version: Terraform version to use (default: "latest")
+            terraform_image_tarball: Prebuilt Terraform image tarball from terraform-mirror-image (optional)
+            terraform_image: Prebuilt Terraform image reference, e.g. a local registry (optional)
             kcl_version: KCL version to use (default: "latest")
+            kcl_toolchain_tarball: Prebuilt KCL toolchain image tarball for offline runs (optional)
+            kcl_toolchain_image: Prebuilt KCL toolchain image reference, e.g. a local registry (optional)
+            kcl_offline: Never download KCL dependencies; fail if they are not cached (default: False)
             backend_type: Terraform backend type (local, s3, azurerm, gcs, remote, etc.)
             backend_config_file: Backend configuration HCL file (required for remote backends)
             state_dir: Directory for persistent Terraform state (mutually exclusive with remote backend)
+            parallelism: Number of concurrent Terraform operations (default: 0, Terraform's default of 10)
+            refresh: Refresh resources before planning; False passes -refresh=false (default: True)
+            targets: MAC addresses, device/tunnel hostnames or public hostnames. They are
+                resolved against the generated configurations into -target addresses of
+                the matching unifi_dns and cloudflare_tunnel resources.
             cache_buster: Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))
 
         Returns:
@@ -1413,31 +2522,41 @@ Notes
         results.append("PHASE 1: Generating KCL configurations")
         results.append("=" * 60)
 
-        # Bust cache for KCL generation by adding timestamp file to source
-        effective_kcl_source = kcl_source
-        if effective_cache_buster:
-            effective_kcl_source = kcl_source.with_new_file(".cache-bust", effective_cache_buster)
+        unifi_dir = None
+        cloudflare_dir = None
+
+        # Evaluate main.k once for every requested provider output
+        try:
+            # Cached by KCL source content; --cache-buster only affects Terraform.
+            # The Terraform image is pulled while KCL runs.
+            config_dir, kcl_cache_status = await self._generate_configs_for_terraform(
+                await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image),
+                kcl_source,
+                kcl_version,
+                kcl_toolchain_tarball,
+                kcl_toolchain_image,
+                kcl_offline=kcl_offline,
+                include_unifi=not cloudflare_only,
+                include_cloudflare=not unifi_only,
+            )
+        except Exception as e:
+            component = e.component if isinstance(e, KCLGenerationError) and e.component else "KCL"
+            return f"✗ Failed: Could not generate {component} config\n{str(e)}"
 
-        unifi_dir = None
-        cloudflare_dir = None
+        if kcl_cache_status == "hit":
+            results.append("✓ KCL generation cache hit (KCL run skipped)")
+        else:
+            results.append("○ KCL generation cache miss (configurations regenerated)")
 
         if not cloudflare_only:  # Generate UniFi config unless cloudflare-only
-            try:
-                unifi_file = await self.generate_unifi_config(effective_kcl_source, kcl_version)
-                unifi_dir = dagger.dag.directory().with_file("unifi.json", unifi_file)
-                results.append("✓ UniFi configuration generated")
-            except Exception as e:
-                return f"✗ Failed: Could not generate UniFi config\n{str(e)}"
+            unifi_dir = dagger.dag.directory().with_file("unifi.json", config_dir.file("unifi.json"))
+            results.append("✓ UniFi configuration generated")
         else:
             results.append("○ UniFi configuration skipped (--cloudflare-only)")
 
         if not unifi_only:  # Generate Cloudflare config unless unifi-only
-            try:
-                cloudflare_file = await self.generate_cloudflare_config(effective_kcl_source, kcl_version)
-                cloudflare_dir = dagger.dag.directory().with_file("cloudflare.json", cloudflare_file)
-                results.append("✓ Cloudflare configuration generated")
-            except Exception as e:
-                return f"✗ Failed: Could not generate Cloudflare config\n{str(e)}"
+            cloudflare_dir = dagger.dag.directory().with_file("cloudflare.json", config_dir.file("cloudflare.json"))
+            results.append("✓ Cloudflare configuration generated")
         else:
             results.append("○ Cloudflare configuration skipped (--unifi-only)")
 
@@ -1466,7 +2585,7 @@ Notes
         results.append("=" * 60)
 
         # Create Terraform container and select module based on deployment mode
-        ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
+        ctr = await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image)
 
         # Add cache buster IMMEDIATELY to ensure Terraform operations aren't cached
         if effective_cache_buster:
@@ -1493,6 +2612,17 @@ Notes
         except Exception as e:
             return f"✗ Failed: Could not mount Terraform module at terraform/modules/{module_path}: {str(e)}"
 
+        # -parallelism, -refresh=false and -target addresses for the selected module
+        try:
+            run_args = await _terraform_run_args(
+                parallelism, refresh, targets, unifi_dir, cloudflare_dir, module_path,
+            )
+        except ValueError as e:
+            return f"✗ Failed: Invalid Terraform run options\n{str(e)}"
+        if targets:
+            target_count = sum(arg.startswith("-target=") for arg in run_args)
+            results.append(f"✓ Targeting {target_count} resources for: {', '.join(targets)}")
+
         # Mount configuration files conditionally
         if unifi_dir is not None:
             ctr = ctr.with_directory("/workspace/unifi", unifi_dir)
@@ -1576,49 +2706,48 @@ Notes
                 # Use CLOUDFLARE_API_TOKEN env var - more reliable with Dagger secrets
                 ctr = ctr.with_secret_variable("CLOUDFLARE_API_TOKEN", cloudflare_token)
 
+        init_cmd = ["terraform", "init"]
+        if backend_config_file is not None:
+            init_cmd.extend(["-backend-config=/root/.terraform/backend.tfbackend"])
+
         # Handle state directory mounting and setup (persistent local state)
+        # Only changed module files are copied; .terraform is kept and reused
+        # while the module sources and lock file are unchanged
+        state_init_reusable = False
         if using_persistent_state:
             ctr = ctr.with_directory("/state", state_dir)
-            ctr = ctr.with_exec(["sh", "-c", "rm -rf /state/.terraform && echo 'Cleaned .terraform directory'"])
-            _ = await ctr.stdout()
-            ctr = ctr.with_exec(["sh", "-c", f"cp -r {workdir}/* /state/ && ls -la /state"])
-            _ = await ctr.stdout()
+            ctr = ctr.with_exec(["sh", "-c", state_sync_script(workdir, "/module", init_cmd)])
+            state_init_reusable = (await ctr.stdout()).strip().endswith("reuse")
             ctr = ctr.with_workdir("/state")
         else:
             ctr = ctr.with_workdir(workdir)
 
-        # Run terraform init
-        init_cmd = ["terraform", "init"]
-        if backend_config_file is not None:
-            init_cmd.extend(["-backend-config=/root/.terraform/backend.tfbackend"])
-
-        try:
-            ctr = ctr.with_exec(init_cmd)
-            _ = await ctr.stdout()
-            results.append("✓ Terraform init completed")
-        except dagger.ExecError as e:
-            error_msg = f"✗ Failed: Terraform init failed\n{str(e)}"
-            if backend_type != "local":
-                error_msg += (
-                    "\n\nBackend configuration troubleshooting:\n"
-                    "  - Verify backend config file is valid HCL\n"
-                    "  - Check credentials in environment variables\n"
-                    "  - Ensure backend infrastructure exists (bucket, table, etc.)"
-                )
-            return error_msg
+        # Init and destroy are chained lazily and synced once; a failed exec
+        # is mapped back to the step it came from
+        pipeline = TerraformPipeline(ctr)
+        if state_init_reusable:
+            results.append("✓ Terraform init skipped (state directory already initialized)")
+        else:
+            state_module_root = "/module" if using_persistent_state else None
+            pipeline.container = await self._terraform_init(
+                ctr, terraform_version, init_cmd, state_module_root=state_module_root,
+            )
+            pipeline.record("init", "Terraform init failed", init_exec_command(init_cmd, state_module_root))
 
-        # Run terraform destroy (no targeting needed - using individual modules)
-        destroy_cmd = ["terraform", "destroy", "-auto-approve"]
+        # Run terraform destroy (individual modules per scope; --targets narrows further)
+        destroy_cmd = ["terraform", "destroy", "-auto-approve", *run_args]
 
         try:
-            ctr = ctr.with_exec(destroy_cmd)
-            destroy_result = await ctr.stdout()
-            results.append("✓ Terraform destroy completed")
+            pipeline.exec("destroy", "Terraform destroy failed", destroy_cmd)
+            destroy_result = await pipeline.sync()
+        except PipelineStepError as e:
+            return _pipeline_failure_message(e, backend_type)
         except dagger.ExecError as e:
-            error_details = f"Exit code: {e.exit_code}\n"
-            error_details += f"Stdout:\n{e.stdout or 'N/A'}\n"
-            error_details += f"Stderr:\n{e.stderr or 'N/A'}"
-            return f"✗ Failed: Terraform destroy failed\n{error_details}"
+            return f"✗ Failed: Terraform destroy failed\n{exec_error_details(e)}"
+
+        if not state_init_reusable:
+            results.append("✓ Terraform init completed")
+        results.append("✓ Terraform destroy completed")
 
         # Final summary
         results.append("")
@@ -1643,6 +2772,9 @@ Notes
         self,
         source: Annotated[dagger.Directory, Doc("Source directory containing KCL configs")],
         kcl_version: Annotated[str, Doc("KCL version to use")] = "latest",
+        kcl_toolchain_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt KCL toolchain image tarball (from kcl-toolchain export)")] = None,
+        kcl_toolchain_image: Annotated[str, Doc("Prebuilt KCL toolchain image reference (e.g., a local registry)")] = "",
+        kcl_offline: Annotated[bool, Doc("Fail fast instead of downloading KCL dependencies missing from the cache")] = False,
     ) -> dagger.File:
         """
         Generate Cloudflare JSON configuration from KCL schemas.
@@ -1653,6 +2785,9 @@ Notes
         Args:
             source: Directory containing KCL module (must have kcl.mod)
             kcl_version: KCL version to use (default: "latest")
+            kcl_toolchain_tarball: Prebuilt toolchain image tarball for offline runs (optional)
+            kcl_toolchain_image: Prebuilt toolchain image reference, e.g. a local registry (optional)
+            kcl_offline: Never download KCL dependencies; fail if they are not cached (default: False)
 
         Returns:
             dagger.File containing the generated Cloudflare JSON configuration
@@ -1660,160 +2795,15 @@ Notes
         Example:
             dagger call generate-cloudflare-config --source=./kcl export --path=./cloudflare.json
         """
-        # Check for kcl.mod
-        try:
-            mod_file = source.file("kcl.mod")
-            _ = await mod_file.contents()
-        except Exception:
-            raise KCLGenerationError(
-                "✗ No kcl.mod found in source directory. "
-                "Is this a valid KCL module?\n"
-                "Hint: Run 'kcl mod init' in your KCL directory to create a module."
-            )
-
-        # Check for main.k entry point
-        try:
-            main_file = source.file("main.k")
-            _ = await main_file.contents()
-        except Exception:
-            raise KCLGenerationError(
-                "✗ Entry point file not found: main.k\n"
-                "The module requires main.k as the entry point.\n"
-                "Hint: Ensure your KCL module has a main.k file that exports cf_output."
-            )
-
-        # Create container with KCL and yq for YAML to JSON conversion
-        base_ctr = dagger.dag.container().from_(f"kcllang/kcl:{kcl_version}")
-        
-        # Install curl and yq for YAML to JSON conversion
-        ctr = base_ctr.with_exec([
-            "sh", "-c",
-            "apt-get update && apt-get install -y curl && curl -sL https://github.com/mikefarah/yq/releases/latest/download/yq_linux_amd64 -o /usr/local/bin/yq && chmod +x /usr/local/bin/yq"
-        ])
-        
-        # Mount source directory
-        ctr = ctr.with_directory("/src", source).with_workdir("/src")
-
-        # Step 1: Download KCL dependencies to prevent git clone messages in output
-        # This must be done before 'kcl run' to ensure clean YAML output
-        try:
-            ctr = ctr.with_exec(["kcl", "mod", "update"])
-            await ctr.stdout()  # Wait for completion but don't capture output
-        except dagger.ExecError as e:
-            raise KCLGenerationError(
-                f"✗ Failed to download KCL dependencies:\n"
-                f"Exit code: {e.exit_code}\n"
-                f"Stderr: {e.stderr}\n"
-                f"\nPossible causes:\n"
-                f"  - Network connectivity issues\n"
-                f"  - Invalid kcl.mod syntax\n"
-                f"  - Git repository not accessible\n"
-                f"\nSuggested fixes:\n"
-                f"  - Check your network connection\n"
-                f"  - Validate kcl.mod syntax with 'kcl mod graph' locally\n"
-                f"  - Ensure git dependencies are accessible from this environment"
-            )
-
-        # Step 2: Run KCL main.k and capture full output
-        try:
-            ctr = ctr.with_exec(["kcl", "run", "main.k"])
-            kcl_output = await ctr.stdout()
-        except dagger.ExecError as e:
-            raise KCLGenerationError(
-                f"✗ KCL execution failed:\n"
-                f"Exit code: {e.exit_code}\n"
-                f"Stdout: {e.stdout}\n"
-                f"Stderr: {e.stderr}\n"
-                f"\nHint: Check your KCL syntax with 'kcl run main.k' locally."
-            )
-
-        # Step 3: Check for validation errors in output
-        # When KCL validation fails, generate_with_output() prints errors and returns no JSON
-        if "✗" in kcl_output or "VALIDATION" in kcl_output:
-            raise KCLGenerationError(
-                f"✗ KCL validation failed:\n\n{kcl_output}\n"
-                f"\nThe KCL configuration has validation errors that must be fixed.\n"
-                f"See the error messages above for details on what needs to be corrected."
-            )
-
-        # Step 4: Validate empty output
-        if not kcl_output or not kcl_output.strip():
-            raise KCLGenerationError(
-                "✗ KCL produced empty output:\n"
-                "Possible causes:\n"
-                "  - main.k is empty or has no output statements\n"
-                "  - KCL module has no output statements\n"
-                "  - All configurations are commented out\n"
-                "\nHint: Run 'kcl run main.k' locally to see the raw output."
-            )
-
-        # Step 5: Write KCL output to temporary file for yq extraction
-        ctr = ctr.with_new_file("/tmp/kcl-output.yaml", kcl_output)
-
-        # Step 6: Extract cf_output section using yq
-        try:
-            ctr = ctr.with_exec(["yq", "eval", ".cf_output", "/tmp/kcl-output.yaml"])
-            cf_yaml = await ctr.stdout()
-        except dagger.ExecError as e:
-            raise KCLGenerationError(
-                f"✗ Failed to extract cf_output from YAML:\n"
-                f"yq error: {e.stderr}\n"
-                f"\nHint: Ensure your main.k exports 'cf_output' as a public variable."
-            )
-
-        # Step 7: Check for null output (missing key)
-        if not cf_yaml or cf_yaml.strip() == "null" or not cf_yaml.strip():
-            raise KCLGenerationError(
-                "✗ main.k does not export 'cf_output':\n"
-                "The main.k file must export a public variable named 'cf_output'.\n"
-                "\nExample:\n"
-                "  import unifi_cloudflare_glue.generators.cloudflare as cf_gen\n"
-                "  cf_output = cf_gen.generate_with_output(config)\n"
-                "\nHint: Run 'kcl run main.k' locally to inspect the output structure."
-            )
-
-        # Step 8: Convert extracted YAML to JSON
-        ctr = ctr.with_new_file("/tmp/cf-output.yaml", cf_yaml)
-        try:
-            ctr = ctr.with_exec(["yq", "eval", "-o=json", "/tmp/cf-output.yaml"])
-            json_result = await ctr.stdout()
-        except dagger.ExecError as e:
-            # Truncate output to 1000 characters for error display
-            truncated_output = cf_yaml[:1000] if len(cf_yaml) > 1000 else cf_yaml
-            ellipsis_indicator = "... (truncated)" if len(cf_yaml) > 1000 else ""
-            raise KCLGenerationError(
-                f"✗ YAML to JSON conversion failed:\n"
-                f"yq error: {e.stderr}\n"
-                f"\nExtracted cf_output that failed to parse:\n"
-                f"{'-' * 60}\n"
-                f"{truncated_output}{ellipsis_indicator}\n"
-                f"{'-' * 60}\n"
-                f"\nPossible causes:\n"
-                f"  - KCL validation warnings in output\n"
-                f"  - Invalid YAML structure in cf_output\n"
-                f"  - KCL syntax errors that produced partial output\n"
-                f"\nHint: Run 'kcl run main.k' locally to see the raw output."
-            )
-
-        # Step 9: Validate JSON output
-        try:
-            json.loads(json_result)
-        except json.JSONDecodeError as je:
-            # Truncate JSON result to 500 characters for error display
-            truncated_json = json_result[:500] if len(json_result) > 500 else json_result
-            json_ellipsis = "... (truncated)" if len(json_result) > 500 else ""
-            raise KCLGenerationError(
-                f"✗ Invalid JSON output after yq conversion:\n"
-                f"JSON parse error: {str(je)}\n"
-                f"\nInvalid output preview:\n"
-                f"{'-' * 60}\n"
-                f"{truncated_json}{json_ellipsis}\n"
-                f"{'-' * 60}\n"
-                f"\nHint: This may indicate a bug in yq or unexpected KCL output format."
-            )
-
-        # Step 10: Return as file
-        return dagger.dag.directory().with_new_file("cloudflare.json", json_result).file("cloudflare.json")
+        config_dir, _ = await self._generate_configs_cached(
+            source,
+            kcl_version,
+            kcl_toolchain_tarball,
+            kcl_toolchain_image,
+            kcl_offline=kcl_offline,
+            include_unifi=False,
+        )
+        return config_dir.file("cloudflare.json")
 
     def _generate_test_id(self) -> str:
         """Generate a random test identifier."""
@@ -1925,6 +2915,8 @@ Notes
         wait_before_cleanup: Annotated[int, Doc("Seconds to wait between validation and cleanup for manual verification")] = 0,
         test_mac_address: Annotated[str, Doc("MAC address for test device (must exist in UniFi controller, e.g., 'aa:bb:cc:dd:ee:ff')")] = "aa:bb:cc:dd:ee:ff",
         terraform_version: Annotated[str, Doc("Terraform version to use (e.g., '1.10.0' or 'latest')")] = "latest",
+        terraform_image_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt Terraform image tarball with provider mirror (from terraform-mirror-image export)")] = None,
+        terraform_image: Annotated[str, Doc("Prebuilt Terraform image reference with provider mirror (e.g., a local registry)")] = "",
         kcl_version: Annotated[str, Doc("KCL version to use (e.g., '0.11.0' or 'latest')")] = "latest",
     ) -> str:
         """
@@ -1957,6 +2949,8 @@ Notes
             test_mac_address: MAC address for the test device. This MAC must exist in your
                 UniFi controller. Use a real device MAC from your network (default: "aa:bb:cc:dd:ee:ff")
             terraform_version: Terraform version to use (default: "latest")
+            terraform_image_tarball: Prebuilt Terraform image tarball from terraform-mirror-image (optional)
+            terraform_image: Prebuilt Terraform image reference, e.g. a local registry (optional)
             kcl_version: KCL version to use (default: "latest")
 
         Returns:
@@ -2135,7 +3129,7 @@ Notes
             cloudflare_dir = dagger.dag.directory().with_new_file("cloudflare.json", cloudflare_json)
 
             # Create Terraform container following deploy_cloudflare() pattern
-            cf_ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
+            cf_ctr = await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image)
 
             # Mount Cloudflare config at /workspace
             cf_ctr = cf_ctr.with_directory("/workspace", cloudflare_dir)
@@ -2165,7 +3159,8 @@ Notes
 
             # Execute terraform init
             try:
-                init_result = await cf_ctr.with_exec(["terraform", "init"]).stdout()
+                cf_ctr = await self._terraform_init(cf_ctr, terraform_version)
+                init_result = await cf_ctr.stdout()
                 report_lines.append("  ✓ Terraform init completed")
             except dagger.ExecError as e:
                 error_msg = f"Terraform init failed: {str(e)}"
@@ -2209,7 +3204,7 @@ Notes
             unifi_dir = dagger.dag.directory().with_new_file("unifi.json", unifi_json)
 
             # Create Terraform container following deploy_unifi() pattern
-            unifi_ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
+            unifi_ctr = await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image)
 
             # Mount UniFi config at /workspace
             unifi_ctr = unifi_ctr.with_directory("/workspace", unifi_dir)
@@ -2244,7 +3239,8 @@ Notes
 
             # Execute terraform init
             try:
-                init_result = await unifi_ctr.with_exec(["terraform", "init"]).stdout()
+                unifi_ctr = await self._terraform_init(unifi_ctr, terraform_version)
+                init_result = await unifi_ctr.stdout()
                 report_lines.append("  ✓ Terraform init completed")
             except dagger.ExecError as e:
                 error_msg = f"Terraform init failed: {str(e)}"
@@ -2290,6 +3286,8 @@ Notes
                     cloudflare_account_id=cloudflare_account_id,
                     zone_name=cloudflare_zone,
                     terraform_version=terraform_version,
+                    terraform_image_tarball=terraform_image_tarball,
+                    terraform_image=terraform_image,
                     state_dir=cf_state_for_secrets,
                     output_format="json",
                 )
@@ -2339,6 +3337,8 @@ Notes
                     cloudflare_account_id=cloudflare_account_id,
                     zone_name=cloudflare_zone,
                     terraform_version=terraform_version,
+                    terraform_image_tarball=terraform_image_tarball,
+                    terraform_image=terraform_image,
                     state_dir=cf_state_for_secrets,
                     output_format="human",
                 )
@@ -2500,7 +3500,7 @@ Notes
 
                 try:
                     # Create Cloudflare cleanup container
-                    cf_cleanup_ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
+                    cf_cleanup_ctr = await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image)
 
                     # Mount Cloudflare config at /workspace
                     cf_cleanup_ctr = cf_cleanup_ctr.with_directory("/workspace", cloudflare_dir)
@@ -2543,7 +3543,8 @@ Notes
 
                     # Execute terraform init (no retry for init failures - fail fast)
                     try:
-                        await cf_cleanup_ctr.with_exec(["terraform", "init"]).stdout()
+                        cf_cleanup_ctr = await self._terraform_init(cf_cleanup_ctr, terraform_version)
+                        await cf_cleanup_ctr.stdout()
                     except dagger.ExecError as e:
                         raise RuntimeError(f"Terraform init failed: {str(e)}")
 
@@ -2595,7 +3596,7 @@ Notes
                 report_lines.append("  Cleaning up UniFi resources...")
                 try:
                     # Create UniFi cleanup container
-                    unifi_cleanup_ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
+                    unifi_cleanup_ctr = await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image)
 
                     # Mount UniFi config at /workspace
                     unifi_cleanup_ctr = unifi_cleanup_ctr.with_directory("/workspace", unifi_dir)
@@ -2643,7 +3644,8 @@ Notes
 
                     # Execute terraform init
                     try:
-                        await unifi_cleanup_ctr.with_exec(["terraform", "init"]).stdout()
+                        unifi_cleanup_ctr = await self._terraform_init(unifi_cleanup_ctr, terraform_version)
+                        await unifi_cleanup_ctr.stdout()
                     except dagger.ExecError as e:
                         raise RuntimeError(f"Terraform init failed: {str(e)}")
 
@@ -2709,67 +3711,147 @@ Notes
 
         return "\n".join(report_lines)
 
-    async def _detect_deployment_module(
+    async def _read_tunnel_secrets(
         self,
-        tf_ctr: dagger.Container,
-        cache_buster: str = "",
-    ) -> tuple[str, list[str]]:
+        source: Optional[dagger.Directory],
+        terraform_version: str,
+        terraform_image_tarball: Optional[dagger.File],
+        terraform_image: str,
+        backend_type: str,
+        backend_config_file: Optional[dagger.File],
+        state_dir: Optional[dagger.Directory],
+        cache_buster: str,
+    ) -> tuple[str, dict]:
         """
-        Detect which Terraform module created the state by inspecting available outputs.
+        Read the tunnel maps from one Terraform state document.
 
-        This helper function queries `terraform output -json` to determine whether
-        the state was created by the cloudflare-tunnel module (unprefixed outputs)
-        or the glue module (prefixed outputs with 'cloudflare_' prefix).
+        One state document per call: terraform.tfstate for local state, one
+        `terraform state pull` for remote backends. Module detection and the
+        three tunnel maps are all extracted from it in process.
 
         Args:
-            tf_ctr: Initialized Terraform container with module mounted
-            cache_buster: Optional cache buster for cache control
+            source: Directory mounted at /src for remote backends (optional)
+            terraform_version: Terraform version for remote backends
+            terraform_image_tarball: Prebuilt Terraform image tarball (optional)
+            terraform_image: Prebuilt Terraform image reference (optional)
+            backend_type: Terraform backend type
+            backend_config_file: Backend configuration file (remote backends)
+            state_dir: Directory holding terraform.tfstate (local backend)
+            cache_buster: Unique value to bypass Dagger cache
 
         Returns:
-            Tuple of (module_type, available_outputs) where:
-            - module_type is either "cloudflare-tunnel" or "glue"
-            - available_outputs is a list of output names found in state
+            Tuple of (module type, {"tunnel_ids", "tunnel_tokens", "credentials_json"})
+
+        Raises:
+            ValueError: With a "✗ Failed: ..." message when the state cannot be
+                read or holds no tunnels
         """
-        try:
-            # Query all outputs from Terraform state
+        # Validate backend configuration (reuse existing helper)
+        is_valid, error_msg = self._validate_backend_config(backend_type, backend_config_file)
+        if not is_valid:
+            raise ValueError(error_msg)
+
+        # Validate state storage configuration (reuse existing helper)
+        is_valid, error_msg = self._validate_state_storage_config(backend_type, state_dir)
+        if not is_valid:
+            raise ValueError(error_msg)
+
+        # Check if state directory exists when provided
+        state_entries = []
+        if state_dir is not None:
+            try:
+                # Try to access the directory to verify it exists
+                state_entries = await state_dir.entries()
+            except Exception:
+                raise ValueError("✗ Failed: State directory not found. Check --state-dir path.")
+
+        if backend_type == "local":
+            # Local state: read terraform.tfstate without mounting the modules
+            # or running terraform init. Without --state-dir there is no state
+            # left from deploy.
+            state_text = ""
+            if LOCAL_STATE_FILE in state_entries:
+                state_text = await state_dir.file(LOCAL_STATE_FILE).contents()
+        else:
+            # Remote backend: minimal config that only connects to S3/etc. No
+            # module is mounted and no providers are installed
+            tf_ctr = await self._terraform_container(terraform_version, terraform_image_tarball, terraform_image)
+
+            # Add cache buster IMMEDIATELY to ensure Terraform operations aren't cached
+            if cache_buster:
+                tf_ctr = tf_ctr.with_env_variable("CACHE_BUSTER", cache_buster)
+
+            # Mount source directory at /src
+            if source is not None:
+                tf_ctr = tf_ctr.with_directory("/src", source)
+            tf_ctr = tf_ctr.with_workdir("/workspace")
+
+            # Create minimal backend.tf
+            backend_hcl = self._generate_backend_block(backend_type)
+            tf_ctr = tf_ctr.with_new_file("/workspace/backend.tf", backend_hcl)
+
+            # Process and mount backend config file
+            if backend_config_file is not None:
+                try:
+                    config_content, _ = await _process_backend_config(backend_config_file)
+                    tf_ctr = tf_ctr.with_new_file("/root/.terraform/backend.tfbackend", config_content)
+                except Exception as e:
+                    raise ValueError(f"✗ Failed: Could not process backend config file\n{str(e)}")
+
+            init_cmd = ["terraform", "init"]
+            if backend_config_file is not None:
+                init_cmd.extend(["-backend-config=/root/.terraform/backend.tfbackend"])
+
+            # Backend init and state pull are chained and synced once
+            pipeline = TerraformPipeline(await self._terraform_init(tf_ctr, terraform_version, init_cmd))
+            pipeline.record("init", "Terraform init failed", init_exec_command(init_cmd))
             if cache_buster:
                 # Inject cache buster as comment in shell command to make it unique
-                tf_ctr = tf_ctr.with_exec(["sh", "-c", f"# cache_bust={cache_buster}\nterraform output -json"])
+                pull_cmd = ["sh", "-c", f"# cache_bust={cache_buster}\nterraform state pull"]
             else:
-                tf_ctr = tf_ctr.with_exec(["terraform", "output", "-json"])
-
-            all_outputs = await tf_ctr.stdout()
-            outputs_dict = json.loads(all_outputs)
-            available_outputs = list(outputs_dict.keys())
-
-            # Detect module type based on output naming pattern
-            # Glue module uses 'cloudflare_' prefix on outputs
-            if "cloudflare_tunnel_ids" in available_outputs:
-                return "glue", available_outputs
-            elif "tunnel_ids" in available_outputs:
-                return "cloudflare-tunnel", available_outputs
-            else:
-                # Fallback to cloudflare-tunnel for backward compatibility
-                # This handles edge cases where outputs might be missing or corrupted
-                return "cloudflare-tunnel", available_outputs
+                pull_cmd = ["terraform", "state", "pull"]
+            pipeline.exec("state-pull", "Could not pull Terraform state", pull_cmd)
+            try:
+                state_text = await pipeline.sync()
+            except PipelineStepError as e:
+                raise ValueError(_pipeline_failure_message(e, backend_type))
+
+        try:
+            state = load_state(state_text)
+        except ValueError as e:
+            raise ValueError(f"✗ Failed: Could not parse Terraform state\n{str(e)}")
+
+        # Glue states expose cloudflare_-prefixed outputs (plus unprefixed aliases);
+        # without outputs the maps are rebuilt from the tunnel resources
+        try:
+            detected_module, secrets = state_tunnel_secrets(state)
+        except MissingOutputsError as e:
+            raise ValueError(
+                f"✗ Failed: Could not retrieve {', '.join(e.missing)} output\n"
+                f"Available outputs: {', '.join(e.available) if e.available else 'none'}"
+            )
 
-        except Exception:
-            # If we can't query outputs, default to cloudflare-tunnel
-            # This maintains backward compatibility
-            return "cloudflare-tunnel", []
+        # Validate that we have data
+        if not all(secrets[name] for name in ("tunnel_ids", "tunnel_tokens", "credentials_json")):
+            raise ValueError("✗ Failed: No tunnels found in Terraform outputs. State may be corrupted.")
+        return detected_module, secrets
 
     @function
     async def get_tunnel_secrets(
         self,
         source: Annotated[dagger.Directory, Doc("Source directory (for accessing terraform modules)")],
-        cloudflare_token: Annotated[Secret, Doc("Cloudflare API Token for authentication")],
-        cloudflare_account_id: Annotated[str, Doc("Cloudflare Account ID")],
         zone_name: Annotated[str, Doc("DNS zone name (e.g., example.com)")],
+        cloudflare_token: Annotated[Optional[Secret], Doc("Deprecated and ignored: secrets are read from Terraform state only")] = None,
+        cloudflare_account_id: Annotated[str, Doc("Deprecated and ignored: secrets are read from Terraform state only")] = "",
         terraform_version: Annotated[str, Doc("Terraform version to use (e.g., '1.10.0' or 'latest')")] = "latest",
+        terraform_image_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt Terraform image tarball with provider mirror (from terraform-mirror-image export)")] = None,
+        terraform_image: Annotated[str, Doc("Prebuilt Terraform image reference with provider mirror (e.g., a local registry)")] = "",
         backend_type: Annotated[str, Doc("Terraform backend type (local, s3, azurerm, gcs, remote, etc.)")] = "local",
         backend_config_file: Annotated[Optional[dagger.File], Doc("Backend configuration HCL file (required for remote backends)")] = None,
         state_dir: Annotated[Optional[dagger.Directory], Doc("Directory for persistent Terraform state (mutually exclusive with remote backend)")] = None,
-        output_format: Annotated[str, Doc("Output format: 'human' for readable text, 'json' for machine-parseable")] = "human",
+        output_format: Annotated[str, Doc("Output format: 'human' for readable text, 'json' for machine-parseable, 'ndjson' for one JSON line per tunnel")] = "human",
+        macs: Annotated[Optional[list[str]], Doc("Only return the tunnels of these MAC addresses")] = None,
+        tunnel_names: Annotated[Optional[list[str]], Doc("Only return the tunnels with these names (case-insensitive)")] = None,
         cache_buster: Annotated[str, Doc("Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))")] = "",
     ) -> str:
         """
@@ -2781,10 +3863,26 @@ Notes
         **Automatic Module Detection:**
         This function automatically detects whether the state was created by the
         cloudflare-tunnel module (standalone) or the glue module (combined deployment).
-        It queries available Terraform outputs to determine the correct output names:
+        It inspects the available Terraform outputs to determine the correct output names:
         - cloudflare-tunnel module: `tunnel_ids`, `tunnel_tokens`, `credentials_json`
         - glue module: `cloudflare_tunnel_ids`, `cloudflare_tunnel_tokens`, `cloudflare_credentials_json`
 
+        With local state (--state-dir), the outputs are read from terraform.tfstate
+        directly; no Terraform container is started and no `terraform init` runs.
+        With remote backends, one `terraform state pull` (after a backend-only init,
+        no providers) fetches the state in a single round trip. When the outputs are
+        missing, tunnel IDs, tokens and credentials are rebuilt from the tunnel and
+        tunnel secret resources in the same document.
+
+        --macs and --tunnel-names select tunnels (a tunnel matching any of them is
+        returned; an unmatched filter is an error). --output-format=ndjson emits one
+        compact JSON record per tunnel ({mac, tunnel_id, tunnel_name, tunnel_token,
+        credentials}) on its own line. The result is returned as one string once
+        all records are rendered (Dagger function results are not streamed).
+
+        --cloudflare-token and --cloudflare-account-id are deprecated and ignored:
+        the secrets come from Terraform state only.
+
         State Management (must match deployment configuration):
         1. Ephemeral (default): State stored in container from previous deploy
         2. Persistent Local: Use --state-dir=./terraform-state where state was saved
@@ -2792,40 +3890,40 @@ Notes
 
         Args:
             source: Source directory containing Terraform modules
-            cloudflare_token: Cloudflare API Token for authentication
-            cloudflare_account_id: Cloudflare Account ID
             zone_name: DNS zone name
-            terraform_version: Terraform version to use (default: "latest")
+            cloudflare_token: Deprecated, ignored (no Cloudflare API call is made);
+                accepted so existing invocations keep working
+            cloudflare_account_id: Deprecated, ignored (see cloudflare_token)
+            terraform_version: Terraform version to use for remote backends (default: "latest")
+            terraform_image_tarball: Prebuilt Terraform image tarball from terraform-mirror-image (optional)
+            terraform_image: Prebuilt Terraform image reference, e.g. a local registry (optional)
             backend_type: Terraform backend type (local, s3, azurerm, gcs, remote, etc.)
             backend_config_file: Backend configuration HCL file (required for remote backends)
             state_dir: Directory for persistent Terraform state (must match deployment)
-            output_format: Output format - 'human' for readable text, 'json' for automation
+            output_format: Output format - 'human' for readable text, 'json' for automation,
+                'ndjson' for one JSON record per tunnel
+            macs: MAC addresses of the tunnels to return (any format; default: all)
+            tunnel_names: Names of the tunnels to return (default: all)
             cache_buster: Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))
 
         Returns:
-            Tunnel secrets in requested format (human-readable or JSON)
+            Tunnel secrets in requested format (human-readable, JSON or NDJSON)
 
         Example:
             # Retrieve secrets with local ephemeral state (default)
             dagger call get-tunnel-secrets \\
                 --source=. \\
-                --cloudflare-token=env:CF_TOKEN \\
-                --cloudflare-account-id=xxx \\
                 --zone-name=example.com
 
             # Retrieve secrets from persistent state directory
             dagger call get-tunnel-secrets \\
                 --source=. \\
-                --cloudflare-token=env:CF_TOKEN \\
-                --cloudflare-account-id=xxx \\
                 --zone-name=example.com \\
                 --state-dir=./terraform-state
 
             # Retrieve secrets from remote backend (S3) using HCL config
             dagger call get-tunnel-secrets \\
                 --source=. \\
-                --cloudflare-token=env:CF_TOKEN \\
-                --cloudflare-account-id=xxx \\
                 --zone-name=example.com \\
                 --backend-type=s3 \\
                 --backend-config-file=./s3-backend.hcl
@@ -2833,8 +3931,6 @@ Notes
             # Retrieve secrets using YAML backend config (auto-converted)
             dagger call get-tunnel-secrets \\
                 --source=. \\
-                --cloudflare-token=env:CF_TOKEN \\
-                --cloudflare-account-id=xxx \\
                 --zone-name=example.com \\
                 --backend-type=s3 \\
                 --backend-config-file=./s3-backend.yaml
@@ -2842,16 +3938,21 @@ Notes
             # Get JSON output for automation
             dagger call get-tunnel-secrets \\
                 --source=. \\
-                --cloudflare-token=env:CF_TOKEN \\
-                --cloudflare-account-id=xxx \\
                 --zone-name=example.com \\
                 --output-format=json
 
+            # Stream the secrets of two tunnels, one JSON line each
+            dagger call get-tunnel-secrets \\
+                --source=. \\
+                --zone-name=example.com \\
+                --state-dir=./terraform-state \\
+                --macs=aa:bb:cc:dd:ee:01 \\
+                --tunnel-names=media-server \\
+                --output-format=ndjson
+
             # Force fresh execution (bypass Dagger cache)
             dagger call get-tunnel-secrets \\
                 --source=. \\
-                --cloudflare-token=env:CF_TOKEN \\
-                --cloudflare-account-id=xxx \\
                 --zone-name=example.com \\
                 --cache-buster=$(date +%s)
         """
@@ -2860,175 +3961,58 @@ Notes
             effective_cache_buster = cache_buster
 
             # Validate output format
-            if output_format not in ["human", "json"]:
+            if output_format not in ["human", "json", "ndjson"]:
                 return (
-                    "✗ Failed: Invalid output format. Must be 'human' or 'json'\n\n"
+                    "✗ Failed: Invalid output format. Must be 'human', 'json' or 'ndjson'\n\n"
                     "Example:\n"
                     "  dagger call get-tunnel-secrets \\\n"
                     "      --source=. \\\n"
-                    "      --cloudflare-token=env:CF_TOKEN \\\n"
-                    "      --cloudflare-account-id=xxx \\\n"
                     "      --zone-name=example.com \\\n"
                     "      --output-format=json"
                 )
 
-            # Validate backend configuration (reuse existing helper)
-            is_valid, error_msg = self._validate_backend_config(backend_type, backend_config_file)
-            if not is_valid:
-                return error_msg
-
-            # Validate state storage configuration (reuse existing helper)
-            is_valid, error_msg = self._validate_state_storage_config(backend_type, state_dir)
-            if not is_valid:
-                return error_msg
-
-            # Check if state directory exists when provided
-            if state_dir is not None:
-                try:
-                    # Try to access the directory to verify it exists
-                    _ = await state_dir.entries()
-                except Exception:
-                    return "✗ Failed: State directory not found. Check --state-dir path."
-
-            # Create Terraform container
-            tf_ctr = dagger.dag.container().from_(f"hashicorp/terraform:{terraform_version}")
-
-            # Add cache buster IMMEDIATELY to ensure Terraform operations aren't cached
-            if effective_cache_buster:
-                tf_ctr = tf_ctr.with_env_variable("CACHE_BUSTER", effective_cache_buster)
-
-            # Mount source directory at /src
-            tf_ctr = tf_ctr.with_directory("/src", source)
-
-            # Handle state directory mounting for persistent local state
-            using_persistent_state = state_dir is not None
-            using_remote_backend = backend_type != "local"
-            
-            # For remote backends: Create minimal Terraform config that just connects to backend
-            # For local state: Need to mount the actual module that created the state
-            if using_remote_backend:
-                # Remote backend: Create minimal config that just connects to S3/etc
-                # No module mounting needed - state already has all outputs
-                tf_ctr = tf_ctr.with_workdir("/workspace")
-                
-                # Create minimal backend.tf
-                backend_hcl = self._generate_backend_block(backend_type)
-                tf_ctr = tf_ctr.with_new_file("/workspace/backend.tf", backend_hcl)
-                
-                # Process and mount backend config file
-                if backend_config_file is not None:
-                    try:
-                        config_content, _ = await _process_backend_config(backend_config_file)
-                        tf_ctr = tf_ctr.with_new_file("/root/.terraform/backend.tfbackend", config_content)
-                    except Exception as e:
-                        return f"✗ Failed: Could not process backend config file\n{str(e)}"
-                
-                # Run terraform init to connect to remote backend
-                init_cmd = ["terraform", "init"]
-                if backend_config_file is not None:
-                    init_cmd.extend(["-backend-config=/root/.terraform/backend.tfbackend"])
-                
-                try:
-                    tf_ctr = tf_ctr.with_exec(init_cmd)
-                    _ = await tf_ctr.stdout()
-                except dagger.ExecError as e:
-                    return (
-                        f"✗ Failed: Terraform init failed\n{str(e)}\n\n"
-                        "Backend configuration troubleshooting:\n"
-                        "  - Verify backend config file is valid HCL\n"
-                        "  - Check credentials in environment variables\n"
-                        "  - Ensure backend infrastructure exists (bucket, table, etc.)"
-                    )
-                
-                detected_module = "unknown"
-                available_outputs = []
-                
-            else:
-                # Local/persistent state: Need the actual module that created the state
-                # Mount glue module (most common case)
-                try:
-                    tf_modules = dagger.dag.current_module().source().directory("terraform/modules")
-                    tf_ctr = tf_ctr.with_directory("/module", tf_modules)
-                    workdir = "/module/glue"
-                except Exception as e:
-                    return f"✗ Failed: Could not mount Terraform modules: {str(e)}"
-                
-                if using_persistent_state:
-                    # Mount state directory
-                    tf_ctr = tf_ctr.with_directory("/state", state_dir)
-                    # Clean up any existing .terraform directory
-                    tf_ctr = tf_ctr.with_exec(["sh", "-c", "rm -rf /state/.terraform && echo 'Cleaned .terraform directory'"])
-                    _ = await tf_ctr.stdout()
-                    # Copy module files to state directory
-                    tf_ctr = tf_ctr.with_exec(["sh", "-c", f"cp -r {workdir}/* /state/ && ls -la /state"])
-                    _ = await tf_ctr.stdout()
-                    tf_ctr = tf_ctr.with_workdir("/state")
-                else:
-                    tf_ctr = tf_ctr.with_workdir(workdir)
-                
-                # Run terraform init
-                try:
-                    tf_ctr = tf_ctr.with_exec(["terraform", "init"])
-                    _ = await tf_ctr.stdout()
-                except dagger.ExecError as e:
-                    return f"✗ Failed: Terraform init failed\n{str(e)}"
-                
-                # Detect which module created the state
-                detected_module, available_outputs = await self._detect_deployment_module(tf_ctr, effective_cache_buster)
-
-            # Retrieve outputs using the standalone module naming convention
-            # Both glue and cloudflare-tunnel modules now expose outputs with these names
-            # (glue module has alias outputs for backward compatibility)
-            
-            # Use tunnel_ids (available in both modules - native in cloudflare-tunnel, alias in glue)
-            try:
-                if effective_cache_buster:
-                    tf_ctr = tf_ctr.with_exec(["sh", "-c", f"# cache_bust={effective_cache_buster}\nterraform output -json tunnel_ids"])
-                else:
-                    tf_ctr = tf_ctr.with_exec(["terraform", "output", "-json", "tunnel_ids"])
-                ids_json_str = await tf_ctr.stdout()
-            except dagger.ExecError as e:
-                return f"✗ Failed: Could not retrieve tunnel_ids output\n{str(e)}\nAvailable outputs: {', '.join(available_outputs) if available_outputs else 'none'}"
-
-            # Use tunnel_tokens (available in both modules)
-            try:
-                if effective_cache_buster:
-                    tf_ctr = tf_ctr.with_exec(["sh", "-c", f"# cache_bust={effective_cache_buster}\nterraform output -json tunnel_tokens"])
-                else:
-                    tf_ctr = tf_ctr.with_exec(["terraform", "output", "-json", "tunnel_tokens"])
-                tokens_json_str = await tf_ctr.stdout()
-            except dagger.ExecError as e:
-                return f"✗ Failed: Could not retrieve tunnel_tokens output\n{str(e)}\nAvailable outputs: {', '.join(available_outputs) if available_outputs else 'none'}"
+            # Validate MAC filters before touching the state
+            mac_filter = []
+            for mac in macs or []:
+                normalized = normalize_mac(mac)
+                if normalized is None:
+                    return f"✗ Failed: Invalid MAC address in --macs: {mac}"
+                mac_filter.append(normalized)
 
-            # Use credentials_json (available in both modules)
+            # Validate backend/state configuration and read the tunnel maps
             try:
-                if effective_cache_buster:
-                    tf_ctr = tf_ctr.with_exec(["sh", "-c", f"# cache_bust={effective_cache_buster}\nterraform output -json credentials_json"])
-                else:
-                    tf_ctr = tf_ctr.with_exec(["terraform", "output", "-json", "credentials_json"])
-                credentials_json_str = await tf_ctr.stdout()
-            except dagger.ExecError as e:
-                return f"✗ Failed: Could not retrieve credentials_json output\n{str(e)}\nAvailable outputs: {', '.join(available_outputs) if available_outputs else 'none'}"
+                detected_module, secrets = await self._read_tunnel_secrets(
+                    source,
+                    terraform_version,
+                    terraform_image_tarball,
+                    terraform_image,
+                    backend_type,
+                    backend_config_file,
+                    state_dir,
+                    effective_cache_buster,
+                )
+            except ValueError as e:
+                return str(e)
+            tunnel_ids = secrets["tunnel_ids"]
+            tunnel_tokens = secrets["tunnel_tokens"]
+            credentials = secrets["credentials_json"]
 
-            # Parse JSON outputs
+            # One record per selected tunnel; every format is rendered from these
             try:
-                tunnel_ids = json.loads(ids_json_str.strip())
-                tunnel_tokens = json.loads(tokens_json_str.strip())
-                credentials = json.loads(credentials_json_str.strip())
-            except json.JSONDecodeError as e:
-                return f"✗ Failed: Could not parse Terraform output as JSON\n{str(e)}"
-
-            # Validate that we have data
-            if not tunnel_ids or not tunnel_tokens or not credentials:
-                return "✗ Failed: No tunnels found in Terraform outputs. State may be corrupted."
+                records = tunnel_records(secrets, mac_filter, tunnel_names or [])
+            except ValueError as e:
+                return f"✗ Failed: {str(e)}\nTunnels in state: {len(tunnel_ids)}"
 
             # Format and return output
-            if output_format == "json":
+            if output_format == "ndjson":
+                return "\n".join(ndjson_lines(records))
+            elif output_format == "json":
+                selected = [record["mac"] for record in records]
                 result = {
-                    "tunnel_ids": tunnel_ids,
-                    "tunnel_tokens": tunnel_tokens,
-                    "credentials_json": credentials,
-                    "count": len(tunnel_tokens),
+                    "tunnel_ids": {mac: tunnel_ids[mac] for mac in selected},
+                    "tunnel_tokens": {mac: tunnel_tokens.get(mac) for mac in selected},
+                    "credentials_json": {mac: credentials.get(mac) for mac in selected},
+                    "count": len(selected),
                     "module_type": detected_module
                 }
                 # Add cache_buster to result if provided
@@ -3037,90 +4021,126 @@ Notes
                 return json.dumps(result, indent=2)
             else:
                 # Human-readable format
-                output_lines = [
-                    "=" * 60,
-                    "CLOUDFLARE TUNNEL SECRETS",
-                    "=" * 60,
-                    "",
-                    f"Zone: {zone_name}",
-                    f"Detected Module: {detected_module}",
-                    f"Total Tunnels: {len(tunnel_tokens)}",
-                    "",
-                    "-" * 60,
-                    "TUNNEL IDS (for mapping MAC to Tunnel)",
-                    "-" * 60,
-                    "",
-                ]
-
-                for mac, tunnel_id in tunnel_ids.items():
-                    output_lines.append(f"MAC Address: {mac}")
-                    output_lines.append(f"Tunnel ID: {tunnel_id}")
-                    output_lines.append("")
-
-                output_lines.extend([
-                    "-" * 60,
-                    "TUNNEL TOKENS (for cloudflared login)",
-                    "-" * 60,
-                    "",
-                ])
-
-                for mac, token in tunnel_tokens.items():
-                    output_lines.append(f"MAC Address: {mac}")
-                    output_lines.append(f"Token: {token}")
-                    output_lines.append("")
-
-                output_lines.extend([
-                    "-" * 60,
-                    "CREDENTIALS JSON (for cloudflared config.yml)",
-                    "-" * 60,
-                    "",
-                ])
-
-                for mac, creds_json in credentials.items():
-                    # Parse JSON string from terraform output
-                    try:
-                        creds = json.loads(creds_json)
-                    except (json.JSONDecodeError, TypeError):
-                        # If already a dict (shouldn't happen but handle it)
-                        creds = creds_json if isinstance(creds_json, dict) else {}
-                    
-                    output_lines.append(f"MAC Address: {mac}")
-                    output_lines.append(f"  Account Tag: {creds.get('AccountTag', 'N/A')}")
-                    output_lines.append(f"  Tunnel ID: {creds.get('TunnelID', 'N/A')}")
-                    output_lines.append(f"  Tunnel Name: {creds.get('TunnelName', 'N/A')}")
-                    output_lines.append(f"  Tunnel Secret: {creds.get('TunnelSecret', 'N/A')}")
-                    output_lines.append("")
-
-                output_lines.extend([
-                    "-" * 60,
-                    "USAGE INSTRUCTIONS",
-                    "-" * 60,
-                    "",
-                    "1. Install cloudflared on your device:",
-                    "   https://developers.cloudflare.com/cloudflare-one/connections/connect-apps/install-and-setup/installation/",
-                    "",
-                    "2. Authenticate using tunnel token (interactive):",
-                    "   cloudflared tunnel login",
-                    "",
-                    "3. Or use credentials JSON for automated setup:",
-                    "   Create /etc/cloudflared/config.yml with the credentials above",
-                    "",
-                    "4. Run cloudflared:",
-                    "   cloudflared tunnel run",
-                    "",
-                ])
-
-                # Add execution timestamp to make result unique (breaks Dagger cache)
-                if effective_cache_buster:
-                    output_lines.extend([
-                        "=" * 60,
-                        f"Execution ID: {effective_cache_buster}",
-                        "=" * 60,
-                    ])
-                else:
-                    output_lines.append("=" * 60)
-
-                return "\n".join(output_lines)
+                return "\n".join(
+                    human_lines(records, zone_name, detected_module, len(tunnel_ids), effective_cache_buster)
+                )
 
         except Exception as e:
             return f"✗ Failed: Unexpected error retrieving tunnel secrets\n{str(e)}"
+
+    @function
+    async def export_cloudflared_configs(
+        self,
+        kcl_source: Annotated[dagger.Directory, Doc("Source directory containing KCL configs")],
+        terraform_version: Annotated[str, Doc("Terraform version to use (e.g., '1.10.0' or 'latest')")] = "latest",
+        terraform_image_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt Terraform image tarball with provider mirror (from terraform-mirror-image export)")] = None,
+        terraform_image: Annotated[str, Doc("Prebuilt Terraform image reference with provider mirror (e.g., a local registry)")] = "",
+        kcl_version: Annotated[str, Doc("KCL version to use (e.g., '0.11.0' or 'latest')")] = "latest",
+        kcl_toolchain_tarball: Annotated[Optional[dagger.File], Doc("Prebuilt KCL toolchain image tarball (from kcl-toolchain export)")] = None,
+        kcl_toolchain_image: Annotated[str, Doc("Prebuilt KCL toolchain image reference (e.g., a local registry)")] = "",
+        kcl_offline: Annotated[bool, Doc("Fail fast instead of downloading KCL dependencies missing from the cache")] = False,
+        backend_type: Annotated[str, Doc("Terraform backend type (local, s3, azurerm, gcs, remote, etc.)")] = "local",
+        backend_config_file: Annotated[Optional[dagger.File], Doc("Backend configuration HCL file (required for remote backends)")] = None,
+        state_dir: Annotated[Optional[dagger.Directory], Doc("Directory for persistent Terraform state (mutually exclusive with remote backend)")] = None,
+        macs: Annotated[Optional[list[str]], Doc("Only export the tunnels of these MAC addresses")] = None,
+        tunnel_names: Annotated[Optional[list[str]], Doc("Only export the tunnels with these names (case-insensitive)")] = None,
+        credentials_dir: Annotated[str, Doc("Directory of the credentials file on the devices (used in config.yml)")] = DEFAULT_CREDENTIALS_DIR,
+        cache_buster: Annotated[str, Doc("Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))")] = "",
+    ) -> dagger.Directory:
+        """
+        Export ready-to-use cloudflared configs for every deployed tunnel.
+
+        Reads the tunnel secrets from Terraform state exactly like
+        get-tunnel-secrets (terraform.tfstate from --state-dir, or one
+        `terraform state pull` for remote backends) while cloudflare.json is
+        generated from the KCL source, then writes all files in one pass:
+
+            manifest.json                      exported tunnels and skipped MACs
+            aa-bb-cc-dd-ee-01/config.yml       tunnel, credentials-file, ingress
+            aa-bb-cc-dd-ee-01/<tunnel-id>.json credentials file
+
+        Ingress rules are the services of the tunnel in cloudflare.json, ending
+        with the http_status:404 catch-all, as configured by the
+        cloudflare-tunnel module. Tunnels still in the state but no longer in
+        cloudflare.json are listed as skipped in the manifest.
+
+        Args:
+            kcl_source: Directory containing KCL module (for cloudflare.json)
+            terraform_version: Terraform version to use for remote backends (default: "latest")
+            terraform_image_tarball: Prebuilt Terraform image tarball from terraform-mirror-image (optional)
+            terraform_image: Prebuilt Terraform image reference, e.g. a local registry (optional)
+            kcl_version: KCL version to use (default: "latest")
+            kcl_toolchain_tarball: Prebuilt KCL toolchain image tarball for offline runs (optional)
+            kcl_toolchain_image: Prebuilt KCL toolchain image reference, e.g. a local registry (optional)
+            kcl_offline: Never download KCL dependencies; fail if they are not cached (default: False)
+            backend_type: Terraform backend type (local, s3, azurerm, gcs, remote, etc.)
+            backend_config_file: Backend configuration HCL file (required for remote backends)
+            state_dir: Directory for persistent Terraform state (must match deployment)
+            macs: MAC addresses of the tunnels to export (any format; default: all)
+            tunnel_names: Names of the tunnels to export (default: all)
+            credentials_dir: Credentials directory on the devices (default: /etc/cloudflared)
+            cache_buster: Unique value to bypass Dagger cache (use --cache-buster=$(date +%s))
+
+        Returns:
+            dagger.Directory with one config.yml and credentials file per tunnel
+
+        Raises:
+            ValueError: If a filter is invalid or the state holds no tunnels
+            RuntimeError: If cloudflare.json cannot be generated
+
+        Example:
+            dagger call export-cloudflared-configs \\
+                --kcl-source=./kcl \\
+                --state-dir=./terraform-state \\
+                export --path=./cloudflared-configs
+        """
+        mac_filter = []
+        for mac in macs or []:
+            normalized = normalize_mac(mac)
+            if normalized is None:
+                raise ValueError(f"✗ Failed: Invalid MAC address in --macs: {mac}")
+            mac_filter.append(normalized)
+
+        # The state read and KCL generation are independent; run them together
+        state_result, generation = await asyncio.gather(
+            self._read_tunnel_secrets(
+                None,
+                terraform_version,
+                terraform_image_tarball,
+                terraform_image,
+                backend_type,
+                backend_config_file,
+                state_dir,
+                cache_buster,
+            ),
+            self._generate_configs_cached(
+                kcl_source,
+                kcl_version,
+                kcl_toolchain_tarball,
+                kcl_toolchain_image,
+                kcl_offline=kcl_offline,
+                include_unifi=False,
+            ),
+            return_exceptions=True,
+        )
+        if isinstance(state_result, BaseException):
+            raise state_result
+        if isinstance(generation, BaseException):
+            component = "Cloudflare"
+            if isinstance(generation, KCLGenerationError) and generation.component:
+                component = generation.component
+            raise RuntimeError(f"✗ Failed: Could not generate {component} config\n{str(generation)}")
+
+        _, secrets = state_result
+        config_dir, _ = generation
+        cloudflare_config = json.loads(await config_dir.file("cloudflare.json").contents())
+
+        try:
+            records = tunnel_records(secrets, mac_filter, tunnel_names or [])
+        except ValueError as e:
+            raise ValueError(f"✗ Failed: {str(e)}\nTunnels in state: {len(secrets['tunnel_ids'])}")
+
+        bundle = dagger.dag.directory()
+        for path, contents, mode in bundle_files(records, cloudflare_config, credentials_dir):
+            bundle = bundle.with_new_file(path, contents, permissions=mode)
+        return bundle
@@ -0,0 +1,361 @@
+"""Streaming analysis of `terraform show -json` output.
+
+plan.json embeds the prior state, planned values and full configuration
+next to `resource_changes`, so it grows much faster than the number of
+changes. stream_plan() reads it incrementally: each entry of
+`resource_changes` is decoded on its own and handed to a callback, small
+top-level values (output_changes, terraform_version, ...) are kept, and
+everything else is skipped without being decoded. Memory use is bounded by
+the largest single resource change rather than the file size.
+
+PlanSummary counts changes by action, glue module and resource type for
+plan-summary.json; DriftReport does the same for the `resource_drift` of a
+refresh-only plan (detect_drift).
+"""
+
+import json
+import re
+from typing import Any, Callable, Iterable, Optional, TextIO
+
+
+SUMMARY_FORMAT = "unifi-cloudflare-glue-plan-summary/v1"
+DRIFT_FORMAT = "unifi-cloudflare-glue-drift/v1"
+
+# Top-level plan.json values kept by default (all small)
+KEPT_KEYS = ("format_version", "terraform_version", "output_changes", "applyable", "complete", "errored")
+
+# Module of resources declared in the root module itself
+ROOT_MODULE = "(root)"
+
+_CHUNK_SIZE = 64 * 1024
+_DECODER = json.JSONDecoder()
+_NON_WHITESPACE = re.compile(r"\S")
+_NUMBER_END = frozenset(" \t\n\r,}]")
+# A complete string, a bracket, or the quote opening a string cut off by the chunk end
+_SKIP_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]"]', re.S)
+_STRING_BODY = re.compile(r'(?:[^"\\]|\\.)*', re.S)
+
+
+class _JsonStream:
+    """Incremental JSON tokenizer over a text stream."""
+
+    def __init__(self, stream: TextIO, chunk_size: int = _CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Append the next chunk, dropping consumed input. Returns False at EOF."""
+        if self.eof:
+            return False
+        # Read at least as much as is pending so large values grow geometrically
+        chunk = self.stream.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _error(self, message: str) -> ValueError:
+        return ValueError(f"Invalid plan JSON: {message}")
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at EOF)."""
+        while True:
+            match = _NON_WHITESPACE.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consume the next character, which must be one of chars."""
+        char = self.peek()
+        if not char or char not in chars:
+            found = repr(char) if char else "end of file"
+            raise self._error(f"expected {' or '.join(repr(c) for c in chars)}, found {found}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next value."""
+        if not self.peek():
+            raise self._error("unexpected end of file")
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A number cut by the chunk boundary (`-2.` or `1e`) decodes as its
+                # prefix; only accept it once a delimiter or EOF follows
+                if self.eof or not isinstance(value, (int, float)) or self.buf[end:end + 1] in _NUMBER_END:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise self._error(str(e)) from e
+            self._fill()
+
+    def skip(self) -> None:
+        """Consume the next value without decoding it."""
+        if self.peek() not in "{[":
+            self.value()
+            return
+        depth = 0
+        while True:
+            match = _SKIP_TOKEN.search(self.buf, self.pos)
+            if not match:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise self._error("unexpected end of file")
+                continue
+            token = match.group()
+            self.pos = match.end()
+            if len(token) > 1:
+                continue
+            if token == '"':
+                self._skip_string_rest()
+            elif token in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _skip_string_rest(self) -> None:
+        """Consume up to and including the closing quote of a string."""
+        while True:
+            self.pos = _STRING_BODY.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) and self.buf[self.pos] == '"':
+                self.pos += 1
+                return
+            # End of buffer, possibly right after a backslash
+            if not self._fill():
+                raise self._error("unterminated string")
+
+
+def stream_plan(
+    stream: TextIO,
+    on_resource_change: Callable[[dict[str, Any]], None],
+    keep: Iterable[str] = KEPT_KEYS,
+    chunk_size: int = _CHUNK_SIZE,
+    changes_key: str = "resource_changes",
+) -> dict[str, Any]:
+    """
+    Read plan.json incrementally.
+
+    Args:
+        stream: Text stream positioned at the start of plan.json
+        on_resource_change: Called with each entry of `resource_changes`, in order
+        keep: Top-level keys whose values are decoded and returned
+        chunk_size: Characters read at a time
+        changes_key: Array streamed to on_resource_change ("resource_drift"
+            for changes detected by a refresh-only plan)
+
+    Returns:
+        Kept top-level values
+
+    Raises:
+        ValueError: If the stream is not a JSON object
+    """
+    keep = set(keep)
+    reader = _JsonStream(stream, chunk_size)
+    kept: dict[str, Any] = {}
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return kept
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise reader._error("expected an object key")
+        reader.expect(":")
+        if key == changes_key and reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    on_resource_change(reader.value())
+                    if reader.expect(",]") == "]":
+                        break
+        elif key in keep:
+            kept[key] = reader.value()
+        else:
+            reader.skip()
+        if reader.expect(",}") == "}":
+            return kept
+
+
+def action_label(actions: list[str]) -> str:
+    """
+    Name the action of a resource change.
+
+    Args:
+        actions: `change.actions` (a list of strings, e.g. ["delete", "create"])
+
+    Returns:
+        "create", "update", "delete", "replace", "read" or "no-op"
+    """
+    if sorted(actions) == ["create", "delete"]:
+        return "replace"
+    return "+".join(actions) if actions else "no-op"
+
+
+def module_label(resource_change: dict[str, Any]) -> str:
+    """
+    Name the glue module a resource belongs to.
+
+    Args:
+        resource_change: Entry of `resource_changes`
+
+    Returns:
+        First module name of the address (e.g. "unifi_dns" for
+        module.unifi_dns.module.x.res.name), or ROOT_MODULE
+    """
+    module_address = resource_change.get("module_address") or ""
+    if not module_address:
+        address = resource_change.get("address") or ""
+        module_address = address if address.startswith("module.") else ""
+    if not module_address.startswith("module."):
+        return ROOT_MODULE
+    name = module_address[len("module."):].split(".", 1)[0]
+    return name.split("[", 1)[0]
+
+
+class PlanSummary:
+    """Counts of resource changes by action, module and resource type."""
+
+    def __init__(self):
+        self.by_action: dict[str, int] = {}
+        self.by_module: dict[str, dict[str, int]] = {}
+        self.by_resource_type: dict[str, dict[str, int]] = {}
+
+    def add(self, resource_change: dict[str, Any]) -> None:
+        """Count one entry of `resource_changes`."""
+        action = action_label(list((resource_change.get("change") or {}).get("actions") or []))
+        module = module_label(resource_change)
+        resource_type = resource_change.get("type") or "unknown"
+        if resource_change.get("mode") == "data":
+            resource_type = f"data.{resource_type}"
+        self.by_action[action] = self.by_action.get(action, 0) + 1
+        counts = self.by_module.setdefault(module, {})
+        counts[action] = counts.get(action, 0) + 1
+        counts = self.by_resource_type.setdefault(resource_type, {})
+        counts[action] = counts.get(action, 0) + 1
+
+    def totals(self) -> dict[str, int]:
+        """Totals as in Terraform's "Plan:" line (a replacement adds and destroys)."""
+        add = self.by_action.get("create", 0) + self.by_action.get("replace", 0)
+        change = self.by_action.get("update", 0)
+        destroy = self.by_action.get("delete", 0) + self.by_action.get("replace", 0)
+        return {"add": add, "change": change, "destroy": destroy, "total": add + change + destroy}
+
+    def to_dict(self, plan_info: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+        """
+        Build the plan-summary.json document.
+
+        Args:
+            plan_info: Kept top-level values from stream_plan()
+
+        Returns:
+            JSON-serializable summary
+        """
+        plan_info = plan_info or {}
+        output_changes = plan_info.get("output_changes") or {}
+        outputs: dict[str, int] = {}
+        for change in output_changes.values():
+            action = action_label(list((change or {}).get("actions") or []))
+            outputs[action] = outputs.get(action, 0) + 1
+
+        def ordered(counts: dict[str, dict[str, int]]) -> dict[str, dict[str, int]]:
+            return {key: dict(sorted(counts[key].items())) for key in sorted(counts)}
+
+        return {
+            "format": SUMMARY_FORMAT,
+            "terraform_version": plan_info.get("terraform_version"),
+            "applyable": plan_info.get("applyable"),
+            "errored": plan_info.get("errored"),
+            "totals": self.totals(),
+            "resource_changes": sum(self.by_action.values()),
+            "by_action": dict(sorted(self.by_action.items())),
+            "by_module": ordered(self.by_module),
+            "by_resource_type": ordered(self.by_resource_type),
+            "output_changes": dict(sorted(outputs.items())),
+        }
+
+
+def drifted_attributes(change: dict[str, Any]) -> list[str]:
+    """
+    List the top-level attributes that differ between before and after.
+
+    Only names are returned, so sensitive values never reach the report.
+    """
+    before = change.get("before") if isinstance(change.get("before"), dict) else {}
+    after = change.get("after") if isinstance(change.get("after"), dict) else {}
+    return sorted(key for key in set(before) | set(after) if before.get(key) != after.get(key))
+
+
+class DriftReport:
+    """Compact report of the changes a refresh-only plan detected."""
+
+    def __init__(self, max_resources: int = 100):
+        self.summary = PlanSummary()
+        self.max_resources = max_resources
+        self.resources: list[dict[str, Any]] = []
+        self.omitted = 0
+
+    def add(self, resource_drift: dict[str, Any]) -> None:
+        """Record one entry of `resource_drift`."""
+        change = resource_drift.get("change") or {}
+        actions = list(change.get("actions") or [])
+        if actions == ["no-op"]:
+            return
+        self.summary.add(resource_drift)
+        if len(self.resources) >= self.max_resources:
+            self.omitted += 1
+            return
+        entry = {
+            "address": resource_drift.get("address"),
+            "module": module_label(resource_drift),
+            "action": action_label(actions),
+        }
+        if actions == ["update"]:
+            entry["attributes"] = drifted_attributes(change)
+        self.resources.append(entry)
+
+    def to_dict(self, exit_code: int, plan_info: Optional[dict[str, Any]] = None, **fields: Any) -> dict[str, Any]:
+        """
+        Build the drift report.
+
+        Args:
+            exit_code: Exit code of `terraform plan -refresh-only -detailed-exitcode`
+                (0 no drift, 2 drift)
+            plan_info: Kept top-level values from stream_plan(), if the plan was read
+            **fields: Extra top-level fields (e.g. checked_at, scope)
+
+        Returns:
+            JSON-serializable report
+        """
+        plan_info = plan_info or {}
+        outputs = sorted(
+            name for name, change in (plan_info.get("output_changes") or {}).items()
+            if action_label(list((change or {}).get("actions") or [])) != "no-op"
+        )
+        report = {
+            "format": DRIFT_FORMAT,
+            "drifted": exit_code == 2,
+            "exit_code": exit_code,
+            **fields,
+            "terraform_version": plan_info.get("terraform_version"),
+            "by_action": dict(sorted(self.summary.by_action.items())),
+            "by_module": {key: dict(sorted(value.items())) for key, value in sorted(self.summary.by_module.items())},
+            "resources": self.resources,
+            "outputs": outputs,
+        }
+        if self.omitted:
+            report["resources_omitted"] = self.omitted
+        return report
@@ -0,0 +1,262 @@
+"""Render a human-readable plan from `terraform show -json` output.
+
+`plan` runs `terraform show -json` once and renders plan.txt from the JSON
+here, instead of running a second `terraform show` that reloads the plan
+and every provider schema. The output follows Terraform's own layout
+(action symbols, "will be created", attribute diffs, the "Plan:" line);
+sensitive values are redacted and unknown values shown as
+"(known after apply)", as Terraform does.
+"""
+
+import json
+from typing import Any, Iterable, Optional
+
+
+# (symbol, description) per `actions` list of a resource change
+_RESOURCE_ACTIONS = {
+    ("create",): ("+", "will be created"),
+    ("delete",): ("-", "will be destroyed"),
+    ("update",): ("~", "will be updated in-place"),
+    ("read",): ("<=", "will be read during apply"),
+    ("delete", "create"): ("-/+", "must be replaced"),
+    ("create", "delete"): ("+/-", "must be replaced"),
+}
+
+SENSITIVE = "(sensitive value)"
+UNKNOWN = "(known after apply)"
+
+HEADER = (
+    "Terraform used the selected providers to generate the following execution\n"
+    "plan. Resource actions are indicated with the following symbols:\n"
+)
+
+
+def change_counts(actions: list[str]) -> tuple[int, int, int]:
+    """
+    Count a resource change the way Terraform's "Plan:" line does.
+
+    Args:
+        actions: `change.actions` of a resource change (e.g. ["delete", "create"])
+
+    Returns:
+        (add, change, destroy); a replacement counts as one add and one destroy
+    """
+    add = 1 if "create" in actions else 0
+    destroy = 1 if "delete" in actions else 0
+    change = 1 if actions == ["update"] else 0
+    return add, change, destroy
+
+
+def _contains_true(value: Any) -> bool:
+    """Whether a sensitivity/unknown marker (bool or nested structure) marks anything."""
+    if value is True:
+        return True
+    if isinstance(value, dict):
+        return any(_contains_true(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_contains_true(v) for v in value)
+    return False
+
+
+def _marker(markers: Any, key: str) -> Any:
+    return markers.get(key) if isinstance(markers, dict) else None
+
+
+def format_value(value: Any) -> str:
+    """Format an attribute value (HCL-like scalars, compact JSON for collections)."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return json.dumps(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    return json.dumps(value, sort_keys=True, separators=(", ", ": "), ensure_ascii=False)
+
+
+def _attribute_lines(change: dict[str, Any], actions: list[str]) -> list[str]:
+    """Render the attribute diff of one resource change (without braces)."""
+    before = change.get("before") if isinstance(change.get("before"), dict) else {}
+    after = change.get("after") if isinstance(change.get("after"), dict) else {}
+    if "delete" in actions and "create" not in actions:
+        after = {}
+    unknown = change.get("after_unknown") or {}
+    before_sensitive = change.get("before_sensitive") or {}
+    after_sensitive = change.get("after_sensitive") or {}
+    forces = {path[0] for path in change.get("replace_paths") or [] if path and isinstance(path[0], str)}
+
+    rows = []
+    hidden = 0
+    for key in sorted(set(before) | set(after) | {k for k in unknown if _contains_true(unknown[k])}):
+        old = SENSITIVE if _contains_true(_marker(before_sensitive, key)) else format_value(before.get(key))
+        if _contains_true(_marker(unknown, key)):
+            new = UNKNOWN
+        elif _contains_true(_marker(after_sensitive, key)):
+            new = SENSITIVE
+        else:
+            new = format_value(after.get(key))
+
+        if actions == ["delete"]:
+            if before.get(key) is None:
+                continue
+            rows.append(("-", key, f"{old} -> null"))
+        elif before.get(key) is None:
+            if after.get(key) is None and new != UNKNOWN:
+                continue
+            rows.append(("+", key, new))
+        elif new != UNKNOWN and before.get(key) == after.get(key) and old == new:
+            hidden += 1
+        elif after.get(key) is None and new != UNKNOWN:
+            rows.append(("-", key, f"{old} -> null"))
+        else:
+            rows.append(("~", key, f"{old} -> {new}"))
+
+    width = max((len(key) for _, key, _ in rows), default=0)
+    lines = []
+    for symbol, key, text in rows:
+        comment = " # forces replacement" if key in forces and "create" in actions and "delete" in actions else ""
+        lines.append(f"      {symbol} {key.ljust(width)} = {text}{comment}")
+    if hidden:
+        noun = "attribute" if hidden == 1 else "attributes"
+        lines.append(f"        # ({hidden} unchanged {noun} hidden)")
+    return lines
+
+
+def render_resource_change(resource_change: dict[str, Any]) -> Optional[str]:
+    """
+    Render one entry of `resource_changes`.
+
+    Returns:
+        Text block, or None for no-op changes
+    """
+    change = resource_change.get("change") or {}
+    actions = list(change.get("actions") or [])
+    described = _RESOURCE_ACTIONS.get(tuple(actions))
+    if described is None:
+        return None
+    symbol, description = described
+    address = resource_change.get("address", "")
+    if resource_change.get("deposed"):
+        description = f"(deposed object {resource_change['deposed']}) {description}"
+    mode = "data" if resource_change.get("mode") == "data" else "resource"
+    lines = [
+        f"  # {address} {description}",
+        f"{symbol.rjust(3)} {mode} \"{resource_change.get('type', '')}\" \"{resource_change.get('name', '')}\" {{",
+        *_attribute_lines(change, actions),
+        "    }",
+    ]
+    return "\n".join(lines)
+
+
+def _output_lines(output_changes: dict[str, Any]) -> list[str]:
+    rows = []
+    for name in sorted(output_changes):
+        change = output_changes[name] or {}
+        actions = list(change.get("actions") or [])
+        described = _RESOURCE_ACTIONS.get(tuple(actions))
+        if described is None or actions == ["read"]:
+            continue
+        if _contains_true(change.get("after_unknown")):
+            new = UNKNOWN
+        elif _contains_true(change.get("after_sensitive")):
+            new = SENSITIVE
+        else:
+            new = format_value(change.get("after"))
+        old = SENSITIVE if _contains_true(change.get("before_sensitive")) else format_value(change.get("before"))
+        if actions == ["create"]:
+            rows.append(("+", name, new))
+        elif actions == ["delete"]:
+            rows.append(("-", name, f"{old} -> null"))
+        else:
+            rows.append(("~", name, f"{old} -> {new}"))
+    width = max((len(name) for _, name, _ in rows), default=0)
+    return [f"  {symbol} {name.ljust(width)} = {text}" for symbol, name, text in rows]
+
+
+_LEGEND = [
+    (("create",), "  + create"),
+    (("update",), "  ~ update in-place"),
+    (("delete",), "  - destroy"),
+    (("delete", "create"), "-/+ destroy and then create replacement"),
+    (("create", "delete"), "+/- create replacement and then destroy"),
+    (("read",), " <= read (data resources)"),
+]
+
+
+class PlanTextRenderer:
+    """
+    Build plan.txt one resource change at a time.
+
+    Terraform writes `output_changes` after `resource_changes` in plan.json,
+    so a streaming reader adds resource changes as they are parsed and
+    passes the outputs to render() at the end.
+    """
+
+    def __init__(self):
+        self.blocks: list[str] = []
+        self.used: set[tuple[str, ...]] = set()
+        self.add_count = self.change_count = self.destroy_count = 0
+
+    def add(self, resource_change: dict[str, Any]) -> None:
+        """Render one entry of `resource_changes` (no-op changes are skipped)."""
+        block = render_resource_change(resource_change)
+        if block is None:
+            return
+        actions = list((resource_change.get("change") or {}).get("actions") or [])
+        self.used.add(tuple(actions))
+        add, change, destroy = change_counts(actions)
+        self.add_count += add
+        self.change_count += change
+        self.destroy_count += destroy
+        self.blocks.append(block)
+
+    def render(self, output_changes: Optional[dict[str, Any]] = None) -> str:
+        """
+        Finish the plan text.
+
+        Args:
+            output_changes: The `output_changes` object, if any
+
+        Returns:
+            Human-readable plan text
+        """
+        outputs = _output_lines(output_changes or {})
+        if not self.blocks and not outputs:
+            return (
+                "No changes. Your infrastructure matches the configuration.\n\n"
+                "Terraform has compared your real infrastructure against your configuration\n"
+                "and found no differences, so no changes are needed.\n"
+            )
+
+        parts = [HEADER + "\n".join(text for actions, text in _LEGEND if actions in self.used)]
+        if self.blocks:
+            parts.append("Terraform will perform the following actions:")
+            parts.extend(self.blocks)
+            parts.append(
+                f"Plan: {self.add_count} to add, {self.change_count} to change, "
+                f"{self.destroy_count} to destroy."
+            )
+        if outputs:
+            parts.append("Changes to Outputs:\n" + "\n".join(outputs))
+        return "\n\n".join(parts) + "\n"
+
+
+def render_plan_text(
+    resource_changes: Iterable[dict[str, Any]],
+    output_changes: Optional[dict[str, Any]] = None,
+) -> str:
+    """
+    Render plan.txt from the parts of `terraform show -json` output.
+
+    Args:
+        resource_changes: Entries of `resource_changes` (any iterable)
+        output_changes: The `output_changes` object, if any
+
+    Returns:
+        Human-readable plan text
+    """
+    renderer = PlanTextRenderer()
+    for resource_change in resource_changes:
+        renderer.add(resource_change)
+    return renderer.render(output_changes)
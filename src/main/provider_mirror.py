@@ -0,0 +1,276 @@
+"""Offline Terraform provider mirror helpers.
+
+The bundled Terraform modules pin their providers in .terraform.lock.hcl,
+including providers only used implicitly (hashicorp/null for null_resource)
+and possibly different versions per module. These helpers read the lock
+files, check them against the versions.tf requirements, pick the archive of
+every locked version from a local directory and lay them out as a Terraform
+`filesystem_mirror`, so an image built from them can run `terraform init`
+for each module without reaching the registry. Everything here is pure and
+can be tested without a Dagger engine.
+"""
+
+import posixpath
+import re
+from typing import Optional
+
+
+# Modules whose lock files (and versions.tf) define the mirror contents
+MIRRORED_MODULES = ["glue", "unifi-dns", "cloudflare-tunnel"]
+
+# Mirror location and CLI configuration inside the Terraform image
+MIRROR_PATH = "/usr/share/terraform/providers"
+CLI_CONFIG_PATH = "/etc/terraform/mirror.tfrc"
+
+LOCK_FILE = ".terraform.lock.hcl"
+
+DEFAULT_REGISTRY = "registry.terraform.io"
+
+_REQUIRED_PROVIDERS = re.compile(r"required_providers\s*\{(?P<body>(?:[^{}]|\{[^{}]*\})*)\}", re.S)
+_PROVIDER_ENTRY = re.compile(r"(?P<name>[A-Za-z0-9_-]+)\s*=\s*\{(?P<body>[^{}]*)\}", re.S)
+_ATTRIBUTE = re.compile(r'(?P<key>source|version)\s*=\s*"(?P<value>[^"]*)"')
+_LOCKED_PROVIDER = re.compile(r'^provider\s+"(?P<source>[^"]+)"\s*\{(?P<body>.*?)^\}', re.S | re.M)
+_LOCKED_VERSION = re.compile(r'^\s*version\s*=\s*"(?P<version>[^"]+)"', re.M)
+_ARCHIVE_NAME = re.compile(
+    r"^terraform-provider-(?P<type>[A-Za-z0-9_-]+?)_(?P<version>\d+\.\d+\.\d+[^_]*)_(?P<os>[a-z0-9]+)_(?P<arch>[a-z0-9]+)\.zip$"
+)
+_CONSTRAINT = re.compile(r"^\s*(?P<op>~>|>=|<=|!=|=|>|<)?\s*(?P<version>\d+(?:\.\d+)*)\s*$")
+
+
+def parse_required_providers(versions_tf: str) -> dict[str, dict[str, str]]:
+    """
+    Extract the required_providers block of a versions.tf file.
+
+    Args:
+        versions_tf: Contents of versions.tf
+
+    Returns:
+        Mapping of local provider name to {"source": ..., "version": ...}
+
+    Raises:
+        ValueError: If a provider entry has no source
+    """
+    providers = {}
+    for block in _REQUIRED_PROVIDERS.finditer(versions_tf):
+        for entry in _PROVIDER_ENTRY.finditer(block.group("body")):
+            attributes = {m.group("key"): m.group("value") for m in _ATTRIBUTE.finditer(entry.group("body"))}
+            if "source" not in attributes:
+                raise ValueError(f"Provider '{entry.group('name')}' has no source in required_providers")
+            providers[entry.group("name")] = {
+                "source": attributes["source"],
+                "version": attributes.get("version", ""),
+            }
+    return providers
+
+
+def parse_lock_file(lock_hcl: str) -> dict[str, str]:
+    """
+    Extract the locked provider versions of a .terraform.lock.hcl file.
+
+    Args:
+        lock_hcl: Contents of .terraform.lock.hcl
+
+    Returns:
+        Mapping of qualified source to its locked version
+
+    Raises:
+        ValueError: If a provider block has no version
+    """
+    locked = {}
+    for block in _LOCKED_PROVIDER.finditer(lock_hcl):
+        version = _LOCKED_VERSION.search(block.group("body"))
+        if version is None:
+            raise ValueError(f"Provider '{block.group('source')}' has no version in {LOCK_FILE}")
+        locked[qualified_source(block.group("source"))] = version.group("version")
+    return locked
+
+
+def locked_providers(modules: dict[str, tuple[str, str]]) -> dict[str, list[str]]:
+    """
+    Collect every provider version the modules' lock files pin.
+
+    Each module's lock file must cover its required_providers and pin a
+    version satisfying their constraints; providers only present in the lock
+    file (implicit ones such as hashicorp/null) are included as well.
+
+    Args:
+        modules: Mapping of module name to (versions.tf, .terraform.lock.hcl) contents
+
+    Returns:
+        Mapping of qualified source to the sorted locked versions across modules
+
+    Raises:
+        ValueError: If a required provider is not locked or its locked
+            version violates the module's constraint
+    """
+    merged: dict[str, set[str]] = {}
+    problems = []
+    for module, (versions_tf, lock_hcl) in sorted(modules.items()):
+        locked = parse_lock_file(lock_hcl)
+        for spec in parse_required_providers(versions_tf).values():
+            source = qualified_source(spec["source"])
+            if source not in locked:
+                problems.append(f"{module}: {source} is not in {LOCK_FILE}")
+            elif spec["version"] and not version_satisfies(locked[source], [spec["version"]]):
+                problems.append(f"{module}: locked {source} {locked[source]} does not satisfy {spec['version']}")
+        for source, version in locked.items():
+            merged.setdefault(source, set()).add(version)
+    if problems:
+        raise ValueError("Lock files do not match required_providers:\n  - " + "\n  - ".join(problems))
+    return {source: sorted(versions, key=_version_tuple) for source, versions in sorted(merged.items())}
+
+
+def qualified_source(source: str) -> str:
+    """Return a provider source address with its registry hostname."""
+    parts = source.lower().split("/")
+    if len(parts) == 2:
+        parts.insert(0, DEFAULT_REGISTRY)
+    if len(parts) != 3:
+        raise ValueError(f"Invalid provider source address: {source}")
+    return "/".join(parts)
+
+
+def _version_tuple(version: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in re.match(r"\d+(?:\.\d+)*", version).group(0).split("."))
+
+
+def version_satisfies(version: str, constraints: list[str]) -> bool:
+    """
+    Check a provider version against Terraform version constraints.
+
+    Supports =, !=, >, >=, <, <= and the pessimistic ~> operator, with
+    comma-separated constraints in a single string. Pre-release versions
+    only match exact (=) constraints, as in Terraform.
+
+    Args:
+        version: Provider version (e.g. "5.1.0")
+        constraints: Constraint strings (e.g. ["~> 5.0", ">= 5.1.0"])
+
+    Returns:
+        True if every constraint is satisfied
+
+    Raises:
+        ValueError: If a constraint cannot be parsed
+    """
+    prerelease = "-" in version
+    current = _version_tuple(version)
+    for constraint in (c for group in constraints for c in group.split(",") if c.strip()):
+        match = _CONSTRAINT.match(constraint)
+        if match is None:
+            raise ValueError(f"Unsupported version constraint: {constraint.strip()}")
+        op = match.group("op") or "="
+        target = _version_tuple(match.group("version"))
+        padded = target + (0,) * (len(current) - len(target))
+        if prerelease and op != "=":
+            return False
+        if op == "~>":
+            # ~> 5.0 allows 5.x; ~> 1.2.3 allows 1.2.x
+            prefix = target[:-1] if len(target) > 1 else target
+            ok = current >= padded and current[: len(prefix)] == prefix
+        else:
+            ok = {
+                "=": current == padded,
+                "!=": current != padded,
+                ">": current > padded,
+                ">=": current >= padded,
+                "<": current < padded,
+                "<=": current <= padded,
+            }[op]
+        if not ok:
+            return False
+    return True
+
+
+def parse_archive_name(path: str) -> Optional[dict[str, str]]:
+    """
+    Parse a provider release archive name.
+
+    Args:
+        path: Archive path (e.g. "terraform-provider-random_3.6.3_linux_amd64.zip",
+            optionally nested as written by `terraform providers mirror`)
+
+    Returns:
+        {"type", "version", "os", "arch"} or None if the name does not match
+    """
+    match = _ARCHIVE_NAME.match(posixpath.basename(path))
+    return match.groupdict() if match else None
+
+
+def select_provider_archives(
+    locked: dict[str, list[str]], archives: list[str], platform: str
+) -> list[dict[str, str]]:
+    """
+    Pick the archive of every locked provider version.
+
+    Archives nested under a HOSTNAME/NAMESPACE/TYPE layout only match their
+    own source; flat archives match on provider type.
+
+    Args:
+        locked: Output of locked_providers()
+        archives: Archive paths relative to the archive directory
+        platform: Target platform, "linux/amd64" or "linux_amd64"
+
+    Returns:
+        One {"source", "version", "archive", "mirror_path"} entry per locked
+        version, ordered by source and version
+
+    Raises:
+        ValueError: If any locked version has no archive for the platform
+    """
+    target_os, target_arch = platform.replace("_", "/").split("/")[:2]
+    selected = []
+    missing = []
+    for source, versions in sorted(locked.items()):
+        provider_type = source.rsplit("/", 1)[1]
+        for version in versions:
+            match = None
+            for archive in sorted(archives):
+                parsed = parse_archive_name(archive)
+                if parsed is None or parsed["type"] != provider_type or parsed["version"] != version:
+                    continue
+                if (parsed["os"], parsed["arch"]) != (target_os, target_arch):
+                    continue
+                parents = posixpath.dirname(archive).lower().split("/")
+                if len(parents) >= 2 and parents[-2:] != source.split("/")[-2:]:
+                    continue
+                match = archive
+                break
+            if match is None:
+                missing.append(f"{source} {version} for {target_os}_{target_arch}")
+                continue
+            selected.append({
+                "source": source,
+                "version": version,
+                "archive": match,
+                "mirror_path": f"{source}/{posixpath.basename(match)}",
+            })
+    if missing:
+        raise ValueError("No provider archive for locked version:\n  - " + "\n  - ".join(missing))
+    return selected
+
+
+def mirror_cli_config(sources: list[str], mirror_path: str = MIRROR_PATH) -> str:
+    """
+    Render a Terraform CLI configuration that installs providers from the mirror only.
+
+    There is no `direct` installation method, so `terraform init` fails
+    instead of contacting the registry when a provider is missing.
+
+    Args:
+        sources: Qualified provider sources held by the mirror
+        mirror_path: Mirror directory inside the image
+
+    Returns:
+        HCL for TF_CLI_CONFIG_FILE
+    """
+    include = ",\n".join(f'      "{source}"' for source in sorted(sources))
+    return (
+        "provider_installation {\n"
+        "  filesystem_mirror {\n"
+        f'    path    = "{mirror_path}"\n'
+        "    include = [\n"
+        f"{include}\n"
+        "    ]\n"
+        "  }\n"
+        "}\n"
+    )
@@ -0,0 +1,165 @@
+"""Terraform init caching helpers.
+
+Every Terraform entry point runs `terraform init` with TF_PLUGIN_CACHE_DIR
+pointing at a Dagger cache volume, so providers are downloaded once per
+Terraform version and platform instead of on every run. With --state-dir,
+the initialized working directory is reused as long as the module sources
+and lock file are unchanged. These helpers name the volume and build the
+shell scripts, so the logic can be tested without a Dagger engine.
+"""
+
+import hashlib
+import re
+import shlex
+from typing import Optional
+
+
+# Mount point of the plugin cache volume inside Terraform containers
+PLUGIN_CACHE_DIR = "/tf-plugin-cache"
+
+# Fingerprint of the inputs the state directory was last initialized from
+INIT_STAMP = ".terraform/.unifi-cloudflare-glue-init"
+
+
+def plugin_cache_volume_name(terraform_version: str, platform: str) -> str:
+    """
+    Name the cache volume holding Terraform provider plugins.
+
+    Args:
+        terraform_version: Terraform image tag (e.g. "1.10.0" or "latest")
+        platform: Container platform (e.g. "linux/amd64")
+
+    Returns:
+        Cache volume name, distinct per Terraform version and platform
+    """
+    slug = re.sub(r"[^a-z0-9.]+", "-", f"{terraform_version}-{platform}".lower()).strip("-")
+    digest = hashlib.sha256(f"{terraform_version}\n{platform}".encode("utf-8")).hexdigest()
+    return f"unifi-cloudflare-glue-tf-plugins-{slug}-{digest[:8]}"
+
+
+def cached_init_script(init_cmd: list[str], cache_dir: str = PLUGIN_CACHE_DIR) -> str:
+    """
+    Build a shell script that runs `terraform init` against the plugin cache.
+
+    Terraform links providers from the cache into .terraform/providers. The
+    links are replaced with copies after init so the working directory stays
+    valid once the cache volume is unmounted (and when it is exported, e.g.
+    with --state-dir), and the volume only has to be held for the init step.
+
+    Args:
+        init_cmd: Terraform init command (e.g. ["terraform", "init", "-backend-config=..."])
+        cache_dir: Mount point of the plugin cache volume
+
+    Returns:
+        POSIX shell script
+    """
+    init = " ".join(shlex.quote(arg) for arg in init_cmd)
+    cache = shlex.quote(cache_dir)
+    return (
+        f"mkdir -p {cache} && {init} && "
+        "if [ -d .terraform/providers ]; then "
+        "find .terraform/providers -type l | while read -r link; do "
+        'target=$(readlink -f "$link") && rm "$link" && cp -R "$target" "$link" || exit 1; '
+        "done; fi"
+    )
+
+
+def _fingerprint_command(module_root: str, state_dir: str, init_cmd: list[str], version_cmd: str) -> str:
+    """Shell command printing the init fingerprint of a state directory."""
+    root = shlex.quote(module_root)
+    lock = shlex.quote(f"{state_dir}/.terraform.lock.hcl")
+    init = shlex.quote(" ".join(init_cmd))
+    return (
+        "{ "
+        f"find {root} -type f -name '*.tf' | LC_ALL=C sort | xargs -r sha256sum; "
+        f"if [ -f {lock} ]; then sha256sum < {lock}; fi; "
+        f"echo {init}; {version_cmd} | head -n 1; "
+        "} | sha256sum | cut -d ' ' -f 1"
+    )
+
+
+def state_sync_script(
+    workdir: str,
+    module_root: str,
+    init_cmd: list[str],
+    state_dir: str = "/state",
+    version_cmd: str = "terraform version",
+) -> str:
+    """
+    Build a shell script that syncs module files into a state directory.
+
+    Only files whose contents differ are copied, and .terraform is kept.
+    The script then compares the fingerprint of the module sources (every
+    .tf file under module_root), the lock file, the init command and the
+    Terraform version with the one stored at INIT_STAMP after the last
+    init, and prints "reuse" when they match or "init" otherwise.
+
+    Args:
+        workdir: Module directory whose files belong in the state directory
+        module_root: Mounted module tree (includes sibling modules for glue)
+        init_cmd: Terraform init command the state directory is initialized with
+        state_dir: Mount point of the state directory
+        version_cmd: Command printing the Terraform version
+
+    Returns:
+        POSIX shell script; the last line of output is "reuse" or "init"
+    """
+    src = shlex.quote(workdir)
+    state = shlex.quote(state_dir)
+    stamp = shlex.quote(f"{state_dir}/{INIT_STAMP}")
+    fingerprint = _fingerprint_command(module_root, state_dir, init_cmd, version_cmd)
+    return (
+        f"for f in {src}/*; do "
+        'name=$(basename "$f"); '
+        f'if [ -d "$f" ]; then cp -R "$f" {state}/ || exit 1; '
+        f'elif ! cmp -s "$f" {state}/"$name"; then cp "$f" {state}/"$name" && echo "updated $name" || exit 1; fi; '
+        "done; "
+        f"fp=$({fingerprint}); "
+        f'if [ -d {state}/.terraform/providers ] && [ -f {stamp} ] && [ "$(cat {stamp})" = "$fp" ]; '
+        "then echo reuse; else echo init; fi"
+    )
+
+
+def init_stamp_script(
+    module_root: str,
+    init_cmd: list[str],
+    state_dir: str = "/state",
+    version_cmd: str = "terraform version",
+) -> str:
+    """
+    Build a shell script that records the init fingerprint after a successful init.
+
+    The fingerprint is taken after init so a lock file created or updated by
+    init is part of it, and the next run with the same inputs reuses the
+    working directory.
+
+    Args:
+        module_root: Mounted module tree (same as for state_sync_script)
+        init_cmd: Terraform init command that was run
+        state_dir: Mount point of the state directory
+        version_cmd: Command printing the Terraform version
+
+    Returns:
+        POSIX shell script
+    """
+    stamp = shlex.quote(f"{state_dir}/{INIT_STAMP}")
+    fingerprint = _fingerprint_command(module_root, state_dir, init_cmd, version_cmd)
+    return f"{fingerprint} > {stamp}"
+
+
+def init_exec_command(init_cmd: list[str], state_module_root: Optional[str] = None) -> list[str]:
+    """
+    Build the exec that runs a cached `terraform init`.
+
+    Args:
+        init_cmd: Terraform init command
+        state_module_root: Mounted module tree when initializing /state; the
+            init fingerprint is recorded after a successful init
+
+    Returns:
+        Command for with_exec (["sh", "-c", script])
+    """
+    script = cached_init_script(init_cmd)
+    if state_module_root is not None:
+        script += " && " + init_stamp_script(state_module_root, init_cmd)
+    return ["sh", "-c", script]
@@ -0,0 +1,166 @@
+"""Lazy Terraform pipeline builder.
+
+`deploy`, `plan` and `destroy` chain their Terraform steps (init, apply,
+plan, show, ...) on one container and only sync once at the end, or where
+a result is needed to decide what to do next. Dagger reports a failed exec
+with the command that failed; TerraformPipeline records each step's command
+so that failure is mapped back to the step and its error message, just as
+when every step was awaited on its own.
+
+The module does not import dagger so it can be tested without an engine.
+"""
+
+from typing import Any, Callable, Optional
+
+
+class PipelineStep:
+    """One recorded exec of a TerraformPipeline."""
+
+    def __init__(self, name: str, failure: str, command: list[str]):
+        self.name = name
+        self.failure = failure
+        self.command = list(command)
+
+    def __repr__(self) -> str:
+        return f"PipelineStep({self.name!r})"
+
+
+class PipelineStepError(Exception):
+    """A pipeline exec failed; wraps the original dagger.ExecError."""
+
+    def __init__(self, step: PipelineStep, error: Exception):
+        super().__init__(f"{step.failure}\n{error}")
+        self.step = step
+        self.error = error
+
+
+def exec_error_details(error: Exception) -> str:
+    """
+    Format exit code, stdout and stderr of a failed exec for error messages.
+
+    Args:
+        error: dagger.ExecError (or any exception with the same attributes)
+
+    Returns:
+        Multi-line details, "N/A" for missing output
+    """
+    details = f"Exit code: {getattr(error, 'exit_code', 'N/A')}\n"
+    details += f"Stdout:\n{getattr(error, 'stdout', '') or 'N/A'}\n"
+    details += f"Stderr:\n{getattr(error, 'stderr', '') or 'N/A'}"
+    return details
+
+
+class TerraformPipeline:
+    """
+    Chain Terraform execs on a container without syncing each one.
+
+    Usage:
+        pipeline = TerraformPipeline(ctr)
+        pipeline.exec("plan", "Terraform plan failed", ["terraform", "plan", "-out=plan.tfplan"])
+        pipeline.exec("show", "Could not render plan.json", ["sh", "-c", "terraform show -json ..."])
+        await pipeline.sync()  # raises PipelineStepError naming the failed step
+    """
+
+    def __init__(self, container: Any):
+        self.container = container
+        self.steps: list[PipelineStep] = []
+
+    def then(self, transform: Callable[[Any], Any]) -> "TerraformPipeline":
+        """Apply a non-exec container change (files, env, workdir) lazily."""
+        self.container = transform(self.container)
+        return self
+
+    def exec(self, name: str, failure: str, command: list[str], **options: Any) -> "TerraformPipeline":
+        """
+        Add an exec step without running it.
+
+        Args:
+            name: Step name callers match on (e.g. "init", "apply")
+            failure: Error message for the step, without the "✗ Failed: " prefix
+            command: Command passed to with_exec
+            **options: Extra with_exec arguments (e.g. expect=dagger.ReturnType.ANY)
+        """
+        self.container = self.container.with_exec(list(command), **options)
+        return self.record(name, failure, command)
+
+    def record(self, name: str, failure: str, command: list[str]) -> "TerraformPipeline":
+        """
+        Register an exec already added to self.container by a helper.
+
+        Used for steps built elsewhere (e.g. cached `terraform init`, which
+        mounts the plugin cache around the exec).
+        """
+        self.steps.append(PipelineStep(name, failure, command))
+        return self
+
+    def failed_step(self, error: Exception) -> Optional[PipelineStep]:
+        """
+        Find the recorded step an exec error came from.
+
+        Args:
+            error: Exception with a `command` attribute (dagger.ExecError)
+
+        Returns:
+            First step whose command matches, or None if the error did not
+            come from a recorded step
+        """
+        command = getattr(error, "command", None)
+        if not command:
+            return None
+        for step in self.steps:
+            if step.command == list(command):
+                return step
+        return None
+
+    def _step_error(self, error: Exception) -> Exception:
+        step = self.failed_step(error)
+        return error if step is None else PipelineStepError(step, error)
+
+    async def _run(self, awaitable: Any) -> Any:
+        try:
+            return await awaitable
+        except Exception as e:
+            mapped = self._step_error(e)
+            if mapped is e:
+                raise
+            raise mapped from e
+
+    async def sync(self) -> str:
+        """
+        Run every pending step and return the output of the last exec.
+
+        Raises:
+            PipelineStepError: A recorded step failed
+            Exception: Errors not coming from a recorded step are re-raised as is
+        """
+        return await self._run(self.container.stdout())
+
+    async def exit_code(self) -> int:
+        """
+        Run every pending step and return the exit code of the last exec.
+
+        The last exec must allow failure (expect=dagger.ReturnType.ANY);
+        failures of earlier steps raise PipelineStepError as in sync().
+        """
+        return await self._run(self.container.exit_code())
+
+    async def output(self, name: str, failure: str, command: list[str]) -> str:
+        """
+        Run a command on a branch of the pipeline and return its stdout.
+
+        The command is not added to the chain, so later steps do not build
+        on it. Use it at decision points where the result is needed now.
+
+        Raises:
+            PipelineStepError: The command or an earlier step failed
+        """
+        step = PipelineStep(name, failure, command)
+        try:
+            return await self.container.with_exec(list(command)).stdout()
+        except Exception as e:
+            mapped = self._step_error(e)
+            if mapped is e and getattr(e, "command", None) == step.command:
+                mapped = PipelineStepError(step, e)
+            if mapped is e:
+                raise
+            raise mapped from e
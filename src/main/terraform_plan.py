@@ -0,0 +1,97 @@
+"""Helpers for saved Terraform plans exported by `plan`.
+
+`plan` records which state the plan was computed against in
+plan-state.json, and `deploy --plan-dir` compares it with the current state
+before applying plan.tfplan, so a stale plan is rejected with a clear
+message instead of being applied on top of changes made since.
+"""
+
+import json
+from typing import Any, Optional
+
+
+PLAN_STATE_FILE = "plan-state.json"
+PLAN_BINARY_FILE = "plan.tfplan"
+
+
+def state_identity(state_text: str) -> dict[str, Any]:
+    """
+    Extract the lineage and serial from `terraform state pull` output.
+
+    Args:
+        state_text: Raw state JSON; empty when no state exists yet
+
+    Returns:
+        {"lineage": str or None, "serial": int or None}
+
+    Raises:
+        ValueError: If the state is not valid JSON
+    """
+    if not state_text.strip():
+        return {"lineage": None, "serial": None}
+    try:
+        state = json.loads(state_text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not parse Terraform state: {e}") from e
+    return {"lineage": state.get("lineage"), "serial": state.get("serial")}
+
+
+def render_plan_state(identity: dict[str, Any], unifi_only: bool, cloudflare_only: bool) -> str:
+    """
+    Render plan-state.json for a plan directory.
+
+    Args:
+        identity: Output of state_identity() for the state the plan was made against
+        unifi_only: Plan was limited to UniFi DNS
+        cloudflare_only: Plan was limited to Cloudflare Tunnels
+
+    Returns:
+        JSON text
+    """
+    record = {
+        "lineage": identity.get("lineage"),
+        "serial": identity.get("serial"),
+        "unifi_only": unifi_only,
+        "cloudflare_only": cloudflare_only,
+    }
+    return json.dumps(record, indent=2) + "\n"
+
+
+def load_plan_state(text: str) -> dict[str, Any]:
+    """
+    Parse plan-state.json.
+
+    Raises:
+        ValueError: If the file is not a JSON object with lineage and serial
+    """
+    try:
+        record = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid {PLAN_STATE_FILE}: {e}") from e
+    if not isinstance(record, dict) or "lineage" not in record or "serial" not in record:
+        raise ValueError(f"Invalid {PLAN_STATE_FILE}: expected lineage and serial")
+    return record
+
+
+def stale_plan_reason(recorded: dict[str, Any], current: dict[str, Any]) -> Optional[str]:
+    """
+    Explain why a saved plan no longer matches the current state.
+
+    Args:
+        recorded: Contents of plan-state.json
+        current: state_identity() of the state the plan would be applied to
+
+    Returns:
+        Human-readable reason, or None when the plan is still current
+    """
+    if recorded.get("lineage") != current.get("lineage"):
+        return (
+            f"state lineage changed (plan: {recorded.get('lineage') or 'no state'}, "
+            f"current: {current.get('lineage') or 'no state'})"
+        )
+    if recorded.get("serial") != current.get("serial"):
+        return (
+            f"state serial changed (plan: {recorded.get('serial')}, "
+            f"current: {current.get('serial')})"
+        )
+    return None
@@ -0,0 +1,209 @@
+"""Terraform run options for deploy, plan and destroy.
+
+`--targets` takes MAC addresses and hostnames instead of Terraform
+addresses. They are resolved against the generated unifi.json and
+cloudflare.json into `-target` addresses of the resources the unifi-dns
+and cloudflare-tunnel modules create for those devices, so a change to one
+device in a large inventory only plans and refreshes that device's
+records and tunnel.
+
+A target selects MAC addresses:
+- a MAC address (any of aa:bb:cc:dd:ee:ff, AA-BB-CC-DD-EE-FF, aabbccddeeff)
+- a device hostname, FQDN or service CNAME selects all MACs of the device
+- a tunnel name or public hostname selects the tunnel's MAC
+Every UniFi device with a NIC on a selected MAC and every tunnel keyed by
+one is targeted.
+"""
+
+import json
+import re
+from typing import Any, Iterable, Optional
+
+
+# Address prefixes of the child modules inside the glue module (count = 0/1)
+GLUE_UNIFI_PREFIX = "module.unifi_dns[0]."
+GLUE_CLOUDFLARE_PREFIX = "module.cloudflare_tunnel[0]."
+
+_MAC = re.compile(r"^[0-9a-f]{2}([:\-.]?)(?:[0-9a-f]{2}\1){4}[0-9a-f]{2}$")
+
+
+def normalize_mac(value: str) -> Optional[str]:
+    """
+    Normalize a MAC address to the lowercase colon format used as tunnel key.
+
+    Args:
+        value: Candidate MAC address
+
+    Returns:
+        "aa:bb:cc:dd:ee:ff", or None if value is not a MAC address
+    """
+    value = value.strip().lower()
+    if not _MAC.match(value):
+        return None
+    digits = re.sub(r"[^0-9a-f]", "", value)
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def _hostname(value: str) -> str:
+    return value.strip().lower().rstrip(".")
+
+
+def _index(key: str) -> str:
+    """Format a for_each key as an address index (["key"])."""
+    return f"[{json.dumps(key)}]"
+
+
+def unifi_device_addresses(device: dict[str, Any], prefix: str = "") -> list[str]:
+    """
+    List the unifi-dns module resources created for one device.
+
+    Args:
+        device: Entry of unifi.json `devices`
+        prefix: Module address prefix (GLUE_UNIFI_PREFIX inside the glue module)
+
+    Returns:
+        A-record and CNAME record addresses, keyed as in terraform/modules/unifi-dns
+    """
+    host = device["friendly_hostname"]
+    addresses = [f"{prefix}unifi_dns_record.dns_record{_index(host)}"]
+    for cname in device.get("service_cnames") or []:
+        addresses.append(f"{prefix}unifi_dns_record.cname_record{_index(f'{host}-{cname}')}")
+    for nic in device.get("nics") or []:
+        for cname in nic.get("service_cnames") or []:
+            key = f"{host}-{nic.get('nic_name')}-{cname}"
+            addresses.append(f"{prefix}unifi_dns_record.cname_record{_index(key)}")
+    return addresses
+
+
+def cloudflare_tunnel_addresses(mac: str, tunnel: dict[str, Any], prefix: str = "") -> list[str]:
+    """
+    List the cloudflare-tunnel module resources created for one tunnel.
+
+    Args:
+        mac: Key of the tunnel in cloudflare.json `tunnels`
+        tunnel: The tunnel entry
+        prefix: Module address prefix (GLUE_CLOUDFLARE_PREFIX inside the glue module)
+
+    Returns:
+        Tunnel, secret, tunnel config and DNS record addresses
+    """
+    addresses = [
+        f"{prefix}cloudflare_zero_trust_tunnel_cloudflared.this{_index(mac)}",
+        f"{prefix}random_password.tunnel_secret{_index(mac)}",
+        f"{prefix}cloudflare_zero_trust_tunnel_cloudflared_config.this{_index(mac)}",
+    ]
+    for idx, _ in enumerate(tunnel.get("services") or []):
+        addresses.append(f"{prefix}cloudflare_dns_record.tunnel{_index(f'{mac}-{idx}')}")
+    return addresses
+
+
+def _device_names(device: dict[str, Any], default_domain: Optional[str]) -> set[str]:
+    host = device["friendly_hostname"]
+    names = {_hostname(host)}
+    domain = device.get("domain") or default_domain
+    if domain:
+        names.add(_hostname(f"{host}.{domain}"))
+    names.update(_hostname(c) for c in device.get("service_cnames") or [])
+    for nic in device.get("nics") or []:
+        names.update(_hostname(c) for c in nic.get("service_cnames") or [])
+    return names
+
+
+def _device_macs(device: dict[str, Any]) -> set[str]:
+    macs = (normalize_mac(nic.get("mac_address") or "") for nic in device.get("nics") or [])
+    return {mac for mac in macs if mac}
+
+
+def resolve_targets(
+    targets: Iterable[str],
+    unifi_config: Optional[dict[str, Any]] = None,
+    cloudflare_config: Optional[dict[str, Any]] = None,
+    unifi_prefix: str = "",
+    cloudflare_prefix: str = "",
+) -> list[str]:
+    """
+    Translate MAC addresses and hostnames into Terraform `-target` addresses.
+
+    Args:
+        targets: MAC addresses and/or hostnames
+        unifi_config: Generated unifi.json, None when UniFi is not in scope
+        cloudflare_config: Generated cloudflare.json, None when Cloudflare is not in scope
+        unifi_prefix: Address prefix of the unifi-dns module resources
+        cloudflare_prefix: Address prefix of the cloudflare-tunnel module resources
+
+    Returns:
+        Resource addresses, in configuration order, without duplicates
+
+    Raises:
+        ValueError: If a target matches no device or tunnel in scope
+    """
+    devices = list((unifi_config or {}).get("devices") or [])
+    default_domain = (unifi_config or {}).get("default_domain")
+    tunnels = dict((cloudflare_config or {}).get("tunnels") or {})
+
+    device_names = [_device_names(device, default_domain) for device in devices]
+    device_macs = [_device_macs(device) for device in devices]
+    tunnel_macs = {key: normalize_mac(key) or key for key in tunnels}
+
+    selected: set[str] = set()
+    unmatched = []
+    for target in targets:
+        if not target.strip():
+            continue
+        mac = normalize_mac(target)
+        if mac is not None:
+            macs = {mac}
+        else:
+            name = _hostname(target)
+            macs = set()
+            for names, device_mac_set in zip(device_names, device_macs):
+                if name in names:
+                    macs |= device_mac_set
+            for key, tunnel in tunnels.items():
+                tunnel_names = {_hostname(tunnel.get("tunnel_name") or "")}
+                tunnel_names.update(_hostname(s.get("public_hostname") or "") for s in tunnel.get("services") or [])
+                if name in tunnel_names:
+                    macs.add(tunnel_macs[key])
+        in_scope = any(macs & m for m in device_macs) or any(tunnel_macs[key] in macs for key in tunnels)
+        if not in_scope:
+            unmatched.append(target)
+        selected |= macs
+
+    if unmatched:
+        raise ValueError(f"No device or tunnel matches: {', '.join(unmatched)}")
+
+    addresses: list[str] = []
+    for device, macs in zip(devices, device_macs):
+        if macs & selected:
+            addresses.extend(unifi_device_addresses(device, unifi_prefix))
+    for key, tunnel in tunnels.items():
+        if tunnel_macs[key] in selected:
+            addresses.extend(cloudflare_tunnel_addresses(key, tunnel, cloudflare_prefix))
+    return list(dict.fromkeys(addresses))
+
+
+def terraform_run_options(parallelism: int = 0, refresh: bool = True, addresses: Iterable[str] = ()) -> list[str]:
+    """
+    Build the plan/apply/destroy arguments for the run options.
+
+    Args:
+        parallelism: Concurrent operations (0 keeps Terraform's default of 10)
+        refresh: False adds -refresh=false
+        addresses: -target addresses from resolve_targets()
+
+    Returns:
+        Arguments to append to the Terraform command
+
+    Raises:
+        ValueError: If parallelism is negative
+    """
+    if parallelism < 0:
+        raise ValueError(f"--parallelism must be 0 (Terraform default) or greater, got {parallelism}")
+    args = []
+    if parallelism:
+        args.append(f"-parallelism={parallelism}")
+    if not refresh:
+        args.append("-refresh=false")
+    args.extend(f"-target={address}" for address in addresses)
+    return args
+
@@ -0,0 +1,342 @@
+"""Tunnel secrets from Terraform state.
+
+get_tunnel_secrets reads one state document per call: terraform.tfstate
+from --state-dir for local state (without running Terraform at all), or a
+single `terraform state pull` for remote backends (one backend round trip).
+The module type and the tunnel_ids, tunnel_tokens and credentials_json maps
+are taken from its root outputs here, or rebuilt from the tunnel and
+tunnel secret resources when the outputs are missing.
+
+The maps are turned into one record per tunnel (tunnel_records), optionally
+filtered by MAC address or tunnel name, and rendered from those records:
+`ndjson` puts each tunnel on its own line so automation can split the
+result per tunnel without parsing one large document, `human` keeps the
+sectioned text for a few tunnels. The whole result is still returned as a
+single string; nothing is streamed to the caller.
+"""
+
+import base64
+import json
+from typing import Any, Iterable, Iterator
+
+
+# State file written by the local backend (in --state-dir)
+LOCAL_STATE_FILE = "terraform.tfstate"
+
+# terraform.tfstate format version written by Terraform >= 0.12
+STATE_VERSION = 4
+
+# Outputs holding the tunnel secrets, keyed by MAC address
+SECRET_OUTPUTS = ("tunnel_ids", "tunnel_tokens", "credentials_json")
+
+# The glue module exposes the cloudflare-tunnel outputs with this prefix
+# (and unprefixed aliases for the names above)
+GLUE_OUTPUT_PREFIX = "cloudflare_"
+
+
+class MissingOutputsError(ValueError):
+    """Raised when the state lacks outputs needed for the tunnel secrets."""
+
+    def __init__(self, missing: list[str], available: list[str]):
+        super().__init__(f"Outputs not found in Terraform state: {', '.join(missing)}")
+        self.missing = missing
+        self.available = available
+
+
+def _output_values(outputs: dict[str, Any]) -> dict[str, Any]:
+    return {
+        name: output.get("value") if isinstance(output, dict) else output
+        for name, output in outputs.items()
+    }
+
+
+def load_state(state_text: str) -> dict[str, Any]:
+    """
+    Parse a terraform.tfstate document (or `terraform state pull` output).
+
+    Args:
+        state_text: State JSON; empty when no state exists
+
+    Returns:
+        The state document ({} without state)
+
+    Raises:
+        ValueError: If the state is not valid JSON or has an unsupported version
+    """
+    if not state_text.strip():
+        return {}
+    try:
+        state = json.loads(state_text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not parse Terraform state: {e}") from e
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        version = state.get("version") if isinstance(state, dict) else None
+        raise ValueError(f"Unsupported Terraform state version {version} (expected {STATE_VERSION})")
+    return state
+
+
+def detect_module(outputs: dict[str, Any]) -> str:
+    """
+    Detect which module created the state from its output names.
+
+    Returns:
+        "glue" when the prefixed glue outputs exist, else "cloudflare-tunnel"
+        (also the fallback when no tunnel outputs are present)
+    """
+    if f"{GLUE_OUTPUT_PREFIX}tunnel_ids" in outputs:
+        return "glue"
+    return "cloudflare-tunnel"
+
+
+def tunnel_outputs(outputs: dict[str, Any]) -> dict[str, Any]:
+    """
+    Select the tunnel_ids, tunnel_tokens and credentials_json maps.
+
+    Unprefixed names are used when present; states written by glue module
+    versions without the aliases fall back to the cloudflare_-prefixed names.
+
+    Args:
+        outputs: Root output values of the state
+
+    Returns:
+        {"tunnel_ids": {...}, "tunnel_tokens": {...}, "credentials_json": {...}}
+
+    Raises:
+        MissingOutputsError: If any of the three outputs is missing
+    """
+    selected: dict[str, Any] = {}
+    missing = []
+    for name in SECRET_OUTPUTS:
+        for candidate in (name, f"{GLUE_OUTPUT_PREFIX}{name}"):
+            if candidate in outputs:
+                selected[name] = outputs[candidate]
+                break
+        else:
+            missing.append(name)
+    if missing:
+        raise MissingOutputsError(missing, sorted(outputs))
+    return selected
+
+
+def _resource_instances(state: dict[str, Any], resource_type: str, name: str) -> tuple[str, dict[str, dict[str, Any]]]:
+    """Return (module address, {index_key: attributes}) of a managed resource."""
+    for resource in state.get("resources") or []:
+        if (
+            resource.get("mode", "managed") == "managed"
+            and resource.get("type") == resource_type
+            and resource.get("name") == name
+        ):
+            instances = {
+                str(instance.get("index_key")): instance.get("attributes") or {}
+                for instance in resource.get("instances") or []
+                if instance.get("index_key") is not None
+            }
+            return resource.get("module") or "", instances
+    return "", {}
+
+
+def resource_secrets(state: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    """
+    Rebuild the tunnel maps from the tunnel and tunnel secret resources.
+
+    Mirrors the cloudflare-tunnel module outputs: the token is the base64
+    encoded random_password result and credentials_json the compact JSON
+    cloudflared reads (AccountTag, TunnelID, TunnelName, TunnelSecret).
+
+    Args:
+        state: State document from load_state()
+
+    Returns:
+        Tuple of (module type, tunnel maps); the maps are empty when the
+        state has no tunnels
+    """
+    module, tunnels = _resource_instances(state, "cloudflare_zero_trust_tunnel_cloudflared", "this")
+    _, passwords = _resource_instances(state, "random_password", "tunnel_secret")
+    secrets: dict[str, Any] = {name: {} for name in SECRET_OUTPUTS}
+    for mac, tunnel in tunnels.items():
+        if mac not in passwords:
+            continue
+        token = base64.b64encode(str(passwords[mac].get("result", "")).encode()).decode()
+        secrets["tunnel_ids"][mac] = tunnel.get("id")
+        secrets["tunnel_tokens"][mac] = token
+        secrets["credentials_json"][mac] = json.dumps(
+            {
+                "AccountTag": tunnel.get("account_id"),
+                "TunnelID": tunnel.get("id"),
+                "TunnelName": tunnel.get("name"),
+                "TunnelSecret": token,
+            },
+            separators=(",", ":"),
+        )
+    return ("glue" if module.startswith("module.") else "cloudflare-tunnel"), secrets
+
+
+def state_tunnel_secrets(state: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    """
+    Extract the module type and tunnel maps from one state document.
+
+    Root outputs are used when present; otherwise the maps are rebuilt from
+    the resources (e.g. outputs removed from the configuration).
+
+    Args:
+        state: State document from load_state()
+
+    Returns:
+        Tuple of (module type, {"tunnel_ids", "tunnel_tokens", "credentials_json"})
+
+    Raises:
+        MissingOutputsError: If neither the outputs nor the resources hold tunnels
+    """
+    outputs = _output_values(state.get("outputs") or {})
+    try:
+        return detect_module(outputs), tunnel_outputs(outputs)
+    except MissingOutputsError:
+        module, secrets = resource_secrets(state)
+        if not secrets["tunnel_ids"]:
+            raise
+        return module, secrets
+
+
+def _credentials(value: Any) -> dict[str, Any]:
+    """Parse a credentials_json value (JSON string from the output, or already a map)."""
+    if isinstance(value, dict):
+        return value
+    try:
+        parsed = json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def tunnel_records(
+    secrets: dict[str, Any],
+    macs: Iterable[str] = (),
+    tunnel_names: Iterable[str] = (),
+) -> list[dict[str, Any]]:
+    """
+    Build one record per tunnel, selected by MAC address or tunnel name.
+
+    Each credentials JSON is parsed once. Without filters every tunnel is
+    selected; with filters a tunnel matching any MAC or any name is.
+
+    Args:
+        secrets: Tunnel maps from state_tunnel_secrets()
+        macs: MAC addresses in the lowercase colon format of the tunnel keys
+        tunnel_names: Tunnel names (case-insensitive)
+
+    Returns:
+        Records {mac, tunnel_id, tunnel_name, tunnel_token, credentials} in
+        tunnel_ids order
+
+    Raises:
+        ValueError: If a MAC address or tunnel name matches no tunnel
+    """
+    wanted_macs = {mac.lower() for mac in macs}
+    wanted_names = {name.strip().lower() for name in tunnel_names}
+    filtered = bool(wanted_macs or wanted_names)
+    tokens = secrets["tunnel_tokens"]
+    credentials = secrets["credentials_json"]
+
+    records = []
+    matched_macs: set[str] = set()
+    matched_names: set[str] = set()
+    for mac, tunnel_id in secrets["tunnel_ids"].items():
+        creds = _credentials(credentials.get(mac))
+        name = creds.get("TunnelName") or ""
+        if filtered:
+            mac_match = mac.lower() in wanted_macs
+            name_match = name.lower() in wanted_names
+            if not mac_match and not name_match:
+                continue
+            if mac_match:
+                matched_macs.add(mac.lower())
+            if name_match:
+                matched_names.add(name.lower())
+        records.append({
+            "mac": mac,
+            "tunnel_id": tunnel_id,
+            "tunnel_name": name,
+            "tunnel_token": tokens.get(mac),
+            "credentials": creds,
+        })
+
+    unmatched = sorted(wanted_macs - matched_macs) + sorted(wanted_names - matched_names)
+    if unmatched:
+        raise ValueError(f"No tunnel matches: {', '.join(unmatched)}")
+    return records
+
+
+def ndjson_lines(records: Iterable[dict[str, Any]]) -> Iterator[str]:
+    """Yield one compact JSON document per tunnel record (without newline)."""
+    for record in records:
+        yield json.dumps(record, separators=(",", ":"))
+
+
+def human_lines(
+    records: list[dict[str, Any]],
+    zone_name: str,
+    module_type: str,
+    total: int,
+    execution_id: str = "",
+) -> Iterator[str]:
+    """
+    Yield the lines of the human-readable secrets report.
+
+    Args:
+        records: Selected records from tunnel_records()
+        zone_name: DNS zone shown in the header
+        module_type: Detected module ("glue" or "cloudflare-tunnel")
+        total: Number of tunnels in the state (shown when records are filtered)
+        execution_id: Cache buster shown in the footer (optional)
+    """
+    rule, thin = "=" * 60, "-" * 60
+    yield from [rule, "CLOUDFLARE TUNNEL SECRETS", rule, ""]
+    yield f"Zone: {zone_name}"
+    yield f"Detected Module: {module_type}"
+    yield f"Total Tunnels: {len(records)}"
+    if len(records) != total:
+        yield f"Filtered: {len(records)} of {total} tunnels"
+    yield ""
+
+    yield from [thin, "TUNNEL IDS (for mapping MAC to Tunnel)", thin, ""]
+    for record in records:
+        yield from [f"MAC Address: {record['mac']}", f"Tunnel ID: {record['tunnel_id']}", ""]
+
+    yield from [thin, "TUNNEL TOKENS (for cloudflared login)", thin, ""]
+    for record in records:
+        yield from [f"MAC Address: {record['mac']}", f"Token: {record['tunnel_token']}", ""]
+
+    yield from [thin, "CREDENTIALS JSON (for cloudflared config.yml)", thin, ""]
+    for record in records:
+        creds = record["credentials"]
+        yield f"MAC Address: {record['mac']}"
+        yield f"  Account Tag: {creds.get('AccountTag', 'N/A')}"
+        yield f"  Tunnel ID: {creds.get('TunnelID', 'N/A')}"
+        yield f"  Tunnel Name: {creds.get('TunnelName', 'N/A')}"
+        yield f"  Tunnel Secret: {creds.get('TunnelSecret', 'N/A')}"
+        yield ""
+
+    yield from [
+        thin,
+        "USAGE INSTRUCTIONS",
+        thin,
+        "",
+        "1. Install cloudflared on your device:",
+        "   https://developers.cloudflare.com/cloudflare-one/connections/connect-apps/install-and-setup/installation/",
+        "",
+        "2. Authenticate using tunnel token (interactive):",
+        "   cloudflared tunnel login",
+        "",
+        "3. Or use credentials JSON for automated setup:",
+        "   Create /etc/cloudflared/config.yml with the credentials above",
+        "",
+        "4. Run cloudflared:",
+        "   cloudflared tunnel run",
+        "",
+    ]
+
+    # Execution ID makes the result unique (breaks Dagger cache)
+    if execution_id:
+        yield from [rule, f"Execution ID: {execution_id}", rule]
+    else:
+        yield rule
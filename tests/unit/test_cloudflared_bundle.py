@@ -0,0 +1,92 @@
+"""Unit tests for the cloudflared config bundle export."""
+
+import json
+import sys
+import os
+import importlib.util
+
+import yaml
+
+# Load cloudflared_bundle.py directly without going through the package __init__.py
+cloudflared_bundle_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'cloudflared_bundle.py'
+)
+spec = importlib.util.spec_from_file_location("cloudflared_bundle", cloudflared_bundle_path)
+cloudflared_bundle = importlib.util.module_from_spec(spec)
+sys.modules["cloudflared_bundle"] = cloudflared_bundle
+spec.loader.exec_module(cloudflared_bundle)
+
+bundle_files = cloudflared_bundle.bundle_files
+ingress_rules = cloudflared_bundle.ingress_rules
+
+
+CLOUDFLARE = {
+    "zone_name": "example.com",
+    "account_id": "acc",
+    "tunnels": {
+        "aa:bb:cc:dd:ee:01": {
+            "tunnel_name": "media-server",
+            "mac_address": "aa:bb:cc:dd:ee:01",
+            "services": [
+                {"public_hostname": "jellyfin.example.com", "local_service_url": "http://jellyfin:8096", "no_tls_verify": False},
+                {"public_hostname": "nas.example.com", "local_service_url": "https://nas:5001", "no_tls_verify": True},
+            ],
+        },
+    },
+}
+
+
+def record(mac, tunnel_id, name):
+    """Build a tunnel record as returned by tunnel_secrets.tunnel_records()."""
+    credentials = {"AccountTag": "acc", "TunnelID": tunnel_id, "TunnelName": name, "TunnelSecret": "c2VjcmV0"}
+    return {"mac": mac, "tunnel_id": tunnel_id, "tunnel_name": name, "tunnel_token": "c2VjcmV0", "credentials": credentials}
+
+
+class TestIngressRules:
+    """Test cases for ingress_rules function."""
+
+    def test_rules_match_module(self):
+        """One rule per service, noTLSVerify where set, catch-all last."""
+        assert ingress_rules(CLOUDFLARE["tunnels"]["aa:bb:cc:dd:ee:01"]) == [
+            {"hostname": "jellyfin.example.com", "service": "http://jellyfin:8096"},
+            {"hostname": "nas.example.com", "service": "https://nas:5001", "originRequest": {"noTLSVerify": True}},
+            {"service": "http_status:404"},
+        ]
+
+
+class TestBundleFiles:
+    """Test cases for bundle_files function."""
+
+    def test_bundle_layout(self):
+        """Each tunnel gets config.yml and its credentials file; the manifest lists them."""
+        files = {path: (contents, mode) for path, contents, mode in bundle_files(
+            [record("aa:bb:cc:dd:ee:01", "tid-1", "media-server")], CLOUDFLARE
+        )}
+        assert sorted(files) == ["aa-bb-cc-dd-ee-01/config.yml", "aa-bb-cc-dd-ee-01/tid-1.json", "manifest.json"]
+
+        config = yaml.safe_load(files["aa-bb-cc-dd-ee-01/config.yml"][0])
+        assert config["tunnel"] == "tid-1"
+        assert config["credentials-file"] == "/etc/cloudflared/tid-1.json"
+        assert config["ingress"][-1] == {"service": "http_status:404"}
+
+        contents, mode = files["aa-bb-cc-dd-ee-01/tid-1.json"]
+        assert json.loads(contents)["TunnelSecret"] == "c2VjcmV0"
+        assert mode == 0o600
+
+        manifest = json.loads(files["manifest.json"][0])
+        assert manifest["count"] == 1
+        assert manifest["tunnels"][0]["hostnames"] == ["jellyfin.example.com", "nas.example.com"]
+
+    def test_tunnel_missing_from_config_is_skipped(self):
+        """Tunnels without a cloudflare.json entry are only listed as skipped."""
+        files = list(bundle_files([record("aa:bb:cc:dd:ee:09", "tid-9", "old")], CLOUDFLARE, "/opt/cf/"))
+        assert [path for path, _, _ in files] == ["manifest.json"]
+        manifest = json.loads(files[0][1])
+        assert manifest["count"] == 0
+        assert manifest["skipped"] == ["aa:bb:cc:dd:ee:09"]
+
+    def test_credentials_dir(self):
+        """config.yml points at the credentials file in --credentials-dir."""
+        path, contents, _ = next(iter(bundle_files([record("aa:bb:cc:dd:ee:01", "tid-1", "m")], CLOUDFLARE, "/opt/cf/")))
+        assert path == "aa-bb-cc-dd-ee-01/config.yml"
+        assert yaml.safe_load(contents)["credentials-file"] == "/opt/cf/tid-1.json"
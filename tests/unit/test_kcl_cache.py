@@ -0,0 +1,185 @@
+"""Unit tests for the content-addressed KCL generation cache helpers."""
+
+import pytest
+import subprocess
+import sys
+import os
+import importlib.util
+
+# Load kcl_cache.py directly without going through the package __init__.py
+kcl_cache_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'kcl_cache.py'
+)
+spec = importlib.util.spec_from_file_location("kcl_cache", kcl_cache_path)
+kcl_cache = importlib.util.module_from_spec(spec)
+sys.modules["kcl_cache"] = kcl_cache
+spec.loader.exec_module(kcl_cache)
+
+generation_cache_key = kcl_cache.generation_cache_key
+cache_lookup_script = kcl_cache.cache_lookup_script
+cache_store_script = kcl_cache.cache_store_script
+KCL_SOURCE_PATTERNS = kcl_cache.KCL_SOURCE_PATTERNS
+
+
+def run_sh(script):
+    """Run a generated script with /bin/sh and return its stdout."""
+    result = subprocess.run(["sh", "-c", script], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+class TestGenerationCacheKey:
+    """Test cases for generation_cache_key function."""
+
+    def test_key_is_deterministic(self):
+        """Same sources and KCL version give the same key."""
+        assert generation_cache_key("sha256:abc", "0.11.0") == generation_cache_key("sha256:abc", "0.11.0")
+
+    def test_key_changes_with_sources(self):
+        """A different source digest gives a different key."""
+        assert generation_cache_key("sha256:abc", "0.11.0") != generation_cache_key("sha256:abd", "0.11.0")
+
+    def test_key_changes_with_kcl_version(self):
+        """Bumping the KCL version invalidates cached results."""
+        assert generation_cache_key("sha256:abc", "0.11.0") != generation_cache_key("sha256:abc", "0.11.1")
+
+    def test_key_changes_with_component(self):
+        """Component-scoped runs are cached separately from full runs."""
+        full = generation_cache_key("sha256:abc", "0.11.0")
+        assert full == generation_cache_key("sha256:abc", "0.11.0", "all")
+        assert full != generation_cache_key("sha256:abc", "0.11.0", "unifi")
+        assert generation_cache_key("sha256:abc", "0.11.0", "unifi") != generation_cache_key(
+            "sha256:abc", "0.11.0", "cloudflare"
+        )
+
+    def test_key_changes_with_toolchain(self):
+        """A different prebuilt toolchain under the same version string is cached separately."""
+        toolchain_identity = kcl_cache.toolchain_identity
+        builtin = generation_cache_key("sha256:abc", "0.11.0")
+        assert builtin == generation_cache_key("sha256:abc", "0.11.0", "all", toolchain_identity())
+        keys = {
+            builtin,
+            generation_cache_key("sha256:abc", "0.11.0", "all", toolchain_identity("sha256:t1")),
+            generation_cache_key("sha256:abc", "0.11.0", "all", toolchain_identity("sha256:t2")),
+            generation_cache_key("sha256:abc", "0.11.0", "all", toolchain_identity(image_ref="registry.local/kcl:a")),
+            generation_cache_key("sha256:abc", "0.11.0", "all", toolchain_identity(image_ref="registry.local/kcl:b")),
+        }
+        assert len(keys) == 5
+
+    def test_key_is_path_safe(self):
+        """Keys are plain hex so they can be used as directory names."""
+        key = generation_cache_key("sha256:abc", "latest")
+        assert len(key) == 64
+        assert all(c in "0123456789abcdef" for c in key)
+
+    def test_source_patterns_cover_kcl_inputs(self):
+        """Only KCL sources and module files feed the digest."""
+        assert "**/*.k" in KCL_SOURCE_PATTERNS
+        assert "kcl.mod" in KCL_SOURCE_PATTERNS
+        assert "kcl.mod.lock" in KCL_SOURCE_PATTERNS
+
+
+class TestCacheScripts:
+    """Test cases for the cache lookup and store scripts."""
+
+    def test_lookup_miss_on_empty_cache(self, tmp_path):
+        """An empty cache reports a miss."""
+        script = cache_lookup_script(str(tmp_path / "cache"), "k1", ["unifi.json"], str(tmp_path / "out"))
+        assert run_sh(script) == "miss"
+
+    def test_store_then_lookup_hit(self, tmp_path):
+        """Stored outputs are restored on the next lookup."""
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "unifi.json").write_text('{"devices": []}')
+        (src / "cloudflare.json").write_text('{"tunnels": {}}')
+        cache = str(tmp_path / "cache")
+
+        run_sh(cache_store_script(cache, "k1", str(src)))
+        out = tmp_path / "out"
+        script = cache_lookup_script(cache, "k1", ["unifi.json", "cloudflare.json"], str(out))
+
+        assert run_sh(script) == "hit"
+        assert (out / "unifi.json").read_text() == '{"devices": []}'
+        assert (out / "cloudflare.json").read_text() == '{"tunnels": {}}'
+
+    def test_lookup_miss_when_file_missing(self, tmp_path):
+        """A partial entry is a miss for callers needing more files."""
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "unifi.json").write_text("{}")
+        cache = str(tmp_path / "cache")
+
+        run_sh(cache_store_script(cache, "k1", str(src)))
+        script = cache_lookup_script(cache, "k1", ["unifi.json", "cloudflare.json"], str(tmp_path / "out"))
+
+        assert run_sh(script) == "miss"
+
+    def test_lookup_miss_for_other_key(self, tmp_path):
+        """Entries are isolated per key."""
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "unifi.json").write_text("{}")
+        cache = str(tmp_path / "cache")
+
+        run_sh(cache_store_script(cache, "k1", str(src)))
+        script = cache_lookup_script(cache, "k2", ["unifi.json"], str(tmp_path / "out"))
+
+        assert run_sh(script) == "miss"
+
+    def test_store_leaves_no_temporary_files(self, tmp_path):
+        """Atomic writes rename temporary files into place."""
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "unifi.json").write_text("{}")
+        cache = tmp_path / "cache"
+
+        run_sh(cache_store_script(str(cache), "k1", str(src)))
+
+        assert sorted(os.listdir(cache / "k1")) == ["unifi.json"]
+
+
+class TestDependencyCache:
+    """Test cases for the KCL dependency cache helpers."""
+
+    def test_volume_name_tracks_lock_digest(self):
+        """A changed lock file selects a different cache volume."""
+        first = kcl_cache.dependency_cache_volume_name("sha256:aaa")
+        assert first == kcl_cache.dependency_cache_volume_name("sha256:aaa")
+        assert first != kcl_cache.dependency_cache_volume_name("sha256:bbb")
+        assert first.startswith("unifi-cloudflare-glue-kcl-deps-")
+
+    def test_remote_dependencies_git(self):
+        """Git dependencies are listed with their ref."""
+        mod = (
+            '[package]\nname = "example"\n\n[dependencies]\n'
+            'unifi_cloudflare_glue = { git = "https://github.com/SolomonHD/unifi-cloudflare-glue", tag = "v0.12.2" }\n'
+        )
+        assert kcl_cache.remote_dependencies(mod) == [
+            "unifi_cloudflare_glue (git https://github.com/SolomonHD/unifi-cloudflare-glue v0.12.2)"
+        ]
+
+    def test_remote_dependencies_skips_path_and_empty(self):
+        """Local path dependencies and empty modules need no download."""
+        assert kcl_cache.remote_dependencies('[package]\nname = "x"\n\n[dependencies]\n') == []
+        assert kcl_cache.remote_dependencies('[dependencies]\nglue = { path = "../.." }\n') == []
+
+    def test_remote_dependencies_registry_version(self):
+        """Registry dependencies declared by version string are listed."""
+        assert kcl_cache.remote_dependencies('[dependencies]\nk8s = "1.28"\n') == ["k8s (registry 1.28)"]
+
+    def test_remote_dependencies_invalid_toml(self):
+        """Malformed kcl.mod raises ValueError."""
+        with pytest.raises(ValueError, match="Invalid kcl.mod"):
+            kcl_cache.remote_dependencies("[dependencies\n")
+
+    def test_offline_sync_fails_without_marker(self, tmp_path):
+        """Offline mode exits non-zero when the cache was never populated."""
+        script = kcl_cache.dependency_sync_script(str(tmp_path), offline=True)
+        result = subprocess.run(["sh", "-c", script], capture_output=True, text=True)
+        assert result.returncode == 3
+
+    def test_sync_is_noop_when_marker_present(self, tmp_path):
+        """A populated cache skips kcl mod update in both modes."""
+        (tmp_path / kcl_cache.DEPENDENCY_MARKER).write_text("")
+        assert run_sh(kcl_cache.dependency_sync_script(str(tmp_path), offline=True)) == "cached"
+        assert run_sh(kcl_cache.dependency_sync_script(str(tmp_path))) == "cached"
@@ -0,0 +1,76 @@
+"""Unit tests for in-process splitting of KCL output."""
+
+import json
+import pytest
+import sys
+import os
+import importlib.util
+
+# Load kcl_output.py directly without going through the package __init__.py
+kcl_output_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'kcl_output.py'
+)
+spec = importlib.util.spec_from_file_location("kcl_output", kcl_output_path)
+kcl_output = importlib.util.module_from_spec(spec)
+sys.modules["kcl_output"] = kcl_output
+spec.loader.exec_module(kcl_output)
+
+load_kcl_document = kcl_output.load_kcl_document
+split_kcl_outputs = kcl_output.split_kcl_outputs
+
+
+class TestLoadKclDocument:
+    """Test cases for load_kcl_document function."""
+
+    def test_json_document(self):
+        """JSON output from --format json is parsed."""
+        assert load_kcl_document('{"unifi_output": {"devices": []}}') == {"unifi_output": {"devices": []}}
+
+    def test_yaml_document(self):
+        """KCL's default YAML output is parsed with the YAML loader."""
+        text = "unifi_output:\n  devices: []\ncf_output:\n  tunnels: {}\n"
+        assert load_kcl_document(text, output_format="yaml") == {
+            "unifi_output": {"devices": []},
+            "cf_output": {"tunnels": {}},
+        }
+
+    def test_empty_yaml_is_empty_mapping(self):
+        """An empty YAML stream yields an empty document."""
+        assert load_kcl_document("", output_format="yaml") == {}
+
+    def test_invalid_json_raises(self):
+        """Unparseable output raises ValueError."""
+        with pytest.raises(ValueError, match="Could not parse KCL json output"):
+            load_kcl_document("✓ VALIDATION PASSED\n{}")
+
+    def test_non_mapping_raises(self):
+        """A top-level list is rejected."""
+        with pytest.raises(ValueError, match="must be a mapping"):
+            load_kcl_document("[1, 2]")
+
+
+class TestSplitKclOutputs:
+    """Test cases for split_kcl_outputs function."""
+
+    def test_splits_requested_keys(self):
+        """Each requested variable becomes its own JSON document."""
+        document = {
+            "unifi_output": {"devices": [{"friendly_hostname": "nas"}]},
+            "cf_output": {"zone_name": "example.com", "tunnels": {}},
+            "unifi_config": {"ignored": True},
+        }
+        outputs = split_kcl_outputs(document, ["unifi_output", "cf_output"])
+
+        assert set(outputs) == {"unifi_output", "cf_output"}
+        assert json.loads(outputs["unifi_output"]) == document["unifi_output"]
+        assert json.loads(outputs["cf_output"]) == document["cf_output"]
+
+    def test_missing_and_null_keys_are_none(self):
+        """Missing or null variables are reported as None."""
+        outputs = split_kcl_outputs({"cf_output": None}, ["unifi_output", "cf_output"])
+        assert outputs == {"unifi_output": None, "cf_output": None}
+
+    def test_preserves_key_order(self):
+        """Key order from KCL is kept in the rendered JSON."""
+        outputs = split_kcl_outputs({"unifi_output": {"b": 1, "a": 2}}, ["unifi_output"])
+        assert outputs["unifi_output"].index('"b"') < outputs["unifi_output"].index('"a"')
@@ -0,0 +1,243 @@
+"""Unit tests for the streaming plan.json analyzer."""
+
+import io
+import json
+import pytest
+import sys
+import os
+import importlib.util
+import tracemalloc
+
+# Load plan_summary.py directly without going through the package __init__.py
+plan_summary_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'plan_summary.py'
+)
+spec = importlib.util.spec_from_file_location("plan_summary", plan_summary_path)
+plan_summary = importlib.util.module_from_spec(spec)
+sys.modules["plan_summary"] = plan_summary
+spec.loader.exec_module(plan_summary)
+
+stream_plan = plan_summary.stream_plan
+PlanSummary = plan_summary.PlanSummary
+action_label = plan_summary.action_label
+module_label = plan_summary.module_label
+
+
+def resource_change(module, resource_type, key, actions):
+    """Build a resource_changes entry as emitted by terraform show -json."""
+    prefix = f"module.{module}." if module else ""
+    return {
+        "address": f'{prefix}{resource_type}.this["{key}"]',
+        "module_address": f"module.{module}" if module else None,
+        "mode": "managed",
+        "type": resource_type,
+        "name": "this",
+        "index": key,
+        "change": {"actions": actions, "before": None, "after": {"name": key}},
+    }
+
+
+def write_plan(path, count):
+    """Write a plan.json with `count` creates and prior state/planned values of the same size."""
+    with open(path, "w") as f:
+        f.write('{"format_version": "1.2", "terraform_version": "1.10.0", "planned_values": {"resources": [')
+        f.write(",".join(json.dumps({"name": f"h{i}.example.com", "ttl": 1}) for i in range(count)))
+        f.write(']}, "resource_changes": [')
+        f.write(",".join(
+            json.dumps(resource_change("cloudflare_tunnel", "cloudflare_dns_record", f"h{i}", ["create"]))
+            for i in range(count)
+        ))
+        f.write('], "output_changes": {"tunnel_ids": {"actions": ["update"]}}, "prior_state": {"values": [')
+        f.write(",".join(json.dumps({"secret": f'"}}]]\\\\{i}'}) for i in range(count)))
+        f.write(']}, "errored": false}')
+
+
+PLAN = {
+    "format_version": "1.2",
+    "terraform_version": "1.10.0",
+    "duration": -2.5e10,
+    "planned_values": {"root_module": {"values": ["a\"b", "{[}]", 1.5e10, None, True, "\\", "x\\\"]"]}},
+    "resource_changes": [
+        resource_change("unifi_dns", "unifi_dns_record", "nas", ["create"]),
+        resource_change("unifi_dns", "unifi_dns_record", "tv", ["no-op"]),
+        resource_change("cloudflare_tunnel", "cloudflare_zero_trust_tunnel_cloudflared", "aa", ["delete", "create"]),
+        resource_change("cloudflare_tunnel", "cloudflare_dns_record", "nas", ["update"]),
+        resource_change("", "random_password", "x", ["delete"]),
+    ],
+    "output_changes": {"tunnel_ids": {"actions": ["create"]}, "zone": {"actions": ["no-op"]}},
+    "prior_state": {"values": {"secret": "}}]]\"\\"}},
+    "applyable": True,
+    "errored": False,
+}
+
+
+class TestStreamPlan:
+    """Test cases for stream_plan function."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 9, 11, 64, 65536])
+    def test_matches_json_loads(self, chunk_size):
+        """Chunk boundaries anywhere (inside strings, escapes, numbers) give the same result."""
+        changes = []
+        kept = stream_plan(io.StringIO(json.dumps(PLAN)), changes.append, chunk_size=chunk_size)
+
+        assert changes == PLAN["resource_changes"]
+        assert kept == {
+            "format_version": "1.2",
+            "terraform_version": "1.10.0",
+            "output_changes": PLAN["output_changes"],
+            "applyable": True,
+            "errored": False,
+        }
+
+        # Top-level numbers are decoded whole even when a chunk ends after `-2.` or `1e`
+        kept = stream_plan(
+            io.StringIO(json.dumps(PLAN)), lambda change: None, keep=["duration"], chunk_size=chunk_size
+        )
+        assert kept == {"duration": -2.5e10}
+
+    def test_empty_plan(self):
+        """Plans without resource_changes are valid."""
+        changes = []
+        assert stream_plan(io.StringIO('{"resource_changes": [], "errored": false}'), changes.append) == {
+            "errored": False
+        }
+        assert changes == []
+
+    @pytest.mark.parametrize("text", ['{"a": [1, 2', '{"resource_changes": [{}', '[]', '{"a" 1}', ''])
+    def test_invalid_json_raises(self, text):
+        """Truncated or malformed plans raise ValueError."""
+        with pytest.raises(ValueError, match="Invalid plan JSON"):
+            stream_plan(io.StringIO(text), lambda change: None, chunk_size=3)
+
+    def test_memory_is_bounded_by_resource_change(self, tmp_path):
+        """Skipped sections and consumed changes are not kept in memory."""
+        path = tmp_path / "plan.json"
+        write_plan(path, 5000)
+        summary = PlanSummary()
+
+        tracemalloc.start()
+        try:
+            with open(path) as f:
+                stream_plan(f, summary.add)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        assert summary.totals()["add"] == 5000
+        assert peak < os.path.getsize(path) / 4
+
+    def test_fifty_thousand_changes(self, tmp_path):
+        """Large plans are summarized in one pass."""
+        path = tmp_path / "plan.json"
+        write_plan(path, 50000)
+        summary = PlanSummary()
+
+        with open(path) as f:
+            kept = stream_plan(f, summary.add)
+
+        data = summary.to_dict(kept)
+        assert data["totals"] == {"add": 50000, "change": 0, "destroy": 0, "total": 50000}
+        assert data["by_module"] == {"cloudflare_tunnel": {"create": 50000}}
+        assert data["output_changes"] == {"update": 1}
+
+
+class TestPlanSummary:
+    """Test cases for PlanSummary."""
+
+    def test_actions_are_strings(self):
+        """Terraform emits actions as a list of strings."""
+        assert action_label(["create"]) == "create"
+        assert action_label(["delete", "create"]) == "replace"
+        assert action_label(["create", "delete"]) == "replace"
+        assert action_label(["no-op"]) == "no-op"
+        assert action_label([]) == "no-op"
+
+    def test_module_label(self):
+        """Resources are grouped by the glue child module."""
+        assert module_label({"module_address": "module.unifi_dns"}) == "unifi_dns"
+        assert module_label({"module_address": "module.cloudflare_tunnel.module.inner"}) == "cloudflare_tunnel"
+        assert module_label({"address": 'module.unifi_dns["a"].unifi_dns_record.x'}) == "unifi_dns"
+        assert module_label({"address": "random_password.x"}) == "(root)"
+
+    def test_summary_document(self):
+        """Counts are grouped by action, module and resource type."""
+        summary = PlanSummary()
+        for change in PLAN["resource_changes"]:
+            summary.add(change)
+        data = summary.to_dict({"terraform_version": "1.10.0", "output_changes": PLAN["output_changes"]})
+
+        assert data["format"] == "unifi-cloudflare-glue-plan-summary/v1"
+        assert data["totals"] == {"add": 2, "change": 1, "destroy": 2, "total": 5}
+        assert data["resource_changes"] == 5
+        assert data["by_action"] == {"create": 1, "delete": 1, "no-op": 1, "replace": 1, "update": 1}
+        assert data["by_module"] == {
+            "(root)": {"delete": 1},
+            "cloudflare_tunnel": {"replace": 1, "update": 1},
+            "unifi_dns": {"create": 1, "no-op": 1},
+        }
+        assert data["by_resource_type"]["unifi_dns_record"] == {"create": 1, "no-op": 1}
+        assert data["output_changes"] == {"create": 1, "no-op": 1}
+        json.dumps(data)
+
+
+class TestDriftReport:
+    """Test cases for DriftReport."""
+
+    DRIFT_PLAN = {
+        "format_version": "1.2",
+        "terraform_version": "1.10.0",
+        "resource_drift": [
+            {
+                "address": 'module.unifi_dns.unifi_dns_record.this["nas"]',
+                "module_address": "module.unifi_dns",
+                "mode": "managed",
+                "type": "unifi_dns_record",
+                "name": "this",
+                "change": {
+                    "actions": ["update"],
+                    "before": {"record": "10.0.0.2", "ttl": 0, "password": "old"},
+                    "after": {"record": "10.0.0.9", "ttl": 0, "password": "new"},
+                },
+            },
+            resource_change("cloudflare_tunnel", "cloudflare_dns_record", "tv", ["delete"]),
+        ],
+        "resource_changes": [resource_change("unifi_dns", "unifi_dns_record", "nas", ["no-op"])],
+        "output_changes": {"tunnel_ids": {"actions": ["update"]}, "zone": {"actions": ["no-op"]}},
+    }
+
+    def test_report_from_resource_drift(self):
+        """Drift entries are read from resource_drift and never include values."""
+        report = plan_summary.DriftReport()
+        kept = stream_plan(io.StringIO(json.dumps(self.DRIFT_PLAN)), report.add, changes_key="resource_drift")
+        data = report.to_dict(2, kept, scope="all")
+
+        assert data["drifted"] is True
+        assert data["exit_code"] == 2
+        assert data["scope"] == "all"
+        assert data["by_module"] == {"cloudflare_tunnel": {"delete": 1}, "unifi_dns": {"update": 1}}
+        assert data["resources"][0] == {
+            "address": 'module.unifi_dns.unifi_dns_record.this["nas"]',
+            "module": "unifi_dns",
+            "action": "update",
+            "attributes": ["password", "record"],
+        }
+        assert data["outputs"] == ["tunnel_ids"]
+        assert "10.0.0.9" not in json.dumps(data)
+        assert "new" not in json.dumps(data["resources"])
+
+    def test_no_drift(self):
+        """Exit code 0 reports no drift without reading the plan."""
+        data = plan_summary.DriftReport().to_dict(0)
+        assert data["drifted"] is False
+        assert data["resources"] == []
+        assert "resources_omitted" not in data
+
+    def test_resource_list_is_capped(self):
+        """Only max_resources entries are listed; the rest are counted."""
+        report = plan_summary.DriftReport(max_resources=2)
+        for i in range(5):
+            report.add(resource_change("unifi_dns", "unifi_dns_record", f"h{i}", ["delete"]))
+        data = report.to_dict(2)
+        assert len(data["resources"]) == 2
+        assert data["resources_omitted"] == 3
+        assert data["by_action"] == {"delete": 5}
@@ -0,0 +1,130 @@
+"""Unit tests for rendering plan.txt from plan.json."""
+
+import sys
+import os
+import importlib.util
+
+# Load plan_text.py directly without going through the package __init__.py
+plan_text_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'plan_text.py'
+)
+spec = importlib.util.spec_from_file_location("plan_text", plan_text_path)
+plan_text = importlib.util.module_from_spec(spec)
+sys.modules["plan_text"] = plan_text
+spec.loader.exec_module(plan_text)
+
+render_plan_text = plan_text.render_plan_text
+render_resource_change = plan_text.render_resource_change
+change_counts = plan_text.change_counts
+
+
+def resource_change(address, actions, before=None, after=None, **change):
+    """Build a resource_changes entry as emitted by terraform show -json."""
+    resource_type, name = address.split(".")[-2:]
+    return {
+        "address": address,
+        "mode": "managed",
+        "type": resource_type,
+        "name": name.split("[")[0],
+        "change": {"actions": actions, "before": before, "after": after, **change},
+    }
+
+
+class TestChangeCounts:
+    """Test cases for change_counts function."""
+
+    def test_counts_match_terraform(self):
+        """Replacements count as one add and one destroy; no-op and read count nothing."""
+        assert change_counts(["create"]) == (1, 0, 0)
+        assert change_counts(["update"]) == (0, 1, 0)
+        assert change_counts(["delete"]) == (0, 0, 1)
+        assert change_counts(["delete", "create"]) == (1, 0, 1)
+        assert change_counts(["create", "delete"]) == (1, 0, 1)
+        assert change_counts(["no-op"]) == (0, 0, 0)
+        assert change_counts(["read"]) == (0, 0, 0)
+
+
+class TestRenderResourceChange:
+    """Test cases for render_resource_change function."""
+
+    def test_create(self):
+        """Created resources list their attributes with unknowns marked."""
+        text = render_resource_change(resource_change(
+            'module.unifi_dns.unifi_dns_record.this["nas"]', ["create"],
+            after={"name": "nas.lan", "ttl": 0, "enabled": True},
+            after_unknown={"id": True},
+        ))
+        assert text.splitlines() == [
+            '  # module.unifi_dns.unifi_dns_record.this["nas"] will be created',
+            '  + resource "unifi_dns_record" "this" {',
+            "      + enabled = true",
+            "      + id      = (known after apply)",
+            '      + name    = "nas.lan"',
+            "      + ttl     = 0",
+            "    }",
+        ]
+
+    def test_update_hides_unchanged_attributes(self):
+        """Only changed attributes are shown for in-place updates."""
+        text = render_resource_change(resource_change(
+            "unifi_dns_record.a", ["update"],
+            before={"name": "a", "record": "10.0.0.1", "ttl": 60},
+            after={"name": "a", "record": "10.0.0.2", "ttl": None},
+        ))
+        assert '      ~ record = "10.0.0.1" -> "10.0.0.2"' in text
+        assert "      - ttl    = 60 -> null" in text
+        assert "(1 unchanged attribute hidden)" in text
+        assert "will be updated in-place" in text
+
+    def test_replace_marks_forcing_attribute(self):
+        """Replacements show the attribute forcing replacement."""
+        text = render_resource_change(resource_change(
+            "cloudflare_zero_trust_tunnel_cloudflared.t", ["delete", "create"],
+            before={"name": "old"}, after={"name": "new"}, replace_paths=[["name"]],
+        ))
+        assert text.splitlines()[1].startswith('-/+ resource "cloudflare_zero_trust_tunnel_cloudflared" "t"')
+        assert '"old" -> "new" # forces replacement' in text
+
+    def test_sensitive_values_are_redacted(self):
+        """Sensitive attribute values never appear in the text."""
+        text = render_resource_change(resource_change(
+            "cloudflare_zero_trust_tunnel_cloudflared.t", ["create"],
+            after={"name": "t", "tunnel_secret": "c2VjcmV0", "config": {"token": "abc"}},
+            after_sensitive={"tunnel_secret": True, "config": {"token": True}},
+        ))
+        assert "c2VjcmV0" not in text
+        assert "abc" not in text
+        assert "tunnel_secret = (sensitive value)" in text
+
+    def test_no_op_is_skipped(self):
+        """Unchanged resources are not rendered."""
+        assert render_resource_change(resource_change("a.b", ["no-op"], {"x": 1}, {"x": 1})) is None
+
+
+class TestRenderPlanText:
+    """Test cases for render_plan_text function."""
+
+    def test_plan_line_and_outputs(self):
+        """The Plan: line and output changes follow the resource blocks."""
+        text = render_plan_text(
+            [
+                resource_change("a.one", ["create"], after={"x": 1}),
+                resource_change("a.two", ["delete", "create"], before={"x": 1}, after={"x": 2}),
+                resource_change("a.three", ["no-op"], before={"x": 1}, after={"x": 1}),
+            ],
+            {"tunnel_ids": {"actions": ["create"], "after_unknown": True}},
+        )
+        assert "Plan: 2 to add, 0 to change, 1 to destroy." in text
+        assert "Changes to Outputs:\n  + tunnel_ids = (known after apply)" in text
+        assert "-/+ destroy and then create replacement" in text
+        assert "a.three" not in text
+
+    def test_no_changes(self):
+        """An empty plan says so."""
+        text = render_plan_text([], {"x": {"actions": ["no-op"]}})
+        assert text.startswith("No changes. Your infrastructure matches the configuration.")
+
+    def test_accepts_iterators(self):
+        """Resource changes can be streamed in."""
+        changes = (resource_change(f"a.r{i}", ["create"], after={"i": i}) for i in range(3))
+        assert "Plan: 3 to add, 0 to change, 0 to destroy." in render_plan_text(changes)
@@ -0,0 +1,202 @@
+"""Unit tests for the offline Terraform provider mirror helpers."""
+
+import pytest
+import sys
+import os
+import importlib.util
+
+# Load provider_mirror.py directly without going through the package __init__.py
+provider_mirror_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'provider_mirror.py'
+)
+spec = importlib.util.spec_from_file_location("provider_mirror", provider_mirror_path)
+provider_mirror = importlib.util.module_from_spec(spec)
+sys.modules["provider_mirror"] = provider_mirror
+spec.loader.exec_module(provider_mirror)
+
+MODULES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'terraform', 'modules')
+
+
+def bundled_modules():
+    """Read versions.tf and .terraform.lock.hcl of every mirrored module."""
+    modules = {}
+    for module in provider_mirror.MIRRORED_MODULES:
+        contents = []
+        for name in ("versions.tf", provider_mirror.LOCK_FILE):
+            with open(os.path.join(MODULES_DIR, module, name)) as f:
+                contents.append(f.read())
+        modules[module] = tuple(contents)
+    return modules
+
+
+def archives_for(locked, platform="linux_amd64"):
+    """Build one flat archive name per locked provider version."""
+    return [
+        f"terraform-provider-{source.rsplit('/', 1)[1]}_{version}_{platform}.zip"
+        for source, versions in locked.items()
+        for version in versions
+    ]
+
+
+class TestRequiredProviders:
+    """Test cases for parsing versions.tf requirements."""
+
+    def test_parse_required_providers(self):
+        """Sources and constraints are read from required_providers."""
+        versions_tf = '''
+terraform {
+  required_version = ">= 1.5.0"
+
+  required_providers {
+    unifi = {
+      source  = "filipowm/unifi"
+      version = "~> 1.0"
+    }
+  }
+}
+'''
+        assert provider_mirror.parse_required_providers(versions_tf) == {
+            "unifi": {"source": "filipowm/unifi", "version": "~> 1.0"}
+        }
+
+    def test_missing_source_raises(self):
+        """A provider without a source cannot be mirrored."""
+        with pytest.raises(ValueError, match="no source"):
+            provider_mirror.parse_required_providers('required_providers {\n  x = { version = "1.0" }\n}')
+
+
+
+class TestLockedProviders:
+    """Test cases for parse_lock_file and locked_providers."""
+
+    LOCK = '''
+provider "registry.terraform.io/hashicorp/null" {
+  version = "3.2.4"
+  hashes = [
+    "h1:abc=",
+  ]
+}
+
+provider "registry.terraform.io/hashicorp/random" {
+  version     = "3.8.1"
+  constraints = "~> 3.0"
+}
+'''
+    VERSIONS = 'required_providers {\n  random = { source = "hashicorp/random", version = "~> 3.0" }\n}'
+
+    def test_parse_lock_file(self):
+        """Every provider block is read, with or without constraints."""
+        assert provider_mirror.parse_lock_file(self.LOCK) == {
+            "registry.terraform.io/hashicorp/null": "3.2.4",
+            "registry.terraform.io/hashicorp/random": "3.8.1",
+        }
+
+    def test_bundled_modules(self):
+        """The repository's lock files pin implicit providers and per-module versions."""
+        locked = provider_mirror.locked_providers(bundled_modules())
+        assert sorted(locked) == [
+            "registry.terraform.io/cloudflare/cloudflare",
+            "registry.terraform.io/filipowm/unifi",
+            "registry.terraform.io/hashicorp/null",
+            "registry.terraform.io/hashicorp/random",
+        ]
+        # null_resource in unifi-dns needs hashicorp/null without declaring it
+        assert locked["registry.terraform.io/hashicorp/null"] == ["3.2.4"]
+        # glue and cloudflare-tunnel lock different cloudflare versions; both are mirrored
+        assert locked["registry.terraform.io/cloudflare/cloudflare"] == ["5.16.0", "5.17.0"]
+
+    def test_unlocked_requirement_raises(self):
+        """A required provider missing from the lock file is reported."""
+        with pytest.raises(ValueError, match="hashicorp/random is not in .terraform.lock.hcl"):
+            provider_mirror.locked_providers({"m": (self.VERSIONS, 'provider "hashicorp/null" {\n  version = "3.2.4"\n}\n')})
+
+    def test_lock_violating_constraint_raises(self):
+        """A locked version outside the versions.tf constraint is reported."""
+        versions = self.VERSIONS.replace("~> 3.0", "~> 4.0")
+        with pytest.raises(ValueError, match="locked registry.terraform.io/hashicorp/random 3.8.1 does not satisfy ~> 4.0"):
+            provider_mirror.locked_providers({"m": (versions, self.LOCK)})
+
+
+class TestVersionSatisfies:
+    """Test cases for version_satisfies function."""
+
+    @pytest.mark.parametrize("version,constraint,expected", [
+        ("5.0.0", "~> 5.0", True),
+        ("5.8.2", "~> 5.0", True),
+        ("6.0.0", "~> 5.0", False),
+        ("4.9.0", "~> 5.0", False),
+        ("1.2.9", "~> 1.2.3", True),
+        ("1.3.0", "~> 1.2.3", False),
+        ("3.6.3", ">= 3.0, < 4.0", True),
+        ("3.6.3", "!= 3.6.3", False),
+        ("3.6.3", "3.6.3", True),
+        ("5.1.0-beta1", "~> 5.0", False),
+    ])
+    def test_constraints(self, version, constraint, expected):
+        """Terraform constraint operators are honored."""
+        assert provider_mirror.version_satisfies(version, [constraint]) is expected
+
+    def test_unsupported_constraint_raises(self):
+        """Unparseable constraints are rejected."""
+        with pytest.raises(ValueError, match="Unsupported version constraint"):
+            provider_mirror.version_satisfies("1.0.0", ["^1.0"])
+
+
+class TestSelectProviderArchives:
+    """Test cases for select_provider_archives function."""
+
+    def test_repository_modules_are_fully_mirrored(self):
+        """Every version locked by the bundled modules gets an archive in the mirror."""
+        locked = provider_mirror.locked_providers(bundled_modules())
+        archives = archives_for(locked) + archives_for(locked, "linux_arm64") + [
+            "terraform-provider-cloudflare_5.18.0_linux_amd64.zip",
+            "terraform-provider-extra_1.0.0_linux_amd64.zip",
+            "SHA256SUMS",
+        ]
+        selected = provider_mirror.select_provider_archives(locked, archives, "linux/amd64")
+
+        assert [(entry["source"].split("/", 1)[1], entry["version"]) for entry in selected] == [
+            ("cloudflare/cloudflare", "5.16.0"),
+            ("cloudflare/cloudflare", "5.17.0"),
+            ("filipowm/unifi", "1.0.0"),
+            ("hashicorp/null", "3.2.4"),
+            ("hashicorp/random", "3.8.1"),
+        ]
+        assert selected[3]["mirror_path"] == (
+            "registry.terraform.io/hashicorp/null/terraform-provider-null_3.2.4_linux_amd64.zip"
+        )
+
+    def test_nested_archive_must_match_namespace(self):
+        """An archive nested under another namespace is not used."""
+        locked = {"registry.terraform.io/hashicorp/random": ["3.6.3"]}
+        archives = ["registry.terraform.io/other/random/terraform-provider-random_3.6.3_linux_amd64.zip"]
+        with pytest.raises(ValueError, match="hashicorp/random 3.6.3"):
+            provider_mirror.select_provider_archives(locked, archives, "linux/amd64")
+
+        archives = ["registry.terraform.io/hashicorp/random/terraform-provider-random_3.6.3_linux_amd64.zip"]
+        assert provider_mirror.select_provider_archives(locked, archives, "linux/amd64")[0]["archive"] == archives[0]
+
+    def test_missing_versions_are_listed(self):
+        """Newer archives do not stand in for a locked version; all gaps are reported."""
+        locked = provider_mirror.locked_providers(bundled_modules())
+        archives = [a for a in archives_for(locked) if "null" not in a and "5.16.0" not in a]
+        archives.append("terraform-provider-cloudflare_5.18.0_linux_amd64.zip")
+        with pytest.raises(ValueError) as excinfo:
+            provider_mirror.select_provider_archives(locked, archives, "linux/amd64")
+        message = str(excinfo.value)
+        assert "cloudflare/cloudflare 5.16.0 for linux_amd64" in message
+        assert "hashicorp/null 3.2.4 for linux_amd64" in message
+        assert "5.17.0" not in message
+
+
+class TestMirrorCliConfig:
+    """Test cases for mirror_cli_config function."""
+
+    def test_config_has_no_direct_installation(self):
+        """init can only install from the filesystem mirror."""
+        config = provider_mirror.mirror_cli_config(
+            ["registry.terraform.io/hashicorp/random", "registry.terraform.io/cloudflare/cloudflare"]
+        )
+        assert f'path    = "{provider_mirror.MIRROR_PATH}"' in config
+        assert '"registry.terraform.io/hashicorp/random"' in config
+        assert "direct" not in config
@@ -0,0 +1,179 @@
+"""Unit tests for the shared Terraform provider plugin cache helpers."""
+
+import subprocess
+import sys
+import os
+import importlib.util
+
+# Load terraform_cache.py directly without going through the package __init__.py
+terraform_cache_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'terraform_cache.py'
+)
+spec = importlib.util.spec_from_file_location("terraform_cache", terraform_cache_path)
+terraform_cache = importlib.util.module_from_spec(spec)
+sys.modules["terraform_cache"] = terraform_cache
+spec.loader.exec_module(terraform_cache)
+
+plugin_cache_volume_name = terraform_cache.plugin_cache_volume_name
+cached_init_script = terraform_cache.cached_init_script
+
+
+class TestPluginCacheVolumeName:
+    """Test cases for plugin_cache_volume_name function."""
+
+    def test_name_is_deterministic(self):
+        """Same version and platform select the same volume."""
+        assert plugin_cache_volume_name("1.10.0", "linux/amd64") == plugin_cache_volume_name(
+            "1.10.0", "linux/amd64"
+        )
+
+    def test_name_changes_with_version(self):
+        """Each Terraform version gets its own volume."""
+        assert plugin_cache_volume_name("1.10.0", "linux/amd64") != plugin_cache_volume_name(
+            "1.10.1", "linux/amd64"
+        )
+
+    def test_name_changes_with_platform(self):
+        """Provider binaries are platform specific."""
+        assert plugin_cache_volume_name("1.10.0", "linux/amd64") != plugin_cache_volume_name(
+            "1.10.0", "linux/arm64"
+        )
+
+    def test_name_is_readable_and_safe(self):
+        """Volume names contain only lowercase letters, digits, dots and dashes."""
+        name = plugin_cache_volume_name("latest", "linux/arm64/v8")
+        assert name.startswith("unifi-cloudflare-glue-tf-plugins-latest-linux-arm64-v8-")
+        assert all(c in "abcdefghijklmnopqrstuvwxyz0123456789.-" for c in name)
+
+
+class TestCachedInitScript:
+    """Test cases for cached_init_script function."""
+
+    def fake_init(self, tmp_path):
+        """Write a stand-in for `terraform init` that links a provider from the cache."""
+        script = tmp_path / "fake-init"
+        script.write_text(
+            "#!/bin/sh\n"
+            'mkdir -p "$TF_PLUGIN_CACHE_DIR/p/1.0" .terraform/providers/p\n'
+            'echo binary > "$TF_PLUGIN_CACHE_DIR/p/1.0/terraform-provider-p"\n'
+            'ln -s "$TF_PLUGIN_CACHE_DIR/p/1.0" .terraform/providers/p/1.0\n'
+            'echo "args: $*"\n'
+        )
+        script.chmod(0o755)
+        return str(script)
+
+    def test_providers_are_copied_out_of_cache(self, tmp_path):
+        """Provider links are replaced with real directories after init."""
+        cache = tmp_path / "cache"
+        work = tmp_path / "work"
+        work.mkdir()
+        script = cached_init_script([self.fake_init(tmp_path), "-backend-config=a b.tfbackend"], str(cache))
+
+        result = subprocess.run(
+            ["sh", "-c", script], cwd=work, capture_output=True, text=True, check=True,
+            env={**os.environ, "TF_PLUGIN_CACHE_DIR": str(cache)},
+        )
+
+        provider = work / ".terraform" / "providers" / "p" / "1.0"
+        assert "args: -backend-config=a b.tfbackend" in result.stdout
+        assert not provider.is_symlink()
+        assert (provider / "terraform-provider-p").read_text() == "binary\n"
+        assert (cache / "p" / "1.0" / "terraform-provider-p").exists()
+
+    def test_init_failure_propagates(self, tmp_path):
+        """A failing init exits non-zero."""
+        script = cached_init_script(["false"], str(tmp_path / "cache"))
+        result = subprocess.run(["sh", "-c", script], cwd=tmp_path, capture_output=True, text=True)
+        assert result.returncode != 0
+
+
+class TestStateDirectoryReuse:
+    """Test cases for reusing an initialized --state-dir working directory."""
+
+    VERSION_CMD = "echo Terraform v1.10.0"
+
+    def setup_dirs(self, tmp_path):
+        """Create a module tree (glue + sibling) and an empty state directory."""
+        modules = tmp_path / "module"
+        (modules / "glue").mkdir(parents=True)
+        (modules / "unifi-dns").mkdir()
+        (modules / "glue" / "main.tf").write_text('module "unifi_dns" {}\n')
+        (modules / "glue" / "versions.tf").write_text("terraform {}\n")
+        (modules / "unifi-dns" / "versions.tf").write_text("terraform {}\n")
+        state = tmp_path / "state"
+        state.mkdir()
+        return modules, state
+
+    def sync(self, modules, state):
+        """Run the sync script and return its output lines."""
+        script = terraform_cache.state_sync_script(
+            str(modules / "glue"), str(modules), ["terraform", "init"], str(state), self.VERSION_CMD
+        )
+        return subprocess.run(["sh", "-c", script], capture_output=True, text=True, check=True).stdout.split()
+
+    def fake_init(self, modules, state):
+        """Simulate a successful init followed by recording the fingerprint."""
+        (state / ".terraform" / "providers").mkdir(parents=True, exist_ok=True)
+        (state / ".terraform.lock.hcl").write_text('provider "x" {}\n')
+        script = terraform_cache.init_stamp_script(
+            str(modules), ["terraform", "init"], str(state), self.VERSION_CMD
+        )
+        subprocess.run(["sh", "-c", script], check=True)
+
+    def test_first_run_needs_init(self, tmp_path):
+        """A fresh state directory gets the module files and needs init."""
+        modules, state = self.setup_dirs(tmp_path)
+        output = self.sync(modules, state)
+        assert output[-1] == "init"
+        assert (state / "main.tf").exists()
+
+    def test_unchanged_inputs_reuse_working_directory(self, tmp_path):
+        """Same module sources and lock file skip init and copy nothing."""
+        modules, state = self.setup_dirs(tmp_path)
+        self.sync(modules, state)
+        self.fake_init(modules, state)
+
+        assert self.sync(modules, state) == ["reuse"]
+        assert (state / ".terraform" / "providers").is_dir()
+
+    def test_changed_file_is_copied_and_triggers_init(self, tmp_path):
+        """Only changed files are copied, and the fingerprint no longer matches."""
+        modules, state = self.setup_dirs(tmp_path)
+        self.sync(modules, state)
+        self.fake_init(modules, state)
+
+        (modules / "glue" / "main.tf").write_text('module "unifi_dns" { count = 1 }\n')
+        output = self.sync(modules, state)
+
+        assert output == ["updated", "main.tf", "init"]
+        assert "count = 1" in (state / "main.tf").read_text()
+
+    def test_sibling_module_change_triggers_init(self, tmp_path):
+        """Changes in modules referenced by glue invalidate the working directory."""
+        modules, state = self.setup_dirs(tmp_path)
+        self.sync(modules, state)
+        self.fake_init(modules, state)
+
+        (modules / "unifi-dns" / "versions.tf").write_text("terraform { required_providers {} }\n")
+
+        assert self.sync(modules, state) == ["init"]
+
+    def test_lock_file_change_triggers_init(self, tmp_path):
+        """An edited lock file invalidates the working directory."""
+        modules, state = self.setup_dirs(tmp_path)
+        self.sync(modules, state)
+        self.fake_init(modules, state)
+
+        (state / ".terraform.lock.hcl").write_text('provider "y" {}\n')
+
+        assert self.sync(modules, state) == ["init"]
+
+    def test_missing_providers_trigger_init(self, tmp_path):
+        """A stamp without installed providers is not trusted."""
+        modules, state = self.setup_dirs(tmp_path)
+        self.sync(modules, state)
+        self.fake_init(modules, state)
+
+        (state / ".terraform" / "providers").rmdir()
+
+        assert self.sync(modules, state) == ["init"]
@@ -0,0 +1,177 @@
+"""Unit tests for the lazy Terraform pipeline builder."""
+
+import pytest
+import sys
+import os
+import importlib.util
+
+# Load terraform_pipeline.py directly without going through the package __init__.py
+terraform_pipeline_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'terraform_pipeline.py'
+)
+spec = importlib.util.spec_from_file_location("terraform_pipeline", terraform_pipeline_path)
+terraform_pipeline = importlib.util.module_from_spec(spec)
+sys.modules["terraform_pipeline"] = terraform_pipeline
+spec.loader.exec_module(terraform_pipeline)
+
+TerraformPipeline = terraform_pipeline.TerraformPipeline
+PipelineStepError = terraform_pipeline.PipelineStepError
+exec_error_details = terraform_pipeline.exec_error_details
+
+
+class FakeExecError(Exception):
+    """Stand-in for dagger.ExecError."""
+
+    def __init__(self, command, exit_code=1, stdout="", stderr="boom"):
+        super().__init__(f"process {command} did not complete successfully")
+        self.command = command
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class FakeContainer:
+    """Immutable container recording execs; runs them only on stdout()."""
+
+    def __init__(self, failing=(), execs=(), runs=None):
+        self.failing = [list(c) for c in failing]
+        self.execs = list(execs)
+        self.runs = runs if runs is not None else []
+
+    def with_exec(self, args, expect="SUCCESS"):
+        failing = self.failing if expect == "SUCCESS" else [c for c in self.failing if c != list(args)]
+        return FakeContainer(failing, self.execs + [list(args)], self.runs)
+
+    def with_file(self, path, source):
+        return FakeContainer(self.failing, self.execs + [["with_file", path]], self.runs)
+
+    async def stdout(self):
+        self.runs.append(list(self.execs))
+        for command in self.execs:
+            if command in self.failing:
+                raise FakeExecError(command)
+        return f"output of {' '.join(self.execs[-1])}"
+
+    async def exit_code(self):
+        await self.stdout()
+        return 2
+
+
+class TestTerraformPipeline:
+    """Test cases for TerraformPipeline."""
+
+    def test_steps_are_not_run_until_sync(self):
+        """Adding steps does not touch the engine."""
+        ctr = FakeContainer()
+        pipeline = TerraformPipeline(ctr)
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+        pipeline.exec("apply", "Terraform apply failed", ["terraform", "apply", "-auto-approve"])
+        assert ctr.runs == []
+        assert [step.name for step in pipeline.steps] == ["init", "apply"]
+
+    async def test_sync_runs_chain_once(self):
+        """One sync runs every step and returns the last output."""
+        ctr = FakeContainer()
+        pipeline = TerraformPipeline(ctr)
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+        pipeline.then(lambda c: c.with_file("/state/plan.tfplan", None))
+        pipeline.exec("apply", "Terraform apply failed", ["terraform", "apply", "plan.tfplan"])
+
+        assert await pipeline.sync() == "output of terraform apply plan.tfplan"
+        assert ctr.runs == [[
+            ["terraform", "init"], ["with_file", "/state/plan.tfplan"], ["terraform", "apply", "plan.tfplan"],
+        ]]
+
+    async def test_failure_is_mapped_to_step(self):
+        """The failing command selects the step and its message."""
+        pipeline = TerraformPipeline(FakeContainer(failing=[["terraform", "init"]]))
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+        pipeline.exec("apply", "Terraform apply failed", ["terraform", "apply", "-auto-approve"])
+
+        with pytest.raises(PipelineStepError) as excinfo:
+            await pipeline.sync()
+        assert excinfo.value.step.name == "init"
+        assert str(excinfo.value).startswith("Terraform init failed\n")
+        assert isinstance(excinfo.value.error, FakeExecError)
+
+    async def test_later_step_failure(self):
+        """A failure after init is attributed to the later step."""
+        apply = ["sh", "-c", "# cache_bust=1\nterraform apply -auto-approve"]
+        pipeline = TerraformPipeline(FakeContainer(failing=[apply]))
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+        pipeline.exec("apply", "Terraform apply failed", apply)
+
+        with pytest.raises(PipelineStepError) as excinfo:
+            await pipeline.sync()
+        assert excinfo.value.step.name == "apply"
+
+    async def test_recorded_step_is_mapped(self):
+        """Execs added by helpers are mapped once recorded."""
+        init = ["sh", "-c", "mkdir -p /tf-plugin-cache && terraform init"]
+        ctr = FakeContainer(failing=[init])
+        pipeline = TerraformPipeline(ctr)
+        pipeline.container = ctr.with_exec(init)
+        pipeline.record("init", "Terraform init failed", init)
+
+        with pytest.raises(PipelineStepError) as excinfo:
+            await pipeline.sync()
+        assert excinfo.value.step.name == "init"
+
+    async def test_unrecorded_failure_is_reraised(self):
+        """Errors not coming from a recorded step keep their type."""
+        ctr = FakeContainer(failing=[["sh", "-c", "sync"]]).with_exec(["sh", "-c", "sync"])
+        pipeline = TerraformPipeline(ctr)
+        pipeline.exec("apply", "Terraform apply failed", ["terraform", "apply"])
+
+        with pytest.raises(FakeExecError):
+            await pipeline.sync()
+
+    async def test_output_does_not_extend_chain(self):
+        """Decision-point commands run on a branch."""
+        pipeline = TerraformPipeline(FakeContainer())
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+
+        assert await pipeline.output("state-pull", "Could not read state", ["terraform", "state", "pull"]) == (
+            "output of terraform state pull"
+        )
+        assert [step.name for step in pipeline.steps] == ["init"]
+        assert pipeline.container.execs == [["terraform", "init"]]
+
+    async def test_output_failure_is_mapped(self):
+        """The branch command and earlier steps are both mapped."""
+        pull = ["terraform", "state", "pull"]
+        pipeline = TerraformPipeline(FakeContainer(failing=[pull]))
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+        with pytest.raises(PipelineStepError) as excinfo:
+            await pipeline.output("state-pull", "Could not read state", pull)
+        assert excinfo.value.step.name == "state-pull"
+
+        pipeline = TerraformPipeline(FakeContainer(failing=[["terraform", "init"]]))
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+        with pytest.raises(PipelineStepError) as excinfo:
+            await pipeline.output("state-pull", "Could not read state", pull)
+        assert excinfo.value.step.name == "init"
+
+    async def test_exit_code_of_last_step(self):
+        """A last step allowed to fail reports its exit code; earlier failures are mapped."""
+        drift = ["terraform", "plan", "-refresh-only", "-detailed-exitcode"]
+        pipeline = TerraformPipeline(FakeContainer(failing=[drift]))
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+        pipeline.exec("drift", "Terraform refresh-only plan failed", drift, expect="ANY")
+        assert await pipeline.exit_code() == 2
+
+        pipeline = TerraformPipeline(FakeContainer(failing=[["terraform", "init"]]))
+        pipeline.exec("init", "Terraform init failed", ["terraform", "init"])
+        pipeline.exec("drift", "Terraform refresh-only plan failed", drift, expect="ANY")
+        with pytest.raises(PipelineStepError) as excinfo:
+            await pipeline.exit_code()
+        assert excinfo.value.step.name == "init"
+
+
+class TestExecErrorDetails:
+    """Test cases for exec_error_details function."""
+
+    def test_details(self):
+        """Exit code, stdout and stderr are listed; empty output is N/A."""
+        details = exec_error_details(FakeExecError(["terraform", "apply"], exit_code=1, stdout="", stderr="boom"))
+        assert details == "Exit code: 1\nStdout:\nN/A\nStderr:\nboom"
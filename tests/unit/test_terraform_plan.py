@@ -0,0 +1,98 @@
+"""Unit tests for saved Terraform plan helpers."""
+
+import json
+import pytest
+import sys
+import os
+import importlib.util
+
+# Load terraform_plan.py directly without going through the package __init__.py
+terraform_plan_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'terraform_plan.py'
+)
+spec = importlib.util.spec_from_file_location("terraform_plan", terraform_plan_path)
+terraform_plan = importlib.util.module_from_spec(spec)
+sys.modules["terraform_plan"] = terraform_plan
+spec.loader.exec_module(terraform_plan)
+
+state_identity = terraform_plan.state_identity
+render_plan_state = terraform_plan.render_plan_state
+load_plan_state = terraform_plan.load_plan_state
+stale_plan_reason = terraform_plan.stale_plan_reason
+
+
+STATE = json.dumps({
+    "version": 4,
+    "terraform_version": "1.10.0",
+    "serial": 7,
+    "lineage": "3f2c9a1e-0000-4000-8000-000000000001",
+    "outputs": {},
+    "resources": [],
+})
+
+
+class TestStateIdentity:
+    """Test cases for state_identity function."""
+
+    def test_reads_lineage_and_serial(self):
+        """Lineage and serial are taken from state pull output."""
+        assert state_identity(STATE) == {
+            "lineage": "3f2c9a1e-0000-4000-8000-000000000001",
+            "serial": 7,
+        }
+
+    def test_empty_state(self):
+        """No state yet (first deployment) has no lineage or serial."""
+        assert state_identity("") == {"lineage": None, "serial": None}
+        assert state_identity("\n") == {"lineage": None, "serial": None}
+
+    def test_invalid_state_raises(self):
+        """Unparseable state output raises ValueError."""
+        with pytest.raises(ValueError, match="Could not parse Terraform state"):
+            state_identity("not json")
+
+
+class TestPlanStateFile:
+    """Test cases for plan-state.json rendering and loading."""
+
+    def test_round_trip(self):
+        """Rendered plan state loads back with scope flags."""
+        text = render_plan_state(state_identity(STATE), unifi_only=True, cloudflare_only=False)
+        record = load_plan_state(text)
+        assert record["serial"] == 7
+        assert record["unifi_only"] is True
+        assert record["cloudflare_only"] is False
+
+    def test_invalid_file_raises(self):
+        """A file without lineage/serial is rejected."""
+        with pytest.raises(ValueError, match="expected lineage and serial"):
+            load_plan_state('{"serial": 1}')
+        with pytest.raises(ValueError, match="Invalid plan-state.json"):
+            load_plan_state("{")
+
+
+class TestStalePlanReason:
+    """Test cases for stale_plan_reason function."""
+
+    def test_matching_state_is_current(self):
+        """Same lineage and serial means the plan can be applied."""
+        recorded = load_plan_state(render_plan_state(state_identity(STATE), False, False))
+        assert stale_plan_reason(recorded, state_identity(STATE)) is None
+
+    def test_first_deployment_is_current(self):
+        """A plan made without state applies while there is still no state."""
+        recorded = load_plan_state(render_plan_state(state_identity(""), False, False))
+        assert stale_plan_reason(recorded, state_identity("")) is None
+
+    def test_serial_change_is_stale(self):
+        """A state written since plan makes the plan stale."""
+        recorded = load_plan_state(render_plan_state(state_identity(STATE), False, False))
+        newer = dict(json.loads(STATE), serial=8)
+        reason = stale_plan_reason(recorded, state_identity(json.dumps(newer)))
+        assert reason == "state serial changed (plan: 7, current: 8)"
+
+    def test_lineage_change_is_stale(self):
+        """A different state (e.g. recreated from scratch) makes the plan stale."""
+        recorded = load_plan_state(render_plan_state(state_identity(""), False, False))
+        reason = stale_plan_reason(recorded, state_identity(STATE))
+        assert reason.startswith("state lineage changed (plan: no state")
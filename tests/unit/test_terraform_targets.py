@@ -0,0 +1,150 @@
+"""Unit tests for Terraform run options and target resolution."""
+
+import pytest
+import sys
+import os
+import importlib.util
+
+# Load terraform_targets.py directly without going through the package __init__.py
+terraform_targets_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'terraform_targets.py'
+)
+spec = importlib.util.spec_from_file_location("terraform_targets", terraform_targets_path)
+terraform_targets = importlib.util.module_from_spec(spec)
+sys.modules["terraform_targets"] = terraform_targets
+spec.loader.exec_module(terraform_targets)
+
+normalize_mac = terraform_targets.normalize_mac
+resolve_targets = terraform_targets.resolve_targets
+terraform_run_options = terraform_targets.terraform_run_options
+
+
+UNIFI = {
+    "default_domain": "internal.lan",
+    "site": "default",
+    "devices": [
+        {
+            "friendly_hostname": "media-server",
+            "domain": None,
+            "service_cnames": ["jellyfin.internal.lan"],
+            "nics": [{"mac_address": "aa:bb:cc:dd:ee:01", "nic_name": "eth0", "service_cnames": ["nas.internal.lan"]}],
+        },
+        {
+            "friendly_hostname": "backup-server",
+            "domain": "lab.lan",
+            "service_cnames": [],
+            "nics": [
+                {"mac_address": "AA-BB-CC-DD-EE-02", "nic_name": "eth0", "service_cnames": []},
+                {"mac_address": "aabbccddee03", "nic_name": "eth1", "service_cnames": []},
+            ],
+        },
+    ],
+}
+
+CLOUDFLARE = {
+    "zone_name": "example.com",
+    "account_id": "abc",
+    "tunnels": {
+        "aa:bb:cc:dd:ee:01": {
+            "tunnel_name": "media-server",
+            "services": [
+                {"public_hostname": "jellyfin.example.com", "local_service_url": "http://jellyfin:8096"},
+                {"public_hostname": "plex.example.com", "local_service_url": "http://plex:32400"},
+            ],
+        },
+        "aa:bb:cc:dd:ee:03": {
+            "tunnel_name": "backup",
+            "services": [{"public_hostname": "backup.example.com", "local_service_url": "http://backup:80"}],
+        },
+    },
+}
+
+MEDIA_UNIFI = [
+    'module.unifi_dns[0].unifi_dns_record.dns_record["media-server"]',
+    'module.unifi_dns[0].unifi_dns_record.cname_record["media-server-jellyfin.internal.lan"]',
+    'module.unifi_dns[0].unifi_dns_record.cname_record["media-server-eth0-nas.internal.lan"]',
+]
+MEDIA_CLOUDFLARE = [
+    'module.cloudflare_tunnel[0].cloudflare_zero_trust_tunnel_cloudflared.this["aa:bb:cc:dd:ee:01"]',
+    'module.cloudflare_tunnel[0].random_password.tunnel_secret["aa:bb:cc:dd:ee:01"]',
+    'module.cloudflare_tunnel[0].cloudflare_zero_trust_tunnel_cloudflared_config.this["aa:bb:cc:dd:ee:01"]',
+    'module.cloudflare_tunnel[0].cloudflare_dns_record.tunnel["aa:bb:cc:dd:ee:01-0"]',
+    'module.cloudflare_tunnel[0].cloudflare_dns_record.tunnel["aa:bb:cc:dd:ee:01-1"]',
+]
+
+
+def glue(targets, unifi=UNIFI, cloudflare=CLOUDFLARE):
+    return resolve_targets(
+        targets, unifi, cloudflare,
+        unifi_prefix=terraform_targets.GLUE_UNIFI_PREFIX,
+        cloudflare_prefix=terraform_targets.GLUE_CLOUDFLARE_PREFIX,
+    )
+
+
+class TestNormalizeMac:
+    """Test cases for normalize_mac function."""
+
+    @pytest.mark.parametrize("value", ["aa:bb:cc:dd:ee:01", "AA-BB-CC-DD-EE-01", "aabbccddee01", "aa.bb.cc.dd.ee.01"])
+    def test_formats(self, value):
+        """Colon, hyphen, dot and bare formats normalize alike."""
+        assert normalize_mac(value) == "aa:bb:cc:dd:ee:01"
+
+    @pytest.mark.parametrize("value", ["media-server", "aa:bb:cc:dd:ee", "aa:bb-cc:dd:ee:01", "gg:bb:cc:dd:ee:01"])
+    def test_not_a_mac(self, value):
+        """Hostnames and malformed MACs are not MAC addresses."""
+        assert normalize_mac(value) is None
+
+
+class TestResolveTargets:
+    """Test cases for resolve_targets function."""
+
+    def test_mac_targets_device_and_tunnel(self):
+        """A MAC selects the UniFi device and the tunnel on it."""
+        assert glue(["AA:BB:CC:DD:EE:01"]) == MEDIA_UNIFI + MEDIA_CLOUDFLARE
+
+    def test_hostnames(self):
+        """Device hostnames, FQDNs, CNAMEs, tunnel names and public hostnames all resolve."""
+        for name in ["media-server", "media-server.internal.lan", "nas.internal.lan", "plex.example.com."]:
+            assert glue([name]) == MEDIA_UNIFI + MEDIA_CLOUDFLARE
+
+    def test_device_selects_all_nics(self):
+        """A multi-NIC device selects the tunnels of every NIC."""
+        addresses = glue(["backup-server.lab.lan"])
+        assert 'module.unifi_dns[0].unifi_dns_record.dns_record["backup-server"]' in addresses
+        assert 'module.cloudflare_tunnel[0].cloudflare_zero_trust_tunnel_cloudflared.this["aa:bb:cc:dd:ee:03"]' in addresses
+
+    def test_standalone_module_has_no_prefix(self):
+        """Single-module runs (--unifi-only deploy) address resources directly."""
+        assert resolve_targets(["media-server"], UNIFI, None) == [
+            'unifi_dns_record.dns_record["media-server"]',
+            'unifi_dns_record.cname_record["media-server-jellyfin.internal.lan"]',
+            'unifi_dns_record.cname_record["media-server-eth0-nas.internal.lan"]',
+        ]
+
+    def test_duplicates_are_removed(self):
+        """Several targets for the same device yield each address once."""
+        assert glue(["media-server", "aa:bb:cc:dd:ee:01", "plex.example.com"]) == MEDIA_UNIFI + MEDIA_CLOUDFLARE
+
+    def test_unmatched_target_raises(self):
+        """Targets outside the configurations (or the scope) are rejected."""
+        with pytest.raises(ValueError, match="No device or tunnel matches: printer, aa:bb:cc:dd:ee:99"):
+            glue(["media-server", "printer", "aa:bb:cc:dd:ee:99"])
+        with pytest.raises(ValueError, match="plex.example.com"):
+            resolve_targets(["plex.example.com"], UNIFI, None)
+
+
+class TestTerraformRunOptions:
+    """Test cases for terraform_run_options function."""
+
+    def test_defaults_add_nothing(self):
+        """Default options keep Terraform's behaviour."""
+        assert terraform_run_options() == []
+
+    def test_all_options(self):
+        """Parallelism, refresh and targets map to Terraform flags."""
+        assert terraform_run_options(25, False, ['a.b["x"]']) == ["-parallelism=25", "-refresh=false", '-target=a.b["x"]']
+
+    def test_negative_parallelism(self):
+        """Negative parallelism is rejected."""
+        with pytest.raises(ValueError, match="--parallelism"):
+            terraform_run_options(-1)
@@ -0,0 +1,209 @@
+"""Unit tests for reading tunnel secrets from Terraform state."""
+
+import json
+import pytest
+import sys
+import os
+import importlib.util
+
+# Load tunnel_secrets.py directly without going through the package __init__.py
+tunnel_secrets_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'src', 'main', 'tunnel_secrets.py'
+)
+spec = importlib.util.spec_from_file_location("tunnel_secrets", tunnel_secrets_path)
+tunnel_secrets = importlib.util.module_from_spec(spec)
+sys.modules["tunnel_secrets"] = tunnel_secrets
+spec.loader.exec_module(tunnel_secrets)
+
+load_state = tunnel_secrets.load_state
+state_tunnel_secrets = tunnel_secrets.state_tunnel_secrets
+detect_module = tunnel_secrets.detect_module
+tunnel_outputs = tunnel_secrets.tunnel_outputs
+MissingOutputsError = tunnel_secrets.MissingOutputsError
+tunnel_records = tunnel_secrets.tunnel_records
+ndjson_lines = tunnel_secrets.ndjson_lines
+human_lines = tunnel_secrets.human_lines
+
+
+MAC = "aa:bb:cc:dd:ee:01"
+CREDENTIALS = json.dumps({"AccountTag": "acc", "TunnelID": "tid", "TunnelName": "media", "TunnelSecret": "c2Vj"})
+
+
+def output(value, sensitive=False):
+    """Build one entry of `terraform output -json`."""
+    return {"sensitive": sensitive, "type": ["map", "string"], "value": value}
+
+
+GLUE_OUTPUTS = {
+    "cloudflare_tunnel_ids": output({MAC: "tid"}),
+    "cloudflare_tunnel_tokens": output({MAC: "c2Vj"}, sensitive=True),
+    "cloudflare_credentials_json": output({MAC: CREDENTIALS}, sensitive=True),
+    "tunnel_ids": output({MAC: "tid"}),
+    "tunnel_tokens": output({MAC: "c2Vj"}, sensitive=True),
+    "credentials_json": output({MAC: CREDENTIALS}, sensitive=True),
+    "unifi_summary": output({"total_devices": 1}),
+}
+
+
+class TestTunnelOutputs:
+    """Test cases for detect_module and tunnel_outputs."""
+
+    def test_glue_state(self):
+        """Glue states are detected and read through the unprefixed aliases."""
+        outputs = {name: output["value"] for name, output in GLUE_OUTPUTS.items()}
+        assert detect_module(outputs) == "glue"
+        assert tunnel_outputs(outputs) == {
+            "tunnel_ids": {MAC: "tid"},
+            "tunnel_tokens": {MAC: "c2Vj"},
+            "credentials_json": {MAC: CREDENTIALS},
+        }
+
+    def test_prefixed_only_glue_state(self):
+        """Glue states without aliases fall back to the prefixed outputs."""
+        outputs = {k: v["value"] for k, v in GLUE_OUTPUTS.items() if k.startswith("cloudflare_")}
+        assert tunnel_outputs(outputs)["tunnel_tokens"] == {MAC: "c2Vj"}
+
+    def test_standalone_state(self):
+        """cloudflare-tunnel states use the unprefixed names."""
+        outputs = {"tunnel_ids": {}, "tunnel_tokens": {}, "credentials_json": {}}
+        assert detect_module(outputs) == "cloudflare-tunnel"
+        assert tunnel_outputs(outputs)["tunnel_ids"] == {}
+
+    def test_missing_outputs(self):
+        """Missing outputs are named together with what is available."""
+        with pytest.raises(MissingOutputsError) as excinfo:
+            tunnel_outputs({"tunnel_ids": {}, "zone_id": "z"})
+        assert excinfo.value.missing == ["tunnel_tokens", "credentials_json"]
+        assert excinfo.value.available == ["tunnel_ids", "zone_id"]
+
+
+def state(outputs=None, resources=None):
+    """Build a terraform.tfstate document."""
+    return {"version": 4, "serial": 7, "lineage": "x", "outputs": outputs or {}, "resources": resources or []}
+
+
+TUNNEL_RESOURCES = [
+    {
+        "module": "module.cloudflare_tunnel[0]",
+        "mode": "managed",
+        "type": "cloudflare_zero_trust_tunnel_cloudflared",
+        "name": "this",
+        "instances": [{"index_key": MAC, "attributes": {"id": "tid", "name": "media", "account_id": "acc"}}],
+    },
+    {
+        "module": "module.cloudflare_tunnel[0]",
+        "mode": "managed",
+        "type": "random_password",
+        "name": "tunnel_secret",
+        "instances": [{"index_key": MAC, "attributes": {"result": "secret"}}],
+    },
+]
+
+
+class TestLoadState:
+    """Test cases for load_state function."""
+
+    def test_state_document(self):
+        """terraform.tfstate and `terraform state pull` output parse alike."""
+        assert load_state(json.dumps(state(GLUE_OUTPUTS)))["outputs"] == GLUE_OUTPUTS
+
+    def test_no_state(self):
+        """A missing state file or empty pull yields an empty document."""
+        assert load_state("") == {}
+        assert load_state("\n") == {}
+
+    @pytest.mark.parametrize("text", ["{", '{"version": 3, "modules": []}', "[]"])
+    def test_invalid_state(self, text):
+        """Unparseable or pre-0.12 states are rejected."""
+        with pytest.raises(ValueError):
+            load_state(text)
+
+
+class TestStateTunnelSecrets:
+    """Test cases for state_tunnel_secrets and resource_secrets."""
+
+    def test_outputs_are_preferred(self):
+        """Root outputs give the module type and the three maps."""
+        module, secrets = state_tunnel_secrets(state(GLUE_OUTPUTS, TUNNEL_RESOURCES))
+        assert module == "glue"
+        assert secrets["credentials_json"] == {MAC: CREDENTIALS}
+
+    def test_rebuilt_from_resources(self):
+        """Without outputs the maps match what the module outputs would hold."""
+        module, secrets = state_tunnel_secrets(state(resources=TUNNEL_RESOURCES))
+        assert module == "glue"
+        assert secrets["tunnel_ids"] == {MAC: "tid"}
+        assert secrets["tunnel_tokens"] == {MAC: "c2VjcmV0"}
+        assert json.loads(secrets["credentials_json"][MAC]) == {
+            "AccountTag": "acc", "TunnelID": "tid", "TunnelName": "media", "TunnelSecret": "c2VjcmV0",
+        }
+
+    def test_standalone_resources(self):
+        """Resources in the root module come from the cloudflare-tunnel module."""
+        resources = [{k: v for k, v in r.items() if k != "module"} for r in TUNNEL_RESOURCES]
+        assert state_tunnel_secrets(state(resources=resources))[0] == "cloudflare-tunnel"
+
+    def test_nothing_found(self):
+        """States without tunnel outputs or resources report the missing outputs."""
+        with pytest.raises(MissingOutputsError) as excinfo:
+            state_tunnel_secrets(state({"zone_id": {"value": "z"}}))
+        assert excinfo.value.available == ["zone_id"]
+        with pytest.raises(MissingOutputsError):
+            state_tunnel_secrets({})
+
+
+def fleet(count):
+    """Build tunnel maps for `count` tunnels named tunnel-<n>."""
+    macs = [f"aa:bb:cc:dd:{i // 256:02x}:{i % 256:02x}" for i in range(count)]
+    return {
+        "tunnel_ids": {mac: f"tid-{i}" for i, mac in enumerate(macs)},
+        "tunnel_tokens": {mac: f"tok-{i}" for i, mac in enumerate(macs)},
+        "credentials_json": {
+            mac: json.dumps({"AccountTag": "acc", "TunnelID": f"tid-{i}", "TunnelName": f"tunnel-{i}", "TunnelSecret": f"tok-{i}"})
+            for i, mac in enumerate(macs)
+        },
+    }
+
+
+class TestTunnelRecords:
+    """Test cases for tunnel_records and the renderers."""
+
+    def test_all_tunnels(self):
+        """Without filters every tunnel is returned once, credentials parsed."""
+        records = tunnel_records(fleet(3))
+        assert [r["mac"] for r in records] == ["aa:bb:cc:dd:00:00", "aa:bb:cc:dd:00:01", "aa:bb:cc:dd:00:02"]
+        assert records[1] == {
+            "mac": "aa:bb:cc:dd:00:01",
+            "tunnel_id": "tid-1",
+            "tunnel_name": "tunnel-1",
+            "tunnel_token": "tok-1",
+            "credentials": {"AccountTag": "acc", "TunnelID": "tid-1", "TunnelName": "tunnel-1", "TunnelSecret": "tok-1"},
+        }
+
+    def test_filters_select_union(self):
+        """A tunnel matching any MAC or any name (case-insensitive) is selected."""
+        records = tunnel_records(fleet(5), macs=["aa:bb:cc:dd:00:04"], tunnel_names=["Tunnel-1"])
+        assert [r["tunnel_name"] for r in records] == ["tunnel-1", "tunnel-4"]
+
+    def test_unmatched_filter_raises(self):
+        """Filters matching no tunnel are named in the error."""
+        with pytest.raises(ValueError, match="No tunnel matches: aa:bb:cc:dd:ff:ff, printer"):
+            tunnel_records(fleet(2), macs=["aa:bb:cc:dd:00:00", "aa:bb:cc:dd:ff:ff"], tunnel_names=["printer"])
+
+    def test_ndjson_one_line_per_tunnel(self):
+        """Each NDJSON line is a complete record."""
+        lines = list(ndjson_lines(tunnel_records(fleet(1000))))
+        assert len(lines) == 1000
+        assert all("\n" not in line for line in lines)
+        assert json.loads(lines[999])["credentials"]["TunnelSecret"] == "tok-999"
+
+    def test_human_report(self):
+        """The human report keeps its sections and notes filtering."""
+        records = tunnel_records(fleet(3), tunnel_names=["tunnel-2"])
+        text = "\n".join(human_lines(records, "example.com", "glue", 3, execution_id="42"))
+        for section in ["CLOUDFLARE TUNNEL SECRETS", "TUNNEL IDS", "TUNNEL TOKENS", "CREDENTIALS JSON"]:
+            assert section in text
+        assert "Total Tunnels: 1\nFiltered: 1 of 3 tunnels" in text
+        assert "  Tunnel Secret: tok-2" in text
+        assert "tok-1" not in text
+        assert text.endswith("Execution ID: 42\n" + "=" * 60)
@@ -0,0 +1,204 @@
+"""
+Validation Scale Tests
+
+Checks that the cross-provider validators in main.k stay roughly linear in
+the number of services. Each run builds a synthetic UnifiedConfig inside KCL
+(one device, endpoint, tunnel and public service per index) and calls
+validate_all() on it.
+
+The same synthetic module also checks that `-D component=...` limits
+generate() to one provider.
+
+These tests need the kcl CLI and take tens of seconds; deselect them with
+`pytest -m "not scale"`.
+"""
+
+import json
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+pytestmark = [
+    pytest.mark.scale,
+    pytest.mark.skipif(shutil.which("kcl") is None, reason="kcl CLI not installed"),
+]
+
+SCALE_MAIN_K = '''
+import unifi_cloudflare_glue.main as glue
+import unifi_cloudflare_glue.schemas.unifi
+import unifi_cloudflare_glue.schemas.cloudflare
+import unifi_cloudflare_glue.generators.unifi as unifi_gen
+import unifi_cloudflare_glue.generators.cloudflare as cf_gen
+
+_n = option("services", type="int", default=100)
+# Number of trailing devices that reuse the first device's hostnames
+_dups = option("duplicates", type="int", default=0)
+# Number of extra tunnels whose MACs have no UniFi device
+_orphans = option("orphans", type="int", default=0)
+
+_mac = lambda i: int -> str {
+    h = "02{:010x}".format(i)
+    "${h[0:2]}:${h[2:4]}:${h[4:6]}:${h[6:8]}:${h[8:10]}:${h[10:12]}"
+}
+_name = lambda i: int -> str {
+    "host-${i - (_n - _dups)}" if _n - _dups <= i < _n else "host-${i}"
+}
+
+_cfg = glue.UnifiedConfig {
+    unifi = unifi.UniFiConfig {
+        default_domain = "internal.lan"
+        unifi_controller = unifi.UniFiController { host = "unifi.internal.lan" }
+        devices = [unifi.UniFiEntity {
+            friendly_hostname = _name(i)
+            domain = "internal.lan"
+            endpoints = [unifi.UniFiEndpoint { mac_address = _mac(i) }]
+        } for i in range(_n)]
+    }
+    cloudflare = cloudflare.CloudflareConfig {
+        zone_name = "example.com"
+        account_id = "1234567890abcdef1234567890abcdef"
+        tunnels = {_mac(i): cloudflare.CloudflareTunnel {
+            tunnel_name = "tunnel-${i}"
+            mac_address = _mac(i)
+            services = [cloudflare.TunnelService {
+                public_hostname = "${_name(i)}.example.com"
+                local_service_url = "http://svc-${i}.internal.lan:8080"
+            }]
+        } for i in range(_n + _orphans)}
+    }
+}
+
+errors = glue.validate_all(_cfg)
+
+# Optionally compare view-based generation with the plain generators
+_generate = option("generate", type="bool", default=False)
+generated = glue.generate(_cfg) if _generate else None
+direct = {
+    unifi_json = unifi_gen.generate_unifi_config(_cfg.unifi)
+    cloudflare_json = cf_gen.generate_cloudflare_config(_cfg.cloudflare)
+} if _generate else None
+'''
+
+
+@pytest.fixture(scope="module")
+def scale_module(tmp_path_factory) -> Path:
+    """Write a KCL module that depends on this repository by path."""
+    module_dir = tmp_path_factory.mktemp("validation-scale")
+    (module_dir / "kcl.mod").write_text(
+        '[package]\nname = "validation_scale"\nedition = "v0.11.1"\nversion = "0.0.1"\n\n'
+        f'[dependencies]\nunifi_cloudflare_glue = {{ path = "{REPO_ROOT}" }}\n'
+    )
+    (module_dir / "main.k").write_text(SCALE_MAIN_K)
+    return module_dir
+
+
+def run_scale_module(module_dir: Path, services: int, **options) -> tuple[dict, float]:
+    """Run the synthetic module and return (parsed output, seconds)."""
+    args = ["kcl", "run", "main.k", "--format", "json", "-D", f"services={services}"]
+    for name, value in options.items():
+        args += ["-D", f"{name}={value}"]
+
+    start = time.perf_counter()
+    result = subprocess.run(args, cwd=module_dir, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    return json.loads(result.stdout), elapsed
+
+
+def run_validation(
+    module_dir: Path, services: int, duplicates: int = 0, orphans: int = 0
+) -> tuple[list, float]:
+    """Run validate_all() on a synthetic config and return (errors, seconds)."""
+    output, elapsed = run_scale_module(
+        module_dir, services, duplicates=duplicates, orphans=orphans
+    )
+    return output["errors"], elapsed
+
+
+class TestValidationScale:
+    """Validation cost grows linearly with the number of services."""
+
+    def test_small_config_reports_duplicates(self, scale_module):
+        """Grouped duplicate detection keeps the existing error shapes."""
+        errors, _ = run_validation(scale_module, 100, duplicates=2)
+        by_type = {error["error"]: error for error in errors}
+
+        assert set(by_type) == {"DUPLICATE_HOSTNAME_ERROR", "DUPLICATE_PUBLIC_HOSTNAME_ERROR"}
+        assert by_type["DUPLICATE_HOSTNAME_ERROR"]["duplicate_hostnames"] == "[host-0, host-1]"
+        assert by_type["DUPLICATE_HOSTNAME_ERROR"]["conflicts"] == (
+            "[host-0: [host-0, host-0], host-1: [host-1, host-1]]"
+        )
+        assert by_type["DUPLICATE_PUBLIC_HOSTNAME_ERROR"]["conflicts"] == (
+            "[host-0.example.com: [tunnel-0, tunnel-98], "
+            "host-1.example.com: [tunnel-1, tunnel-99]]"
+        )
+
+    def test_small_config_reports_missing_macs(self, scale_module):
+        """The MAC index reports only tunnels without a UniFi device."""
+        errors, _ = run_validation(scale_module, 100, orphans=2)
+
+        assert [error["error"] for error in errors] == ["MAC_CONSISTENCY_ERROR"]
+        assert errors[0]["missing_macs"] == "[02:00:00:00:00:64, 02:00:00:00:00:65]"
+        assert errors[0]["available_unifi_macs"].startswith("[02:00:00:00:00:00, 02:00:00:00:00:01,")
+
+    def test_valid_config_has_no_errors(self, scale_module):
+        """A config without conflicts validates cleanly."""
+        errors, _ = run_validation(scale_module, 100)
+        assert errors == []
+
+    def test_generate_reuses_view_without_changing_output(self, scale_module):
+        """generate() builds the same JSON as the generators on their own."""
+        output, _ = run_scale_module(scale_module, 50, generate="True")
+
+        assert output["generated"]["valid"] is True
+        assert output["generated"]["unifi_json"] == output["direct"]["unifi_json"]
+        assert output["generated"]["cloudflare_json"] == output["direct"]["cloudflare_json"]
+
+    def test_validation_is_roughly_linear(self, scale_module):
+        """Per-service cost at 20,000 services stays close to the cost at 2,000."""
+        _, small = run_validation(scale_module, 2000, orphans=10)
+        errors, large = run_validation(scale_module, 20000, orphans=10)
+
+        assert [error["error"] for error in errors] == ["MAC_CONSISTENCY_ERROR"]
+        # 10x more services: linear is ~10x the time, quadratic ~100x
+        assert large / 20000 < 3 * (small / 2000), (
+            f"validation scaled super-linearly: 2,000 services {small:.2f}s, "
+            f"20,000 services {large:.2f}s"
+        )
+
+
+class TestComponentSelection:
+    """`-D component=...` limits generate() to one provider."""
+
+    def test_unifi_component_skips_cloudflare(self, scale_module):
+        """Cloudflare validators and output are skipped for component=unifi."""
+        output, _ = run_scale_module(scale_module, 20, orphans=2, generate="True", component="unifi")
+
+        assert output["generated"]["valid"] is True
+        assert output["generated"]["cloudflare_json"] == {}
+        assert len(output["generated"]["unifi_json"]["devices"]) == 20
+
+    def test_cloudflare_component_keeps_mac_consistency(self, scale_module):
+        """Tunnels are still checked against UniFi MACs for component=cloudflare."""
+        output, _ = run_scale_module(scale_module, 20, orphans=2, generate="True", component="cloudflare")
+
+        assert output["generated"]["valid"] is False
+        assert [e["error"] for e in output["generated"]["errors"]] == ["MAC_CONSISTENCY_ERROR"]
+
+    def test_cloudflare_component_skips_unifi_output(self, scale_module):
+        """UniFi output is not built for component=cloudflare."""
+        output, _ = run_scale_module(scale_module, 20, duplicates=0, generate="True", component="cloudflare")
+
+        assert output["generated"]["valid"] is True
+        assert output["generated"]["unifi_json"] == {}
+        assert len(output["generated"]["cloudflare_json"]["tunnels"]) == 20
+
+    def test_invalid_component_fails(self, scale_module):
+        """An unknown `-D component=` value fails instead of building nothing."""
+        with pytest.raises(subprocess.CalledProcessError) as excinfo:
+            run_scale_module(scale_module, 5, generate="True", component="cloudfare")
+        assert "component option must be one of all, unifi, cloudflare (got 'cloudfare')" in excinfo.value.stderr